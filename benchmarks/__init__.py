@@ -0,0 +1,4 @@
+"""Reproducible benchmarks for subtitle parsing, context extraction and the API.
+
+Run ``python -m benchmarks --help`` from the repository root.
+"""
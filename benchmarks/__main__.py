@@ -0,0 +1,132 @@
+"""Run the StevieTheTV benchmarks and write a JSON report.
+
+Examples::
+
+    python -m benchmarks micro --output before.json
+    python -m benchmarks micro --baseline before.json --fail-on-regression
+    python -m benchmarks load --sizes film-2h --concurrency 16 --requests 500
+    python -m benchmarks generate --size season-24h season.srt
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+from .load import DEFAULT_CONCURRENCY, DEFAULT_REQUESTS, run_load
+from .micro import DEFAULT_MIN_TIME, run_micro
+from .report import DEFAULT_REGRESSION_THRESHOLD, compare, environment, format_table, load_report
+from .synthetic import SIZES, write_srt
+
+
+def _sizes(value: str) -> List[str]:
+    sizes = [size.strip() for size in value.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown size(s) {', '.join(unknown)}; choose from {', '.join(SIZES)}.")
+    return sizes
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="Write a synthetic SRT file.")
+    generate.add_argument("path", type=Path)
+    generate.add_argument("--size", choices=list(SIZES), default="film-2h")
+    generate.add_argument("--seed", type=int, default=0)
+
+    for name, help_text, default_sizes in (
+        ("micro", "Microbenchmarks of loading and context extraction.", ",".join(SIZES)),
+        ("load", "End-to-end /context and /ask load test against a stub LLM.", "film-2h"),
+        ("all", "Microbenchmarks followed by the load test.", ",".join(SIZES)),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--sizes", type=_sizes, default=_sizes(default_sizes), help=f"Comma-separated subset of {', '.join(SIZES)}.")
+        command.add_argument("--output", type=Path, help="Write the JSON report here instead of stdout.")
+        command.add_argument("--baseline", type=Path, help="Earlier JSON report to compare against.")
+        command.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD, help="Allowed slowdown as a fraction (default 0.10).")
+        command.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 when a benchmark regresses.")
+        command.add_argument("--workdir", type=Path, help="Scratch directory (defaults to a temporary one).")
+        if name in ("micro", "all"):
+            command.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME, help="Seconds to sample each microbenchmark.")
+            command.add_argument("--filter", dest="name_filter", help="Only run microbenchmarks whose name contains this.")
+        if name in ("load", "all"):
+            command.add_argument("--requests", type=int, default=DEFAULT_REQUESTS, help="Requests per endpoint and size.")
+            command.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Concurrent clients.")
+            command.add_argument("--workers", type=int, default=1, help="uvicorn worker processes.")
+            command.add_argument("--llm-delay", type=float, default=0.0, help="Seconds the stub LLM waits before answering.")
+    return parser.parse_args()
+
+
+def _progress(name: str) -> None:
+    print(f"running {name}", file=sys.stderr, flush=True)
+
+
+def _run(args: argparse.Namespace, workdir: Path) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    if args.command in ("micro", "all"):
+        results.update(
+            run_micro(args.sizes, workdir, min_time=args.min_time, name_filter=args.name_filter, progress=_progress)
+        )
+    if args.command in ("load", "all"):
+        results.update(
+            run_load(
+                args.sizes,
+                workdir / "server",
+                requests=args.requests,
+                concurrency=args.concurrency,
+                workers=args.workers,
+                llm_delay=args.llm_delay,
+                progress=_progress,
+            )
+        )
+    return results
+
+
+def main() -> int:
+    args = _parse_args()
+    if args.command == "generate":
+        write_srt(args.path, SIZES[args.size], seed=args.seed)
+        return 0
+
+    if args.workdir is not None:
+        args.workdir.mkdir(parents=True, exist_ok=True)
+        results = _run(args, args.workdir)
+    else:
+        with tempfile.TemporaryDirectory(prefix="stevie-bench-") as workdir:
+            results = _run(args, Path(workdir))
+
+    comparison = None
+    if args.baseline is not None:
+        comparison = compare(results, load_report(args.baseline).get("results", {}), threshold=args.threshold)
+    report = {
+        "environment": environment(),
+        "config": {
+            key: (value if not isinstance(value, Path) else str(value))
+            for key, value in vars(args).items()
+            if key not in ("output", "baseline", "fail_on_regression", "workdir")
+        },
+        "results": results,
+    }
+    if comparison is not None:
+        report["baseline"] = str(args.baseline)
+        report["comparison"] = comparison
+
+    print(format_table(results, comparison), file=sys.stderr)
+    encoded = json.dumps(report, indent=2)
+    if args.output is not None:
+        args.output.write_text(encoded + "\n", encoding="utf-8")
+    else:
+        print(encoded)
+    if args.fail_on_regression and comparison and any(entry["regressed"] for entry in comparison.values()):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
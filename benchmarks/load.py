@@ -0,0 +1,205 @@
+"""End-to-end load test of `/context` and `/ask` against a stub LLM server.
+
+The API runs under uvicorn in a separate process, exactly as `run_server.py`
+would start it, with `OLLAMA_BASE_URL` pointing at `benchmarks.stub_llm`.
+Its working directory is a scratch directory, so history and library files
+never touch `data/`. Any other server setting (token budget, retrieval
+backend, cache sizes) is taken from the environment.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import httpx
+
+from movie_companion.time_utils import format_seconds
+
+from .micro import POSITIONS
+from .report import summarize
+from .synthetic import SIZES, generate_srt
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_REQUESTS = 200
+DEFAULT_CONCURRENCY = 8
+DEFAULT_WARMUP_REQUESTS = 5
+STARTUP_TIMEOUT_SECONDS = 30.0
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_up(url: str, process: subprocess.Popen) -> None:
+    deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited during startup with code {process.returncode}.")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not start within {STARTUP_TIMEOUT_SECONDS:.0f}s.")
+
+
+@contextmanager
+def _process(args: List[str], *, url: str, cwd: Path, env: Dict[str, str]) -> Iterator[None]:
+    process = subprocess.Popen(args, cwd=cwd, env=env)
+    try:
+        _wait_until_up(url, process)
+        yield
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+@contextmanager
+def running_servers(workdir: Path, *, workers: int = 1, llm_delay: float = 0.0) -> Iterator[str]:
+    """Start the stub LLM and the API server; yield the API base URL."""
+
+    workdir.mkdir(parents=True, exist_ok=True)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(REPO_ROOT), env.get("PYTHONPATH")]))
+    llm_port, api_port = _free_port(), _free_port()
+    llm_url = f"http://127.0.0.1:{llm_port}"
+    api_url = f"http://127.0.0.1:{api_port}"
+    env.update(
+        {
+            "OLLAMA_BASE_URL": llm_url,
+            "LIBRARY_PATH": str(workdir / "library.json"),
+            "MEDIA_DIR": str(workdir / "media"),
+        }
+    )
+    if workers > 1:
+        env["SHARED_STATE"] = "1"
+    stub = [sys.executable, "-m", "benchmarks.stub_llm", "--port", str(llm_port), "--delay", str(llm_delay)]
+    api = [
+        sys.executable, "-m", "uvicorn", "movie_companion.server:create_app", "--factory",
+        "--host", "127.0.0.1", "--port", str(api_port), "--workers", str(workers), "--log-level", "warning",
+    ]  # fmt: skip
+    with _process(stub, url=llm_url, cwd=workdir, env=env):
+        with _process(api, url=f"{api_url}/health", cwd=workdir, env=env):
+            yield api_url
+
+
+async def _drive(
+    client: httpx.AsyncClient,
+    path: str,
+    make_payload: Callable[[int], Dict[str, object]],
+    *,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> Dict[str, float]:
+    for number in range(warmup):
+        (await client.post(path, json=make_payload(-1 - number))).raise_for_status()
+
+    latencies: List[int] = []
+    errors = 0
+    issued = 0
+
+    async def worker() -> None:
+        nonlocal issued, errors
+        while issued < requests:
+            number = issued
+            issued += 1
+            payload = make_payload(number)
+            before = time.perf_counter_ns()
+            try:
+                response = await client.post(path, json=payload)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter_ns() - before)
+            else:
+                errors += 1
+
+    started = time.perf_counter_ns()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return summarize(latencies, elapsed_ns=time.perf_counter_ns() - started, errors=errors)
+
+
+def _payloads(size: str, *, seed: int = 0) -> Tuple[Callable[[int], Dict[str, object]], Callable[[int], Dict[str, object]]]:
+    duration = SIZES[size]
+    text = generate_srt(duration, seed=seed)
+    rng = random.Random(seed)
+    # Requests cycle through the early/middle/late positions, a little jittered.
+    timestamps = [
+        format_seconds(int(duration * fraction) + rng.randint(-60, 60))
+        for _ in range(64)
+        for fraction in POSITIONS.values()
+    ]
+
+    def context(number: int) -> Dict[str, object]:
+        return {"title": "Benchmark", "question": "", "timestamp": timestamps[number % len(timestamps)], "subtitles_text": text}
+
+    def ask(number: int) -> Dict[str, object]:
+        return {
+            **context(number),
+            # Distinct questions, so the answer cache does not turn the run into cache hits.
+            "question": f"What just happened? ({number})",
+            "provider": "ollama",
+            "model": "stub",
+        }
+
+    return context, ask
+
+
+async def _run_all(
+    api_url: str, sizes: Iterable[str], *, requests: int, concurrency: int, progress: Optional[Callable[[str], None]]
+) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=api_url, timeout=120.0, limits=limits) as client:
+        for size in sizes:
+            context, ask = _payloads(size)
+            for path, make_payload in (("/context", context), ("/ask", ask)):
+                name = f"POST {path}[{size}]"
+                if progress is not None:
+                    progress(name)
+                results[name] = await _drive(
+                    client,
+                    path,
+                    make_payload,
+                    requests=requests,
+                    concurrency=concurrency,
+                    warmup=DEFAULT_WARMUP_REQUESTS,
+                )
+    return results
+
+
+def run_load(
+    sizes: Iterable[str],
+    workdir: str | Path,
+    *,
+    requests: int = DEFAULT_REQUESTS,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    workers: int = 1,
+    llm_delay: float = 0.0,
+    progress: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Dict[str, float]]:
+    """Load-test `/context` and `/ask` for each subtitle size with a closed loop of `concurrency` clients."""
+
+    with running_servers(Path(workdir), workers=workers, llm_delay=llm_delay) as api_url:
+        return asyncio.run(
+            _run_all(api_url, list(sizes), requests=requests, concurrency=concurrency, progress=progress)
+        )
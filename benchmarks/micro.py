@@ -0,0 +1,101 @@
+"""Microbenchmarks for subtitle loading, timestamp parsing and context extraction."""
+
+from __future__ import annotations
+
+import gc
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from movie_companion.subtitles import extract_context, extract_context_from_text, load_subtitles
+from movie_companion.time_utils import format_seconds, parse_timestamp
+from movie_companion.track_format import write_track
+
+from .report import summarize
+from .synthetic import SIZES, write_srt
+
+
+# Playback positions as fractions of the running time.
+POSITIONS: Dict[str, float] = {"early": 0.1, "middle": 0.5, "late": 0.9}
+
+DEFAULT_MIN_TIME = 1.0
+DEFAULT_MIN_SAMPLES = 20
+DEFAULT_MAX_SAMPLES = 200_000
+
+
+def measure(
+    func: Callable[[], object],
+    *,
+    min_time: float = DEFAULT_MIN_TIME,
+    min_samples: int = DEFAULT_MIN_SAMPLES,
+    max_samples: int = DEFAULT_MAX_SAMPLES,
+) -> Dict[str, float]:
+    """Time single calls of `func` until `min_time` seconds and `min_samples` calls have passed."""
+
+    for _ in range(3):
+        func()
+    gc.collect()
+    latencies: List[int] = []
+    clock = time.perf_counter_ns
+    deadline = clock() + int(min_time * 1e9)
+    started = clock()
+    while len(latencies) < max_samples:
+        before = clock()
+        func()
+        after = clock()
+        latencies.append(after - before)
+        if after >= deadline and len(latencies) >= min_samples:
+            break
+    return summarize(latencies, elapsed_ns=clock() - started)
+
+
+def _benchmarks(sizes: Iterable[str], workdir: Path) -> List[Tuple[str, Callable[[], object]]]:
+    benchmarks: List[Tuple[str, Callable[[], object]]] = [
+        ("parse_timestamp[hh:mm:ss]", lambda: parse_timestamp("01:23:45")),
+        ("parse_timestamp[seconds]", lambda: parse_timestamp("5025")),
+    ]
+    for size in sizes:
+        duration = SIZES[size]
+        srt_path = write_srt(workdir / f"{size}.srt", duration)
+        text = srt_path.read_text(encoding="utf-8")
+        index = load_subtitles(srt_path)
+        track_path = workdir / f"{size}.track"
+        write_track(track_path, index)
+
+        benchmarks.append((f"load_subtitles[{size}]", lambda path=srt_path: load_subtitles(path)))
+        benchmarks.append((f"load_subtitles[{size}.track]", lambda path=track_path: load_subtitles(path)))
+        for position, fraction in POSITIONS.items():
+            timestamp = format_seconds(int(duration * fraction))
+            benchmarks.append(
+                (
+                    f"extract_context_from_text[{size}@{position}]",
+                    lambda text=text, timestamp=timestamp: extract_context_from_text(text, timestamp),
+                )
+            )
+            benchmarks.append(
+                (
+                    f"extract_context[{size}@{position}]",
+                    lambda index=index, timestamp=timestamp: extract_context(index, timestamp),
+                )
+            )
+    return benchmarks
+
+
+def run_micro(
+    sizes: Iterable[str],
+    workdir: str | Path,
+    *,
+    min_time: float = DEFAULT_MIN_TIME,
+    name_filter: Optional[str] = None,
+    progress: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Dict[str, float]]:
+    """Run every microbenchmark (or those whose name contains `name_filter`)."""
+
+    results: Dict[str, Dict[str, float]] = {}
+    for name, func in _benchmarks(sizes, Path(workdir)):
+        if name_filter and name_filter not in name:
+            continue
+        if progress is not None:
+            progress(name)
+        results[name] = measure(func, min_time=min_time)
+    return results
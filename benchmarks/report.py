@@ -0,0 +1,123 @@
+"""Latency summaries, JSON reports and baseline comparison."""
+
+from __future__ import annotations
+
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+
+DEFAULT_REGRESSION_THRESHOLD = 0.10
+
+
+def summarize(latencies_ns: Sequence[int], *, elapsed_ns: int, errors: int = 0) -> Dict[str, float]:
+    """Summarize per-operation latencies into milliseconds and throughput.
+
+    `elapsed_ns` is the wall time of the whole run, so `ops_per_sec`
+    reflects concurrency in load tests rather than just inverse latency.
+    """
+
+    if not latencies_ns:
+        return {"samples": 0, "errors": errors}
+    ordered = sorted(latencies_ns)
+    if len(ordered) > 1:
+        cuts = statistics.quantiles(ordered, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = ordered[0]
+    return {
+        "samples": len(ordered),
+        "errors": errors,
+        "p50_ms": round(p50 / 1e6, 6),
+        "p95_ms": round(p95 / 1e6, 6),
+        "p99_ms": round(p99 / 1e6, 6),
+        "mean_ms": round(statistics.fmean(ordered) / 1e6, 6),
+        "max_ms": round(ordered[-1] / 1e6, 6),
+        "ops_per_sec": round(len(ordered) / (elapsed_ns / 1e9), 2) if elapsed_ns > 0 else 0.0,
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        completed = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).resolve().parent,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return completed.stdout.strip() or None
+
+
+def environment() -> Dict[str, object]:
+    """Details that make results from different machines distinguishable."""
+
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "revision": _git_revision(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    *,
+    threshold: float = DEFAULT_REGRESSION_THRESHOLD,
+) -> Dict[str, Dict[str, object]]:
+    """Compare benchmarks present in both runs.
+
+    A benchmark regresses when its p50 latency grows, or its throughput
+    drops, by more than `threshold` (a fraction) against the baseline.
+    """
+
+    comparison: Dict[str, Dict[str, object]] = {}
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous or not previous.get("samples") or not current.get("samples"):
+            continue
+        p50_ratio = current["p50_ms"] / previous["p50_ms"] if previous["p50_ms"] else 1.0
+        ops_ratio = current["ops_per_sec"] / previous["ops_per_sec"] if previous["ops_per_sec"] else 1.0
+        comparison[name] = {
+            "p50_change": round(p50_ratio - 1.0, 4),
+            "p99_change": round(current["p99_ms"] / previous["p99_ms"] - 1.0, 4) if previous["p99_ms"] else 0.0,
+            "ops_per_sec_change": round(ops_ratio - 1.0, 4),
+            "regressed": p50_ratio > 1.0 + threshold or ops_ratio < 1.0 - threshold,
+        }
+    return comparison
+
+
+def load_report(path: str | Path) -> Dict[str, object]:
+    with Path(path).open("r", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def format_table(results: Dict[str, Dict[str, float]], comparison: Optional[Dict[str, Dict[str, object]]] = None) -> str:
+    """Render results as a fixed-width table for the terminal."""
+
+    comparison = comparison or {}
+    header = f"{'benchmark':<48} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'ops/sec':>12} {'vs base':>9}"
+    lines: List[str] = [header, "-" * len(header)]
+    for name, summary in results.items():
+        if not summary.get("samples"):
+            lines.append(f"{name:<48} {'no samples':>10}")
+            continue
+        change = ""
+        if name in comparison:
+            delta = comparison[name]["p50_change"]
+            change = f"{delta:+.1%}" + (" !" if comparison[name]["regressed"] else "")
+        lines.append(
+            f"{name:<48} {summary['p50_ms']:>10.4f} {summary['p95_ms']:>10.4f} "
+            f"{summary['p99_ms']:>10.4f} {summary['ops_per_sec']:>12.1f} {change:>9}"
+        )
+    return "\n".join(lines)
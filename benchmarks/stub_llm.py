@@ -0,0 +1,64 @@
+"""Minimal stand-in for the Ollama chat API, so load tests never reach a real model.
+
+Run with ``python -m benchmarks.stub_llm --port 11500 [--delay 0.05]``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    delay = 0.0
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+    def _send(self, body: bytes, content_type: str = "application/json") -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        self._send(b'{"models": []}')
+
+    def do_POST(self) -> None:
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.delay:
+            time.sleep(self.delay)
+        if request.get("stream"):
+            chunks = [{"message": {"content": word + " "}, "done": False} for word in ("A", "stub", "answer.")]
+            chunks.append({"message": {"content": ""}, "done": True})
+            self._send("".join(json.dumps(chunk) + "\n" for chunk in chunks).encode(), "application/x-ndjson")
+            return
+        self._send(json.dumps({"message": {"content": "A stub answer."}, "done": True}).encode())
+
+
+def serve(port: int, *, delay: float = 0.0, host: str = "127.0.0.1") -> None:
+    """Answer every chat request after `delay` seconds until interrupted."""
+
+    handler = type("StubHandler", (_Handler,), {"delay": delay})
+    with ThreadingHTTPServer((host, port), handler) as server:
+        server.daemon_threads = True
+        server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before answering.")
+    args = parser.parse_args()
+    try:
+        serve(args.port, delay=args.delay)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Deterministic synthetic SRT files, from a short film to a full season."""
+
+from __future__ import annotations
+
+import random
+from pathlib import Path
+from typing import Dict, List
+
+from movie_companion.time_utils import format_seconds
+
+
+# Named sizes used by the benchmarks; values are running times in seconds.
+SIZES: Dict[str, int] = {
+    "film-30m": 30 * 60,
+    "film-2h": 2 * 3600,
+    "season-24h": 24 * 3600,
+}
+
+_NAMES = ["Stevie", "Mara", "Jonah", "Priya", "Okafor", "Lena", "Dmitri", "Aiko", "Rafael", "Noor"]
+_WORDS = (
+    "the a we you they it this that there here now never always maybe again "
+    "door ship city road night storm dragon letter key signal engine river "
+    "found lost left know think said told wait run hide open closed burning "
+    "tomorrow tonight before after inside outside together alone quickly "
+    "why where who how what when really only still just even"
+).split()
+# Sprinkled in so the UTF-8 and normalization paths are exercised.
+_EXTRAS = ["café", "naïve", "señor", "Москва", "東京", "♪", "…", "—"]
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(3, 11))]
+    if rng.random() < 0.08:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(_EXTRAS))
+    text = " ".join(words)
+    return text[0].upper() + text[1:] + rng.choice([".", ".", ".", "?", "!", "..."])
+
+
+def _cue_text(rng: random.Random) -> str:
+    lines = [_sentence(rng) for _ in range(1 if rng.random() < 0.7 else 2)]
+    if rng.random() < 0.2:
+        lines[0] = f"{rng.choice(_NAMES).upper()}: {lines[0]}"
+    if rng.random() < 0.05:
+        lines = [f"<i>{line}</i>" for line in lines]
+    return "\n".join(lines)
+
+
+def _srt_time(milliseconds: int) -> str:
+    return f"{format_seconds(milliseconds // 1000)},{milliseconds % 1000:03d}"
+
+
+def generate_srt(duration_seconds: int, *, seed: int = 0) -> str:
+    """Return SRT text with dialogue spread over `duration_seconds`.
+
+    Cues last one to six seconds with gaps of up to eight (and the odd long
+    silence), which gives roughly the cue density of real films. The same
+    seed always gives the same file.
+    """
+
+    rng = random.Random(seed)
+    limit = duration_seconds * 1000
+    blocks: List[str] = []
+    position = rng.randint(0, 5000)
+    while True:
+        start = position
+        end = start + rng.randint(1000, 6000)
+        if end > limit:
+            break
+        blocks.append(f"{len(blocks) + 1}\n{_srt_time(start)} --> {_srt_time(end)}\n{_cue_text(rng)}\n")
+        gap = rng.randint(30_000, 120_000) if rng.random() < 0.01 else rng.randint(0, 8000)
+        position = end + gap
+    return "\n".join(blocks)
+
+
+def write_srt(path: str | Path, duration_seconds: int, *, seed: int = 0) -> Path:
+    """Write `generate_srt(duration_seconds, seed=seed)` to `path` and return it."""
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(generate_srt(duration_seconds, seed=seed), encoding="utf-8")
+    return path
@@ -0,0 +1,206 @@
+"""Cache of generated answers for repeated questions at nearby timestamps."""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+DEFAULT_ANSWER_CACHE_MAX_ENTRIES = 2048
+DEFAULT_ANSWER_CACHE_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_TIMESTAMP_BUCKET_SECONDS = 60
+
+_NON_WORD = re.compile(r"[^\w]+")
+# Only words that never change what is asked; "like", "just" or even "the" can.
+_FILLER_WORDS = frozenset({"um", "uh", "hey", "please"})
+
+
+def normalize_question(question: str) -> str:
+    """Reduce a question to a canonical form so trivial rewordings share a cache entry."""
+
+    words = _NON_WORD.sub(" ", question.casefold()).split()
+    return " ".join(word for word in words if word not in _FILLER_WORDS)
+
+
+@dataclass
+class CachedAnswer:
+    answer: str
+    timestamp: int  # playback second the answer was generated for
+    created: float  # wall-clock time, used for TTL
+
+
+class AnswerCache:
+    """LRU + TTL cache of answers with an optional SQLite backing store.
+
+    Keys combine the title, model, a playback-time bucket, a hash of the
+    extracted subtitle context and the normalized question. To keep the spoiler
+    guarantee an entry is only served to requests at or after the timestamp it
+    was generated for; when two requests in a bucket race, the earliest answer
+    is kept because it is safe for more viewers.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = DEFAULT_ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_ANSWER_CACHE_TTL_SECONDS,
+        bucket_seconds: int = DEFAULT_TIMESTAMP_BUCKET_SECONDS,
+        path: str | Path | None = None,
+    ) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.bucket_seconds = max(1, bucket_seconds)
+        self._entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if path is not None:
+            self._db = self._open_store(Path(path))
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.spoiler_skips = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    # Internal helpers -------------------------------------------------
+    @staticmethod
+    def _open_store(path: Path) -> sqlite3.Connection:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        # WAL lets several server workers read while one writes.
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " key TEXT PRIMARY KEY, answer TEXT NOT NULL,"
+            " timestamp INTEGER NOT NULL, created REAL NOT NULL)"
+        )
+        db.commit()
+        return db
+
+    def _expired(self, entry: CachedAnswer, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - entry.created > self.ttl_seconds
+
+    def _remember(self, key: str, entry: CachedAnswer) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _load_from_store(self, key: str) -> Optional[CachedAnswer]:
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT answer, timestamp, created FROM answers WHERE key = ?", (key,)
+        ).fetchone()
+        return CachedAnswer(*row) if row else None
+
+    # Public API -------------------------------------------------------
+    def make_key(
+        self,
+        *,
+        title: str,
+        model: str,
+        timestamp: int,
+        context: str,
+        question: str,
+        previously_watched: Optional[List[str]] = None,
+    ) -> str:
+        """Build the cache key for a question."""
+
+        digest = hashlib.sha256()
+        for part in (
+            title,
+            model,
+            str(timestamp // self.bucket_seconds),
+            hashlib.sha256(context.encode("utf-8")).hexdigest(),
+            normalize_question(question),
+            "\x1f".join(sorted(previously_watched or [])),
+        ):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def get(self, key: str, timestamp: int) -> Optional[str]:
+        """Return a cached answer usable at `timestamp`, or `None`."""
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            from_disk = False
+            if entry is None:
+                entry = self._load_from_store(key)
+                from_disk = entry is not None
+            if entry is not None and self._expired(entry, now):
+                self._entries.pop(key, None)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.timestamp > timestamp:
+                # Generated further into the title than the viewer is: never serve it.
+                self.spoiler_skips += 1
+                self.misses += 1
+                return None
+            self._remember(key, entry)
+            self.hits += 1
+            if from_disk:
+                self.disk_hits += 1
+            return entry.answer
+
+    def put(self, key: str, timestamp: int, answer: str) -> None:
+        """Store an answer generated at `timestamp`, keeping the earliest one per key."""
+
+        entry = CachedAnswer(answer=answer, timestamp=timestamp, created=time.time())
+        with self._lock:
+            existing = self._entries.get(key) or self._load_from_store(key)
+            if (
+                existing is not None
+                and existing.timestamp <= timestamp
+                and not self._expired(existing, entry.created)
+            ):
+                self._remember(key, existing)
+                return
+            self._remember(key, entry)
+            if self._db is not None:
+                ttl = self.ttl_seconds if self.ttl_seconds > 0 else float("inf")
+                self._db.execute(
+                    "INSERT INTO answers (key, answer, timestamp, created) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET answer = excluded.answer, "
+                    "timestamp = excluded.timestamp, created = excluded.created "
+                    "WHERE excluded.timestamp < answers.timestamp "
+                    "OR answers.created < excluded.created - ?",
+                    (key, entry.answer, entry.timestamp, entry.created, ttl),
+                )
+                self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> Dict[str, float]:
+        """Return size, hit-rate and eviction counters."""
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "spoiler_skips": self.spoiler_skips,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
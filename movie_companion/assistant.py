@@ -2,12 +2,17 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional
+from typing import AsyncIterator, Iterator, List, Optional
 
+from .answer_cache import AnswerCache, normalize_question
 from .history import WatchedHistory
 from .llm import LLMClient, LLMSettings
+from .retrieval import DEFAULT_RETRIEVAL_TOP_K, retrieve_passages
+from .singleflight import SingleFlight
 from .subtitles import extract_context, load_subtitles, SubtitleLoaderError
 from .time_utils import parse_timestamp, TimestampParseError, format_seconds
 
@@ -23,14 +28,39 @@ class CompanionConfig:
     max_output_tokens: int = 350
     ollama_base_url: str = "http://localhost:11434"
     system_prompt: Optional[str] = None
+    request_timeout: float = 60.0
+    ollama_keep_alive: Optional[str] = None
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    max_concurrency: int = 32
+    retrieval_top_k: int = DEFAULT_RETRIEVAL_TOP_K
+
+
+def _keyed_context(
+    context: str, passages: Optional[List[str]], summaries: Optional[List[str]] = None
+) -> str:
+    """Fold retrieved passages and scene summaries into the context used for cache and flight keys."""
+    if not passages and not summaries:
+        return context
+    return "\x1e".join([context, *(passages or []), "\x1d", *(summaries or [])])
 
 
 class MovieCompanion:
     """User-facing orchestration class."""
 
-    def __init__(self, config: Optional[CompanionConfig] = None, *, api_key: Optional[str] = None) -> None:
+    def __init__(
+        self,
+        config: Optional[CompanionConfig] = None,
+        *,
+        api_key: Optional[str] = None,
+        history: Optional[WatchedHistory] = None,
+        answer_cache: Optional[AnswerCache] = None,
+        flights: Optional[SingleFlight] = None,
+    ) -> None:
         self.config = config or CompanionConfig()
-        self.history = WatchedHistory(self.config.history_path)
+        self.history = history or WatchedHistory(self.config.history_path)
+        self.answer_cache = answer_cache
+        self.flights = flights
         llm_settings = LLMSettings(
             provider=self.config.provider,
             model=self.config.model,
@@ -38,8 +68,63 @@ class MovieCompanion:
             max_output_tokens=self.config.max_output_tokens,
             ollama_base_url=self.config.ollama_base_url,
             system_prompt=self.config.system_prompt,
+            request_timeout=self.config.request_timeout,
+            ollama_keep_alive=self.config.ollama_keep_alive,
+            max_connections=self.config.max_connections,
+            max_keepalive_connections=self.config.max_keepalive_connections,
+            max_concurrency=self.config.max_concurrency,
         )
         self.llm = LLMClient(llm_settings, api_key=api_key)
+        self._model_key = (
+            f"{self.llm.provider}:{self.config.model}:"
+            f"{self.config.temperature}:{self.config.max_output_tokens}"
+        )
+
+    def _answer_cache_key(
+        self,
+        title: str,
+        seconds: int,
+        context: str,
+        question: str,
+        previously_watched: Optional[List[str]],
+        passages: Optional[List[str]] = None,
+        summaries: Optional[List[str]] = None,
+    ) -> Optional[str]:
+        if self.answer_cache is None:
+            return None
+        return self.answer_cache.make_key(
+            title=title,
+            model=self._model_key,
+            timestamp=seconds,
+            context=_keyed_context(context, passages, summaries),
+            question=question,
+            previously_watched=previously_watched,
+        )
+
+    def _flight_key(
+        self,
+        title: str,
+        seconds: int,
+        context: str,
+        question: str,
+        previously_watched: Optional[List[str]],
+        passages: Optional[List[str]] = None,
+        summaries: Optional[List[str]] = None,
+    ) -> str:
+        # Exact timestamp (not the answer-cache bucket): only truly identical
+        # requests may share an answer.
+        digest = hashlib.sha256()
+        for part in (
+            title,
+            self._model_key,
+            str(seconds),
+            _keyed_context(context, passages, summaries),
+            normalize_question(question),
+            "\x1f".join(sorted(previously_watched or [])),
+        ):
+            digest.update(part.encode("utf-8", "surrogatepass"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
 
     def answer_question(
         self,
@@ -63,17 +148,54 @@ class MovieCompanion:
             raise FileNotFoundError(str(exc)) from exc
 
         context = extract_context(subtitles, seconds)
-        history_record = self.history.get(title)
-
-        answer = self.llm.answer(
+        passages = retrieve_passages(subtitles, question, seconds, top_k=self.config.retrieval_top_k)
+        return self.answer_from_context(
             title=title,
-            timestamp=format_seconds(seconds),
-            question=question,
             context=context,
-            history=history_record,
+            timestamp=seconds,
+            question=question,
             previously_watched=previously_watched,
+            passages=passages,
         )
 
+    def answer_from_context(
+        self,
+        *,
+        title: str,
+        context: str,
+        timestamp: str | int,
+        question: str,
+        previously_watched: Optional[List[str]] = None,
+        passages: Optional[List[str]] = None,
+        summaries: Optional[List[str]] = None,
+        watched_limit: Optional[int] = None,
+    ) -> str:
+        """Answer a viewer question from subtitle context that was already extracted."""
+
+        try:
+            seconds = parse_timestamp(timestamp)
+        except TimestampParseError as exc:
+            raise ValueError(f"Invalid timestamp: {exc}") from exc
+
+        cache_key = self._answer_cache_key(
+            title, seconds, context, question, previously_watched, passages, summaries
+        )
+        answer = self.answer_cache.get(cache_key, seconds) if cache_key else None
+        if answer is None:
+            answer = self.llm.answer(
+                title=title,
+                timestamp=format_seconds(seconds),
+                question=question,
+                context=context,
+                history=self.history.get(title),
+                previously_watched=previously_watched,
+                passages=passages,
+                summaries=summaries,
+                watched_limit=watched_limit,
+            )
+            if cache_key:
+                self.answer_cache.put(cache_key, seconds, answer)
+
         # Persist progress after generating the answer.
         self.history.record_viewing(
             title=title,
@@ -82,3 +204,173 @@ class MovieCompanion:
         )
 
         return answer
+
+    def stream_from_context(
+        self,
+        *,
+        title: str,
+        context: str,
+        timestamp: str | int,
+        question: str,
+        previously_watched: Optional[List[str]] = None,
+        passages: Optional[List[str]] = None,
+        summaries: Optional[List[str]] = None,
+        watched_limit: Optional[int] = None,
+    ) -> Iterator[str]:
+        """Stream an answer in text chunks; history is persisted once the answer completes."""
+
+        try:
+            seconds = parse_timestamp(timestamp)
+        except TimestampParseError as exc:
+            raise ValueError(f"Invalid timestamp: {exc}") from exc
+
+        cache_key = self._answer_cache_key(
+            title, seconds, context, question, previously_watched, passages, summaries
+        )
+        cached = self.answer_cache.get(cache_key, seconds) if cache_key else None
+        if cached is not None:
+            yield cached
+        else:
+            parts: List[str] = []
+            for chunk in self.llm.stream_answer(
+                title=title,
+                timestamp=format_seconds(seconds),
+                question=question,
+                context=context,
+                history=self.history.get(title),
+                previously_watched=previously_watched,
+                passages=passages,
+                summaries=summaries,
+                watched_limit=watched_limit,
+            ):
+                parts.append(chunk)
+                yield chunk
+            if cache_key:
+                self.answer_cache.put(cache_key, seconds, "".join(parts).strip())
+
+        self.history.record_viewing(
+            title=title,
+            timestamp_seconds=seconds,
+            previously_watched=previously_watched,
+        )
+
+    async def aanswer_from_context(
+        self,
+        *,
+        title: str,
+        context: str,
+        timestamp: str | int,
+        question: str,
+        previously_watched: Optional[List[str]] = None,
+        passages: Optional[List[str]] = None,
+        summaries: Optional[List[str]] = None,
+        watched_limit: Optional[int] = None,
+    ) -> str:
+        """Async variant of `answer_from_context` using the pooled async LLM client."""
+
+        try:
+            seconds = parse_timestamp(timestamp)
+        except TimestampParseError as exc:
+            raise ValueError(f"Invalid timestamp: {exc}") from exc
+
+        cache_key = self._answer_cache_key(
+            title, seconds, context, question, previously_watched, passages, summaries
+        )
+        answer = self.answer_cache.get(cache_key, seconds) if cache_key else None
+        if answer is None:
+
+            async def generate() -> str:
+                generated = await self.llm.aanswer(
+                    title=title,
+                    timestamp=format_seconds(seconds),
+                    question=question,
+                    context=context,
+                    history=self.history.get(title),
+                    previously_watched=previously_watched,
+                    passages=passages,
+                    summaries=summaries,
+                    watched_limit=watched_limit,
+                )
+                if cache_key:
+                    self.answer_cache.put(cache_key, seconds, generated)
+                return generated
+
+            if self.flights is None:
+                answer = await generate()
+            else:
+                flight_key = self._flight_key(
+                    title, seconds, context, question, previously_watched, passages, summaries
+                )
+                answer = await self.flights.do(flight_key, generate)
+
+        # History writes touch the disk, so keep them off the event loop.
+        await asyncio.to_thread(
+            self.history.record_viewing,
+            title=title,
+            timestamp_seconds=seconds,
+            previously_watched=previously_watched,
+        )
+
+        return answer
+
+    async def astream_from_context(
+        self,
+        *,
+        title: str,
+        context: str,
+        timestamp: str | int,
+        question: str,
+        previously_watched: Optional[List[str]] = None,
+        passages: Optional[List[str]] = None,
+        summaries: Optional[List[str]] = None,
+        watched_limit: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        """Async variant of `stream_from_context` using the pooled async LLM client."""
+
+        try:
+            seconds = parse_timestamp(timestamp)
+        except TimestampParseError as exc:
+            raise ValueError(f"Invalid timestamp: {exc}") from exc
+
+        cache_key = self._answer_cache_key(
+            title, seconds, context, question, previously_watched, passages, summaries
+        )
+        cached = self.answer_cache.get(cache_key, seconds) if cache_key else None
+        if cached is not None:
+            yield cached
+        else:
+
+            async def generate() -> AsyncIterator[str]:
+                parts: List[str] = []
+                async for chunk in self.llm.astream_answer(
+                    title=title,
+                    timestamp=format_seconds(seconds),
+                    question=question,
+                    context=context,
+                    history=self.history.get(title),
+                    previously_watched=previously_watched,
+                    passages=passages,
+                    summaries=summaries,
+                    watched_limit=watched_limit,
+                ):
+                    parts.append(chunk)
+                    yield chunk
+                if cache_key:
+                    self.answer_cache.put(cache_key, seconds, "".join(parts).strip())
+
+            if self.flights is None:
+                chunks = generate()
+            else:
+                flight_key = self._flight_key(
+                    title, seconds, context, question, previously_watched, passages, summaries
+                )
+                chunks = self.flights.stream(flight_key, generate)
+            async for chunk in chunks:
+                yield chunk
+
+        await asyncio.to_thread(
+            self.history.record_viewing,
+            title=title,
+            timestamp_seconds=seconds,
+            previously_watched=previously_watched,
+        )
@@ -0,0 +1,294 @@
+"""Embedding retrieval of earlier subtitle passages, backed by per-track NumPy files."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import threading
+import weakref
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Protocol, Tuple
+
+import requests
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None  # type: ignore[assignment]
+
+from .retrieval import DEFAULT_RETRIEVAL_CHUNK_CUES, DEFAULT_RETRIEVAL_TOP_K, render_passages, tokenize
+from .subtitles import (
+    DEFAULT_CONTEXT_MAX_CHARACTERS,
+    DEFAULT_CONTEXT_WINDOW_SECONDS,
+    SubtitleIndex,
+    context_window,
+    track_fingerprint,
+)
+
+
+DEFAULT_EMBEDDING_CACHE_DIR = Path("data/embeddings")
+DEFAULT_HASHING_DIMENSIONS = 256
+DEFAULT_OLLAMA_EMBEDDING_MODEL = "nomic-embed-text"
+DEFAULT_EMBEDDING_BATCH_SIZE = 64
+
+
+class EmbeddingError(RuntimeError):
+    """Raised when embeddings cannot be computed or NumPy is unavailable."""
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise EmbeddingError("Embedding retrieval requires NumPy; install it with `pip install numpy`.")
+
+
+class Embedder(Protocol):
+    """Turns texts into rows of a float32 matrix."""
+
+    # Identifies the model and its settings; part of every cache file name.
+    name: str
+
+    def embed(self, texts: List[str]) -> "np.ndarray":
+        ...
+
+
+class HashingEmbedder:
+    """Deterministic bag-of-words embedder using signed feature hashing.
+
+    Needs no model or network, so it is useful for tests and offline runs;
+    similarity is roughly lexical overlap.
+    """
+
+    def __init__(self, dimensions: int = DEFAULT_HASHING_DIMENSIONS) -> None:
+        _require_numpy()
+        self.dimensions = max(1, dimensions)
+        self.name = f"hashing-{self.dimensions}"
+
+    def embed(self, texts: List[str]) -> "np.ndarray":
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in tokenize(text):
+                digest = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+                vectors[row, digest % self.dimensions] += 1.0 if digest >> 63 else -1.0
+        return vectors
+
+
+class OllamaEmbedder:
+    """Embeddings from a local Ollama server's `/api/embed` endpoint."""
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:11434",
+        model: str = DEFAULT_OLLAMA_EMBEDDING_MODEL,
+        *,
+        timeout: float = 60.0,
+        batch_size: int = DEFAULT_EMBEDDING_BATCH_SIZE,
+    ) -> None:
+        _require_numpy()
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.batch_size = max(1, batch_size)
+        self.name = f"ollama-{model}"
+
+    def embed(self, texts: List[str]) -> "np.ndarray":
+        rows: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start : start + self.batch_size]
+            try:
+                response = requests.post(
+                    f"{self.base_url}/api/embed",
+                    json={"model": self.model, "input": batch},
+                    timeout=self.timeout,
+                )
+                response.raise_for_status()
+                embeddings = response.json().get("embeddings") or []
+            except (requests.RequestException, ValueError) as exc:
+                raise EmbeddingError(f"Ollama embedding request failed: {exc}") from exc
+            if len(embeddings) != len(batch):
+                raise EmbeddingError("Ollama returned the wrong number of embeddings.")
+            rows.extend(embeddings)
+        return np.asarray(rows, dtype=np.float32).reshape(len(texts), -1)
+
+
+def _normalize_rows(vectors: "np.ndarray") -> "np.ndarray":
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+@dataclass
+class EmbeddingIndex:
+    """Unit-length chunk vectors in one contiguous float32 `(chunks, dim)` array.
+
+    Chunks are the same runs of `chunk_cues` consecutive end-sorted cues the
+    lexical index uses, so row order is end-time order. `vectors` may be a
+    read-only memory map of the cache file.
+    """
+
+    vectors: "np.ndarray"
+    chunk_cues: int
+    cues: int
+
+    def chunk_range(self, chunk_id: int) -> Tuple[int, int]:
+        lo = chunk_id * self.chunk_cues
+        return lo, min(lo + self.chunk_cues, self.cues)
+
+    def search(
+        self,
+        query: "np.ndarray",
+        *,
+        before_cue: int,
+        top_k: int = DEFAULT_RETRIEVAL_TOP_K,
+    ) -> List[Tuple[int, float]]:
+        """Return up to `top_k` `(chunk_id, cosine)` pairs, best first.
+
+        Only chunks made entirely of cues before `before_cue` are scored.
+        """
+
+        limit = min(max(0, before_cue) // self.chunk_cues, len(self.vectors))
+        if top_k <= 0 or limit == 0:
+            return []
+        norm = float(np.linalg.norm(query))
+        if norm == 0.0:
+            return []
+        scores = self.vectors[:limit] @ (query.astype(np.float32, copy=False) / norm)
+        if limit > top_k:
+            candidates = np.argpartition(scores, limit - top_k)[limit - top_k :]
+        else:
+            candidates = np.arange(limit)
+        best = candidates[np.argsort(scores[candidates])[::-1]]
+        return [(int(chunk_id), float(scores[chunk_id])) for chunk_id in best if scores[chunk_id] > 0]
+
+
+class EmbeddingStore:
+    """Builds, persists and memoizes embedding indexes per track.
+
+    Vectors are written once per (track content, embedder, chunk size) to
+    `<cache_dir>/<fingerprint>.npy` and memory-mapped on later loads, so a
+    track is embedded only once across restarts and worker processes.
+    """
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        *,
+        cache_dir: str | Path = DEFAULT_EMBEDDING_CACHE_DIR,
+        chunk_cues: int = DEFAULT_RETRIEVAL_CHUNK_CUES,
+    ) -> None:
+        _require_numpy()
+        self.embedder = embedder
+        self.cache_dir = Path(cache_dir)
+        self.chunk_cues = max(1, chunk_cues)
+        self._indexes: "weakref.WeakKeyDictionary[SubtitleIndex, EmbeddingIndex]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._build_locks: Dict[str, threading.Lock] = {}
+        self.memory_hits = 0
+        self.disk_loads = 0
+        self.builds = 0
+        self.queries = 0
+
+    def _path(self, track: SubtitleIndex) -> Path:
+        digest = hashlib.sha256(
+            f"{track_fingerprint(track)}:{self.embedder.name}:{self.chunk_cues}".encode("utf-8")
+        ).hexdigest()
+        return self.cache_dir / f"{digest}.npy"
+
+    def _build(self, track: SubtitleIndex, path: Path) -> "np.ndarray":
+        texts = [
+            track.text_between(lo, min(lo + self.chunk_cues, len(track)))
+            for lo in range(0, len(track), self.chunk_cues)
+        ]
+        vectors = _normalize_rows(self.embedder.embed(texts)) if texts else np.zeros((0, 1), np.float32)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                np.save(handle, np.ascontiguousarray(vectors))
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        return vectors
+
+    def index_for(self, track: SubtitleIndex) -> EmbeddingIndex:
+        """Return the embedding index for `track`, loading or building it once.
+
+        Raises:
+            EmbeddingError: If the embedder fails.
+        """
+
+        with self._lock:
+            index = self._indexes.get(track)
+            if index is not None:
+                self.memory_hits += 1
+                return index
+        path = self._path(track)
+        with self._lock:
+            build_lock = self._build_locks.setdefault(path.name, threading.Lock())
+        with build_lock:
+            with self._lock:
+                index = self._indexes.get(track)
+            if index is not None:
+                return index
+            chunks = -(-len(track) // self.chunk_cues)
+            try:
+                vectors = np.load(path, mmap_mode="r")
+                loaded = vectors.ndim == 2 and len(vectors) == chunks
+            except (FileNotFoundError, ValueError):
+                loaded = False
+            if not loaded:
+                vectors = self._build(track, path)
+            index = EmbeddingIndex(vectors=vectors, chunk_cues=self.chunk_cues, cues=len(track))
+            with self._lock:
+                self._indexes[track] = index
+                self._build_locks.pop(path.name, None)
+                if loaded:
+                    self.disk_loads += 1
+                else:
+                    self.builds += 1
+        return index
+
+    def retrieve_passages(
+        self,
+        track: SubtitleIndex,
+        question: str,
+        seconds: int,
+        *,
+        top_k: int = DEFAULT_RETRIEVAL_TOP_K,
+        window_seconds: Optional[int] = DEFAULT_CONTEXT_WINDOW_SECONDS,
+        max_characters: Optional[int] = DEFAULT_CONTEXT_MAX_CHARACTERS,
+        before_cue: Optional[int] = None,
+    ) -> List[str]:
+        """Embedding counterpart of `retrieval.retrieve_passages`.
+
+        Raises:
+            EmbeddingError: If the track or the question cannot be embedded.
+        """
+
+        if top_k <= 0:
+            return []
+        index = self.index_for(track)
+        lo = before_cue
+        if lo is None:
+            lo, _ = context_window(track, seconds, window_seconds=window_seconds, max_characters=max_characters)
+        if lo < self.chunk_cues:
+            return []
+        with self._lock:
+            self.queries += 1
+        query = self.embedder.embed([question])[0]
+        hits = index.search(query, before_cue=lo, top_k=top_k)
+        return render_passages(track, [index.chunk_range(chunk_id) for chunk_id, _ in hits])
+
+    def stats(self) -> Dict[str, int | str]:
+        """Return index counts and build/load counters."""
+        with self._lock:
+            return {
+                "embedder": self.embedder.name,
+                "indexes": len(self._indexes),
+                "memory_hits": self.memory_hits,
+                "disk_loads": self.disk_loads,
+                "builds": self.builds,
+                "queries": self.queries,
+            }
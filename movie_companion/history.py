@@ -1,40 +1,287 @@
-"""Simple JSON-backed watched history store."""
+"""Watched history store: a JSON snapshot plus an append-only JSONL journal."""
 
 from __future__ import annotations
 
 import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import ContextManager, Dict, List, Optional, Tuple
+
+from .file_lock import FileLock, file_signature
+
+
+DEFAULT_COMPACT_EVERY = 1000
+DEFAULT_FLUSH_MAX_BATCH = 256
+
+logger = logging.getLogger(__name__)
+
+_PendingKey = Tuple[str, str]  # (op, title)
+
+
+def _apply_event(data: Dict, event: Dict) -> None:
+    """Fold one journal event into the in-memory history."""
+
+    title = event.get("title")
+    if not isinstance(title, str):
+        return
+    record = data.setdefault("titles", {}).setdefault(
+        title, {"entries": [], "last_timestamp": 0}
+    )
+    op = event.get("op")
+    if op == "view":
+        record["last_timestamp"] = max(record.get("last_timestamp", 0), int(event.get("timestamp", 0)))
+        entries = event.get("entries") or []
+        if entries:
+            existing = set(record.setdefault("entries", []))
+            for entry in entries:
+                if entry not in existing:
+                    record["entries"].append(entry)
+                    existing.add(entry)
+    elif op == "note":
+        record["note"] = event.get("note", "")
+
+
+def _merge_events(older: Dict, newer: Dict) -> Dict:
+    """Coalesce two pending events for the same title and op into one."""
+
+    if newer.get("op") != "view":
+        return newer
+    merged = dict(newer)
+    merged["timestamp"] = max(int(older.get("timestamp", 0)), int(newer.get("timestamp", 0)))
+    entries = list(older.get("entries") or [])
+    for entry in newer.get("entries") or []:
+        if entry not in entries:
+            entries.append(entry)
+    if entries:
+        merged["entries"] = entries
+    return merged
 
 
 class WatchedHistory:
-    """Persist viewer history so we can keep context between questions."""
+    """Persist viewer history so we can keep context between questions.
+
+    The snapshot at `path` keeps the original `{"titles": {...}}` JSON layout.
+    Each update is appended as one line to `<path>.journal` instead of
+    rewriting the snapshot, so a write costs O(event) rather than O(history).
+    Once the journal holds `compact_every` events it is folded into a new
+    snapshot, written to a temporary file and atomically renamed into place.
+    Nothing is read from disk until the history is first used.
+
+    With `flush_interval` set, updates are applied in memory immediately and
+    written behind by a background thread: pending updates are coalesced per
+    title and flushed every `flush_interval` seconds, or sooner once
+    `max_batch` titles are waiting. Call `close()` on shutdown to flush the
+    remainder. Without it every update is written before returning.
+
+    With `shared=True` several processes may use the same files: appends and
+    compaction take an inter-process file lock, and reads first pick up
+    journal lines other processes appended (or reload after another process
+    compacted). Replaying an event twice is harmless, so no update is lost.
+    """
 
-    def __init__(self, path: str | Path) -> None:
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        compact_every: int = DEFAULT_COMPACT_EVERY,
+        flush_interval: Optional[float] = None,
+        max_batch: int = DEFAULT_FLUSH_MAX_BATCH,
+        shared: bool = False,
+    ) -> None:
         self.path = Path(path)
-        self._data = self._load()
+        self.journal_path = self.path.with_name(self.path.name + ".journal")
+        self.compact_every = max(1, compact_every)
+        self.flush_interval = flush_interval if flush_interval and flush_interval > 0 else None
+        self.max_batch = max(1, max_batch)
+        self.shared = shared
+        self._data: Optional[Dict] = None
+        self._journal_events = 0
+        self._journal_offset = 0
+        self._snapshot_signature: Optional[Tuple[int, int, int]] = None
+        self._file_lock: ContextManager = (
+            FileLock(self.path.with_name(self.path.name + ".lock")) if shared else nullcontext()
+        )
+        self._pending: Dict[_PendingKey, Dict] = {}
+        # `_lock` guards in-memory state and may be shared across request
+        # threads; `_io_lock` serializes disk writes. Always take `_io_lock` first.
+        self._lock = threading.RLock()
+        self._io_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self.queued = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.events_written = 0
+        self.flush_errors = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+        self._flusher: Optional[threading.Thread] = None
+        if self.flush_interval is not None:
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="watched-history-writer", daemon=True
+            )
+            self._flusher.start()
 
     # Internal helpers -------------------------------------------------
-    def _load(self) -> Dict:
+    def _load_snapshot(self) -> Dict:
         if not self.path.exists():
             return {"titles": {}}
         try:
             with self.path.open("r", encoding="utf-8") as handle:
-                return json.load(handle)
+                data = json.load(handle)
         except json.JSONDecodeError:
             # Start clean when file is corrupted. Caller may choose to warn later.
             return {"titles": {}}
+        return data if isinstance(data, dict) else {"titles": {}}
 
-    def _save(self) -> None:
+    def _read_journal(self, offset: int = 0) -> Tuple[List[Dict], int]:
+        """Parse complete journal lines from byte `offset`; return events and the new offset."""
+
+        try:
+            with self.journal_path.open("rb") as handle:
+                handle.seek(offset)
+                chunk = handle.read()
+        except FileNotFoundError:
+            return [], 0
+        # Stop at the last newline: a trailing partial line is still being written.
+        complete = chunk.rfind(b"\n") + 1
+        events: List[Dict] = []
+        for line in chunk[:complete].splitlines():
+            try:
+                event = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                # A torn line from a crash mid-append; skip it.
+                continue
+            if isinstance(event, dict):
+                events.append(event)
+        return events, offset + complete
+
+    def _load(self) -> Dict:
+        with self._file_lock:
+            self._snapshot_signature = file_signature(self.path)
+            data = self._load_snapshot()
+            events, self._journal_offset = self._read_journal()
+        for event in events:
+            _apply_event(data, event)
+        self._journal_events = len(events)
+        return data
+
+    def _refresh(self) -> None:
+        # Caller holds `_lock`. Pick up changes made by other processes.
+        journal_size = (file_signature(self.journal_path) or (0, 0, 0))[2]
+        if (
+            file_signature(self.path) != self._snapshot_signature
+            or journal_size < self._journal_offset
+        ):
+            # Another process compacted: reload, keeping our unflushed updates.
+            data = self._load()
+            for event in self._pending.values():
+                _apply_event(data, event)
+            self._data = data
+        elif journal_size > self._journal_offset:
+            events, self._journal_offset = self._read_journal(self._journal_offset)
+            for event in events:
+                _apply_event(self._data, event)
+            self._journal_events += len(events)
+
+    @property
+    def data(self) -> Dict:
+        with self._lock:
+            if self._data is None:
+                # An oversized journal is compacted by the next flush.
+                self._data = self._load()
+            elif self.shared:
+                self._refresh()
+            return self._data
+
+    def _append(self, events: List[Dict]) -> None:
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        payload = "".join(
+            json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n" for event in events
+        ).encode("utf-8")
+        with self._file_lock:
+            # A single O_APPEND write keeps concurrent appenders from interleaving lines.
+            fd = os.open(self.journal_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                before = os.fstat(fd).st_size
+                os.write(fd, payload)
+            finally:
+                os.close(fd)
+        with self._lock:
+            # These events are already applied in memory; skip re-reading them
+            # unless another process appended in between.
+            if before == self._journal_offset:
+                self._journal_offset = before + len(payload)
+            self._journal_events += len(events)
+
+    def _write_snapshot(self, data: Dict) -> None:
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        with self.path.open("w", encoding="utf-8") as handle:
-            json.dump(self._data, handle, indent=2)
+        fd, tmp_name = tempfile.mkstemp(prefix=self.path.name + ".", suffix=".tmp", dir=self.path.parent)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(data, handle, indent=2)
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(tmp_name, self.path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    def _compact_locked(self) -> None:
+        # Caller holds `_io_lock`. Rebuild from disk so events appended by
+        # other writers are kept, then re-apply updates not yet flushed.
+        with self._file_lock:
+            data = self._load()
+            self._write_snapshot(data)
+            if self.journal_path.exists():
+                with self.journal_path.open("w", encoding="utf-8"):
+                    pass
+            snapshot_signature = file_signature(self.path)
+        with self._lock:
+            for event in self._pending.values():
+                _apply_event(data, event)
+            self._data = data
+            self._snapshot_signature = snapshot_signature
+            self._journal_offset = 0
+            self._journal_events = 0
+
+    def _record(self, event: Dict) -> None:
+        key: _PendingKey = (event["op"], event["title"])
+        with self._lock:
+            _apply_event(self.data, event)
+            previous = self._pending.get(key)
+            if previous is not None:
+                event = _merge_events(previous, event)
+                self.coalesced += 1
+            self._pending[key] = event
+            self.queued += 1
+            depth = len(self._pending)
+        if self._flusher is None or self._closed:
+            self.flush()
+        elif depth >= self.max_batch:
+            self._wake.set()
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:  # e.g. unserializable metadata; keep the writer alive
+                logger.exception("Failed to flush watched history")
 
     # Public API -------------------------------------------------------
     def get(self, title: str) -> Dict:
         """Return stored metadata for the requested title."""
-        titles = self._data.setdefault("titles", {})
-        return titles.setdefault(title, {"entries": [], "last_timestamp": 0})
+        with self._lock:
+            titles = self.data.setdefault("titles", {})
+            return titles.setdefault(title, {"entries": [], "last_timestamp": 0})
 
     def record_viewing(
         self,
@@ -43,18 +290,75 @@ class WatchedHistory:
         previously_watched: Optional[List[str]] = None,
     ) -> None:
         """Update history for a title with the latest progress and optional entries."""
-        record = self.get(title)
-        record["last_timestamp"] = max(record.get("last_timestamp", 0), timestamp_seconds)
+        event: Dict = {"op": "view", "title": title, "timestamp": int(timestamp_seconds)}
         if previously_watched:
-            existing = set(record.setdefault("entries", []))
-            for entry in previously_watched:
-                if entry not in existing:
-                    record["entries"].append(entry)
-                    existing.add(entry)
-        self._save()
+            event["entries"] = list(previously_watched)
+        self._record(event)
 
     def set_custom_note(self, title: str, note: str) -> None:
         """Allow future extension with manual notes or summaries."""
-        record = self.get(title)
-        record["note"] = note
-        self._save()
+        self._record({"op": "note", "title": title, "note": note})
+
+    def flush(self) -> None:
+        """Write all pending updates to the journal, compacting if it is due.
+
+        Raises:
+            OSError: If the journal cannot be written; the updates stay pending.
+        """
+
+        with self._io_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if pending:
+                started = time.perf_counter()
+                try:
+                    self._append(list(pending.values()))
+                except OSError:
+                    with self._lock:
+                        self.flush_errors += 1
+                        for key, event in pending.items():
+                            newer = self._pending.get(key)
+                            self._pending[key] = _merge_events(event, newer) if newer else event
+                    raise
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                with self._lock:
+                    self.flushes += 1
+                    self.events_written += len(pending)
+                    self.last_flush_ms = elapsed_ms
+                    self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+                    self._total_flush_ms += elapsed_ms
+            if self._journal_events >= self.compact_every:
+                self._compact_locked()
+
+    def compact(self) -> None:
+        """Fold the journal into a fresh snapshot and truncate the journal."""
+
+        with self._io_lock:
+            self._compact_locked()
+
+    def close(self) -> None:
+        """Stop the background writer and flush anything still pending."""
+
+        self._closed = True
+        if self._flusher is not None:
+            self._wake.set()
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+
+    def stats(self) -> Dict[str, object]:
+        """Return write-behind queue depth, coalescing and flush latency counters."""
+        with self._lock:
+            return {
+                "queue_depth": len(self._pending),
+                "queued": self.queued,
+                "coalesced": self.coalesced,
+                "flushes": self.flushes,
+                "events_written": self.events_written,
+                "flush_errors": self.flush_errors,
+                "last_flush_ms": round(self.last_flush_ms, 3),
+                "max_flush_ms": round(self.max_flush_ms, 3),
+                "avg_flush_ms": round(self._total_flush_ms / self.flushes, 3) if self.flushes else 0.0,
+                "journal_events": self._journal_events,
+                "write_behind": self._flusher is not None,
+            }
@@ -3,64 +3,303 @@
 from __future__ import annotations
 
 import json
+import os
+import sqlite3
+import tempfile
+import threading
+from contextlib import nullcontext
 from dataclasses import dataclass, asdict
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import ContextManager, Dict, List, Optional, Set, Tuple, Union
 
+from .file_lock import FileLock, file_signature
 
-@dataclass
+
+SQLITE_SUFFIXES = (".sqlite", ".sqlite3", ".db")
+
+
+@dataclass(slots=True)
 class LibraryEntry:
     video_id: str
     title: str
     video_path: str
     subtitle_path: Optional[str] = None
+    # SHA-256 of the stored files, used to deduplicate uploads.
+    video_sha256: Optional[str] = None
+    subtitle_sha256: Optional[str] = None
 
 
 class LibraryStore:
-    """JSON-backed repository for uploaded videos."""
+    """JSON-backed repository for uploaded videos.
 
-    def __init__(self, path: str | Path) -> None:
+    Entries are held in an insertion-ordered dict keyed by `video_id`, with
+    secondary title and content-hash indexes, so lookups are O(1) regardless
+    of library size. Lookups return entries in upload order, like the
+    SQLite store's rowid order, so pages are stable across processes.
+    The file is rewritten atomically on each change.
+
+    With `shared=True` several processes may use the same file: changes are
+    read-modify-write under an inter-process file lock, and reads reload the
+    index when the file's signature (inode, mtime, size) has changed.
+    """
+
+    def __init__(self, path: str | Path, *, shared: bool = False) -> None:
         self.path = Path(path)
-        self._data = self._load()
+        self.shared = shared
+        self._lock = threading.RLock()
+        self._file_lock: ContextManager = (
+            FileLock(self.path.with_name(self.path.name + ".lock")) if shared else nullcontext()
+        )
+        self._entries: Dict[str, LibraryEntry] = {}
+        self._by_title: Dict[str, Set[str]] = {}
+        self._by_hash: Dict[str, Set[str]] = {}
+        # video_id -> upload sequence number, to order index lookups.
+        self._sequence: Dict[str, int] = {}
+        self._next_sequence = 0
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._reload()
 
     # Internal helpers -------------------------------------------------
-    def _load(self) -> Dict[str, List[Dict]]:
+    def _reload(self) -> None:
+        self._signature = file_signature(self.path)
+        self._entries = {}
+        self._by_title = {}
+        self._by_hash = {}
+        self._sequence = {}
+        self._next_sequence = 0
+        for raw in self._load():
+            try:
+                entry = LibraryEntry(**raw)
+            except TypeError:
+                continue
+            self._index(entry)
+
+    def _refresh(self) -> None:
+        # Caller holds `_lock`. Cheap stat; reload only when another process wrote.
+        if self.shared and file_signature(self.path) != self._signature:
+            self._reload()
+
+    def _load(self) -> List[Dict]:
         if not self.path.exists():
-            return {"videos": []}
+            return []
         try:
             with self.path.open("r", encoding="utf-8") as handle:
                 data = json.load(handle)
         except json.JSONDecodeError:
-            data = {"videos": []}
-        data.setdefault("videos", [])
-        return data
+            return []
+        return data.get("videos", []) if isinstance(data, dict) else []
 
     def _save(self) -> None:
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        with self.path.open("w", encoding="utf-8") as handle:
-            json.dump(self._data, handle, indent=2)
+        data = {"videos": [asdict(entry) for entry in self._entries.values()]}
+        fd, tmp_name = tempfile.mkstemp(prefix=self.path.name + ".", suffix=".tmp", dir=self.path.parent)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(data, handle, indent=2)
+            os.replace(tmp_name, self.path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        self._signature = file_signature(self.path)
+
+    def _index(self, entry: LibraryEntry) -> None:
+        self._unindex(entry.video_id)
+        self._entries[entry.video_id] = entry
+        self._sequence[entry.video_id] = self._next_sequence
+        self._next_sequence += 1
+        self._add_keys(entry)
+
+    def _add_keys(self, entry: LibraryEntry) -> None:
+        self._by_title.setdefault(entry.title, set()).add(entry.video_id)
+        for digest in (entry.video_sha256, entry.subtitle_sha256):
+            if digest:
+                self._by_hash.setdefault(digest, set()).add(entry.video_id)
+
+    def _drop_keys(self, entry: LibraryEntry) -> None:
+        _discard(self._by_title, entry.title, entry.video_id)
+        for digest in (entry.video_sha256, entry.subtitle_sha256):
+            if digest:
+                _discard(self._by_hash, digest, entry.video_id)
+
+    def _unindex(self, video_id: str) -> Optional[LibraryEntry]:
+        previous = self._entries.pop(video_id, None)
+        if previous is not None:
+            self._drop_keys(previous)
+            del self._sequence[video_id]
+        return previous
+
+    def _lookup(self, index: Dict[str, Set[str]], key: str) -> List[LibraryEntry]:
+        ids = sorted(index.get(key, ()), key=self._sequence.__getitem__)
+        return [self._entries[video_id] for video_id in ids]
 
     # Public API -------------------------------------------------------
-    def list_videos(self) -> List[LibraryEntry]:
-        return [LibraryEntry(**entry) for entry in self._data["videos"]]
+    def count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._entries)
+
+    def list_videos(self, offset: int = 0, limit: Optional[int] = None) -> List[LibraryEntry]:
+        """Return entries in upload order, optionally one page at a time."""
+        offset = max(0, offset)
+        end = None if limit is None else offset + max(0, limit)
+        with self._lock:
+            self._refresh()
+            return list(islice(self._entries.values(), offset, end))
+
+    def get_video(self, video_id: str) -> Optional[LibraryEntry]:
+        with self._lock:
+            self._refresh()
+            return self._entries.get(video_id)
+
+    def find_by_title(self, title: str) -> List[LibraryEntry]:
+        with self._lock:
+            self._refresh()
+            return self._lookup(self._by_title, title)
+
+    def find_by_hash(self, sha256: str) -> List[LibraryEntry]:
+        """Return entries whose video or subtitle file has this SHA-256."""
+        with self._lock:
+            self._refresh()
+            return self._lookup(self._by_hash, sha256)
+
+    def upsert_video(self, entry: LibraryEntry) -> None:
+        with self._lock, self._file_lock:
+            self._refresh()
+            previous = self._entries.get(entry.video_id)
+            if previous is not None:
+                # Replace in place so the entry keeps its position.
+                self._drop_keys(previous)
+                self._entries[entry.video_id] = entry
+                self._add_keys(entry)
+            else:
+                self._index(entry)
+            self._save()
+
+    def remove_video(self, video_id: str) -> None:
+        with self._lock, self._file_lock:
+            self._refresh()
+            if self._unindex(video_id) is not None:
+                self._save()
+
+    def close(self) -> None:
+        """Nothing to release; present for parity with `SQLiteLibraryStore`."""
+
+
+def _discard(index: Dict[str, Set[str]], key: str, video_id: str) -> None:
+    ids = index.get(key)
+    if ids is not None:
+        ids.discard(video_id)
+        if not ids:
+            del index[key]
+
+
+class SQLiteLibraryStore:
+    """SQLite-backed repository for uploaded videos, for large libraries.
+
+    Uses WAL mode so readers do not block the writer, keys rows on `video_id`
+    and indexes `title` and the content hashes. Each change touches only its own row. SQLite's own
+    locking makes it safe to share between processes; `shared` is accepted
+    for parity with `LibraryStore`.
+    """
+
+    def __init__(self, path: str | Path, *, shared: bool = False) -> None:
+        self.path = Path(path)
+        self.shared = shared
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS videos ("
+            " video_id TEXT PRIMARY KEY, title TEXT NOT NULL,"
+            " video_path TEXT NOT NULL, subtitle_path TEXT,"
+            " video_sha256 TEXT, subtitle_sha256 TEXT)"
+        )
+        # Libraries created before uploads were hashed lack the hash columns.
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(videos)")}
+        for column in ("video_sha256", "subtitle_sha256"):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE videos ADD COLUMN {column} TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS videos_title ON videos (title)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS videos_video_sha256 ON videos (video_sha256)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS videos_subtitle_sha256 ON videos (subtitle_sha256)")
+        self._db.commit()
+
+    _COLUMNS = "video_id, title, video_path, subtitle_path, video_sha256, subtitle_sha256"
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+
+    def list_videos(self, offset: int = 0, limit: Optional[int] = None) -> List[LibraryEntry]:
+        """Return entries in upload order, optionally one page at a time."""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {self._COLUMNS} FROM videos ORDER BY rowid LIMIT ? OFFSET ?",
+                (-1 if limit is None else max(0, limit), max(0, offset)),
+            ).fetchall()
+        return [LibraryEntry(*row) for row in rows]
 
     def get_video(self, video_id: str) -> Optional[LibraryEntry]:
-        for entry in self.list_videos():
-            if entry.video_id == video_id:
-                return entry
-        return None
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {self._COLUMNS} FROM videos WHERE video_id = ?", (video_id,)
+            ).fetchone()
+        return LibraryEntry(*row) if row else None
+
+    def find_by_title(self, title: str) -> List[LibraryEntry]:
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {self._COLUMNS} FROM videos WHERE title = ? ORDER BY rowid", (title,)
+            ).fetchall()
+        return [LibraryEntry(*row) for row in rows]
+
+    def find_by_hash(self, sha256: str) -> List[LibraryEntry]:
+        """Return entries whose video or subtitle file has this SHA-256."""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {self._COLUMNS} FROM videos "
+                "WHERE video_sha256 = ? OR subtitle_sha256 = ? ORDER BY rowid",
+                (sha256, sha256),
+            ).fetchall()
+        return [LibraryEntry(*row) for row in rows]
 
     def upsert_video(self, entry: LibraryEntry) -> None:
-        videos = self._data["videos"]
-        for idx, existing in enumerate(videos):
-            if existing["video_id"] == entry.video_id:
-                videos[idx] = asdict(entry)
-                break
-        else:
-            videos.append(asdict(entry))
-        self._save()
+        with self._lock:
+            self._db.execute(
+                f"INSERT INTO videos ({self._COLUMNS}) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(video_id) DO UPDATE SET title = excluded.title, "
+                "video_path = excluded.video_path, subtitle_path = excluded.subtitle_path, "
+                "video_sha256 = excluded.video_sha256, subtitle_sha256 = excluded.subtitle_sha256",
+                (
+                    entry.video_id,
+                    entry.title,
+                    entry.video_path,
+                    entry.subtitle_path,
+                    entry.video_sha256,
+                    entry.subtitle_sha256,
+                ),
+            )
+            self._db.commit()
 
     def remove_video(self, video_id: str) -> None:
-        videos = [v for v in self._data["videos"] if v["video_id"] != video_id]
-        self._data["videos"] = videos
-        self._save()
+        with self._lock:
+            self._db.execute("DELETE FROM videos WHERE video_id = ?", (video_id,))
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+AnyLibraryStore = Union[LibraryStore, SQLiteLibraryStore]
+
+
+def open_library_store(path: str | Path, *, shared: bool = False) -> AnyLibraryStore:
+    """Open the library at `path`, using SQLite for `.sqlite`/`.sqlite3`/`.db` files."""
+
+    path = Path(path)
+    if path.suffix.lower() in SQLITE_SUFFIXES:
+        return SQLiteLibraryStore(path, shared=shared)
+    return LibraryStore(path, shared=shared)
@@ -2,20 +2,32 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import os
 import time
-from dataclasses import dataclass
-from typing import Dict, List, Optional
+import weakref
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
 
+import httpx
 import requests
-from openai import OpenAI
+from openai import APIError, AsyncOpenAI, OpenAI
 
 
 class LLMConfigurationError(RuntimeError):
     """Raised when the LLM client cannot be configured correctly."""
 
 
+GROQ_CHAT_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+SCENE_SUMMARY_PROMPT = (
+    "You summarize one scene of a movie or TV episode from its subtitles. "
+    "In one or two sentences, say who is involved and what happens or is revealed. "
+    "Use only the dialogue given; never guess at later events."
+)
+
+
 @dataclass
 class LLMSettings:
     """Configuration for generating answers."""
@@ -26,6 +38,97 @@ class LLMSettings:
     max_output_tokens: int = 350
     ollama_base_url: str = "http://localhost:11434"
     system_prompt: Optional[str] = None  # If None, uses default prompt
+    request_timeout: float = 60.0
+    # How long Ollama keeps the model loaded after a request ("30m", "-1" = forever).
+    ollama_keep_alive: Optional[str] = None
+    # Async path only: pooled connections and in-flight requests per provider.
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    max_concurrency: int = 32
+
+
+@dataclass
+class _LoopResources:
+    """Pooled async clients; httpx/openai clients must stay on the loop that created them."""
+
+    http_clients: Dict[Tuple[int, int, float], httpx.AsyncClient] = field(default_factory=dict)
+    openai_clients: Dict[Tuple[str, float], AsyncOpenAI] = field(default_factory=dict)
+    semaphores: Dict[str, asyncio.Semaphore] = field(default_factory=dict)
+
+
+_LOOP_RESOURCES: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopResources]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _loop_resources() -> _LoopResources:
+    loop = asyncio.get_running_loop()
+    resources = _LOOP_RESOURCES.get(loop)
+    if resources is None:
+        resources = _LOOP_RESOURCES[loop] = _LoopResources()
+    return resources
+
+
+async def aclose_async_clients() -> None:
+    """Close the pooled async clients owned by the running event loop."""
+
+    resources = _LOOP_RESOURCES.pop(asyncio.get_running_loop(), None)
+    if resources is None:
+        return
+    for client in resources.http_clients.values():
+        await client.aclose()
+    for openai_client in resources.openai_clients.values():
+        await openai_client.close()
+
+
+def _ollama_content(data: Dict) -> str:
+    content = data.get("message", {}).get("content")
+    if not content:
+        raise RuntimeError("Ollama returned an empty response.")
+    return str(content).strip()
+
+
+def _groq_content(data: Dict) -> str:
+    choice = (data.get("choices") or [{}])[0]
+    content = choice.get("message", {}).get("content")
+    if not content:
+        raise RuntimeError("Groq returned an empty response.")
+    return str(content).strip()
+
+
+def _ollama_stream_chunk(line: str | bytes) -> Tuple[str, bool]:
+    """Parse one line of Ollama's NDJSON stream into `(text, done)`."""
+    if not line:
+        return "", False
+    try:
+        data = json.loads(line)
+    except ValueError as exc:
+        raise RuntimeError(f"Ollama sent a malformed stream chunk: {line[:200]!r}") from exc
+    if data.get("error"):
+        raise RuntimeError(f"Ollama request failed: {data['error']}")
+    return data.get("message", {}).get("content") or "", bool(data.get("done"))
+
+
+def _groq_stream_chunk(line: str) -> Optional[str]:
+    """Parse one OpenAI-style server-sent event line; `None` marks the end of the stream."""
+    if not line or not line.startswith("data:"):
+        return ""
+    data = line[len("data:"):].strip()
+    if data == "[DONE]":
+        return None
+    try:
+        choice = (json.loads(data).get("choices") or [{}])[0]
+    except ValueError as exc:
+        raise RuntimeError(f"Groq sent a malformed stream chunk: {data[:200]!r}") from exc
+    return choice.get("delta", {}).get("content") or ""
+
+
+def _keep_alive_value(keep_alive: str) -> str | int:
+    """Ollama takes durations like "30m" as strings and bare seconds as numbers."""
+    try:
+        return int(keep_alive)
+    except ValueError:
+        return keep_alive
 
 
 class LLMClient:
@@ -55,7 +158,8 @@ class LLMClient:
                     "OPENAI_API_KEY is required when using the OpenAI provider. "
                     "Set the environment variable or pass api_key to LLMClient."
                 )
-            self._client = OpenAI(api_key=key)
+            self._openai_key = key
+            self._client = OpenAI(api_key=key, timeout=self.settings.request_timeout)
         elif self.provider == "ollama":
             self._client = None
             self._ollama_url = self.settings.ollama_base_url.rstrip("/")
@@ -76,19 +180,37 @@ class LLMClient:
         context: str,
         history: Dict,
         previously_watched: Optional[List[str]],
+        passages: Optional[List[str]] = None,
+        summaries: Optional[List[str]] = None,
+        watched_limit: Optional[int] = None,
     ) -> List[Dict[str, str]]:
         watched_entries = previously_watched or history.get("entries") or []
+        if watched_limit is not None:
+            # Token budget: keep only the most recent entries.
+            watched_entries = watched_entries[len(watched_entries) - watched_limit :] if watched_limit > 0 else []
         last_seen = history.get("last_timestamp", 0)
 
         context_block = context if context else "No subtitle context available before this timestamp."
         watched_text = ", ".join(watched_entries) if watched_entries else "None noted"
+        summaries_block = "Story so far:\n" + "\n".join(summaries) + "\n\n" if summaries else ""
+        # Earlier scenes retrieved for this question; they all precede the recent context.
+        passages_block = (
+            "Earlier scenes relevant to the question:\n" + "\n".join(passages) + "\n\n"
+            if passages
+            else ""
+        )
 
+        # Most stable parts first (title and watched list, then the slowly growing
+        # recap) so consecutive questions share a long prompt prefix that the
+        # provider can serve from its KV/prompt cache. Per-question parts go last.
         user_content = (
             f"Title: {title}\n"
-            f"Current timestamp (HH:MM:SS): {timestamp}\n"
-            f"Previously watched episodes/movies: {watched_text}\n"
-            f"Last recorded timestamp in history: {last_seen} seconds\n\n"
+            f"Previously watched episodes/movies: {watched_text}\n\n"
+            f"{summaries_block}"
             f"Context up to this timestamp:\n{context_block}\n\n"
+            f"{passages_block}"
+            f"Current timestamp (HH:MM:SS): {timestamp}\n"
+            f"Last recorded timestamp in history: {last_seen} seconds\n"
             f"Viewer question: {question}"
         )
 
@@ -99,6 +221,67 @@ class LLMClient:
             {"role": "user", "content": user_content},
         ]
 
+    def prompt_text(
+        self,
+        *,
+        title: str,
+        timestamp: str,
+        question: str,
+        context: str,
+        history: Dict,
+        previously_watched: Optional[List[str]] = None,
+        passages: Optional[List[str]] = None,
+        summaries: Optional[List[str]] = None,
+        watched_limit: Optional[int] = None,
+    ) -> str:
+        """Return the text of every message `answer` would send, for token counting."""
+
+        messages = self._build_messages(
+            title=title,
+            timestamp=timestamp,
+            question=question,
+            context=context,
+            history=history,
+            previously_watched=previously_watched,
+            passages=passages,
+            summaries=summaries,
+            watched_limit=watched_limit,
+        )
+        return "\n".join(message["content"] for message in messages)
+
+    # Provider payloads --------------------------------------------------
+    def _ollama_payload(self, messages: List[Dict[str, str]], *, stream: bool) -> Dict[str, object]:
+        payload: Dict[str, object] = {
+            "model": self.settings.model,
+            "messages": messages,
+            "stream": stream,
+            "options": {
+                "temperature": self.settings.temperature,
+            },
+        }
+        if self.settings.max_output_tokens:
+            payload["options"]["num_predict"] = self.settings.max_output_tokens
+        if self.settings.ollama_keep_alive:
+            payload["keep_alive"] = _keep_alive_value(self.settings.ollama_keep_alive)
+        return payload
+
+    def _groq_headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self._groq_key}",
+            "Content-Type": "application/json",
+        }
+
+    def _groq_payload(self, messages: List[Dict[str, str]], *, stream: bool) -> Dict[str, object]:
+        payload: Dict[str, object] = {
+            "model": self.settings.model,
+            "messages": messages,
+            "temperature": self.settings.temperature,
+            "stream": stream,
+        }
+        if self.settings.max_output_tokens:
+            payload["max_tokens"] = self.settings.max_output_tokens
+        return payload
+
     def answer(
         self,
         *,
@@ -108,6 +291,9 @@ class LLMClient:
         context: str,
         history: Dict,
         previously_watched: Optional[List[str]] = None,
+        passages: Optional[List[str]] = None,
+        summaries: Optional[List[str]] = None,
+        watched_limit: Optional[int] = None,
     ) -> str:
         """Generate a natural language answer from the LLM."""
 
@@ -118,28 +304,40 @@ class LLMClient:
             context=context,
             history=history,
             previously_watched=previously_watched,
+            passages=passages,
+            summaries=summaries,
+            watched_limit=watched_limit,
         )
+        return self._complete(messages)
+
+    def summarize_scene(self, *, start: str, end: str, dialogue: str) -> str:
+        """Summarize one stretch of subtitles in a sentence or two.
 
+        Raises:
+            RuntimeError: If the provider request fails or produces no text.
+        """
+
+        messages = [
+            {"role": "system", "content": SCENE_SUMMARY_PROMPT},
+            {"role": "user", "content": f"Scene from {start} to {end}:\n{dialogue}"},
+        ]
+        return self._complete(messages)
+
+    def _complete(self, messages: List[Dict[str, str]]) -> str:
         if self.provider == "openai":
-            response = self._client.chat.completions.create(
-                model=self.settings.model,
-                temperature=self.settings.temperature,
-                max_tokens=self.settings.max_output_tokens,
-                messages=messages,
-            )
+            try:
+                response = self._client.chat.completions.create(
+                    model=self.settings.model,
+                    temperature=self.settings.temperature,
+                    max_tokens=self.settings.max_output_tokens,
+                    messages=messages,
+                )
+            except APIError as exc:
+                raise RuntimeError(f"OpenAI request failed: {exc}") from exc
             return response.choices[0].message.content.strip()
 
         if self.provider == "ollama":
-            payload: Dict[str, object] = {
-                "model": self.settings.model,
-                "messages": messages,
-                "stream": False,
-                "options": {
-                    "temperature": self.settings.temperature,
-                },
-            }
-            if self.settings.max_output_tokens:
-                payload["options"]["num_predict"] = self.settings.max_output_tokens
+            payload = self._ollama_payload(messages, stream=False)
 
             attempt = 0
             last_error: Optional[BaseException] = None
@@ -148,14 +346,10 @@ class LLMClient:
                     response = requests.post(
                         f"{self._ollama_url}/api/chat",
                         json=payload,
-                        timeout=60,
+                        timeout=self.settings.request_timeout,
                     )
                     response.raise_for_status()
-                    message = response.json().get("message", {})
-                    content = message.get("content")
-                    if not content:
-                        raise RuntimeError("Ollama returned an empty response.")
-                    return str(content).strip()
+                    return _ollama_content(response.json())
                 except requests.Timeout as exc:
                     last_error = exc
                 except requests.RequestException as exc:
@@ -167,32 +361,354 @@ class LLMClient:
             raise RuntimeError(f"Ollama request failed after retries: {last_error}") from last_error
 
         if self.provider == "groq":
-            headers = {
-                "Authorization": f"Bearer {self._groq_key}",
-                "Content-Type": "application/json",
-            }
-            payload: Dict[str, object] = {
-                "model": self.settings.model,
-                "messages": messages,
-                "temperature": self.settings.temperature,
-                "stream": False,
-            }
-            if self.settings.max_output_tokens:
-                payload["max_tokens"] = self.settings.max_output_tokens
             response = requests.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers=headers,
-                json=payload,
-                timeout=60,
+                GROQ_CHAT_URL,
+                headers=self._groq_headers(),
+                json=self._groq_payload(messages, stream=False),
+                timeout=self.settings.request_timeout,
             )
             if response.status_code >= 400:
                 detail = response.text
                 raise RuntimeError(f"Groq request failed ({response.status_code}): {detail}")
-            data = response.json()
-            choice = (data.get("choices") or [{}])[0]
-            content = choice.get("message", {}).get("content")
-            if not content:
-                raise RuntimeError("Groq returned an empty response.")
-            return str(content).strip()
+            return _groq_content(response.json())
+
+        raise LLMConfigurationError(f"Unsupported provider at runtime: {self.provider}")
+
+    def stream_answer(
+        self,
+        *,
+        title: str,
+        timestamp: str,
+        question: str,
+        context: str,
+        history: Dict,
+        previously_watched: Optional[List[str]] = None,
+        passages: Optional[List[str]] = None,
+        summaries: Optional[List[str]] = None,
+        watched_limit: Optional[int] = None,
+    ) -> Iterator[str]:
+        """Yield the answer in text chunks as the provider generates them.
+
+        Raises:
+            RuntimeError: If the provider request fails or produces no text.
+        """
+
+        messages = self._build_messages(
+            title=title,
+            timestamp=timestamp,
+            question=question,
+            context=context,
+            history=history,
+            previously_watched=previously_watched,
+            passages=passages,
+            summaries=summaries,
+            watched_limit=watched_limit,
+        )
+
+        if self.provider == "openai":
+            chunks = self._stream_openai(messages)
+        elif self.provider == "ollama":
+            chunks = self._stream_ollama(messages)
+        elif self.provider == "groq":
+            chunks = self._stream_groq(messages)
+        else:
+            raise LLMConfigurationError(f"Unsupported provider at runtime: {self.provider}")
+
+        produced = False
+        for chunk in chunks:
+            if chunk:
+                produced = True
+                yield chunk
+        if not produced:
+            raise RuntimeError(f"{self.provider} returned an empty response.")
+
+    def _stream_openai(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        try:
+            stream = self._client.chat.completions.create(
+                model=self.settings.model,
+                temperature=self.settings.temperature,
+                max_tokens=self.settings.max_output_tokens,
+                messages=messages,
+                stream=True,
+            )
+            for chunk in stream:
+                if chunk.choices:
+                    yield chunk.choices[0].delta.content or ""
+        except (APIError, httpx.HTTPError) as exc:
+            raise RuntimeError(f"OpenAI request failed: {exc}") from exc
+
+    def _stream_ollama(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        try:
+            with requests.post(
+                f"{self._ollama_url}/api/chat",
+                json=self._ollama_payload(messages, stream=True),
+                timeout=self.settings.request_timeout,
+                stream=True,
+            ) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    chunk, done = _ollama_stream_chunk(line)
+                    yield chunk
+                    if done:
+                        break
+        except requests.RequestException as exc:
+            raise RuntimeError(f"Ollama request failed: {exc}") from exc
+
+    def _stream_groq(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        try:
+            with requests.post(
+                GROQ_CHAT_URL,
+                headers=self._groq_headers(),
+                json=self._groq_payload(messages, stream=True),
+                timeout=self.settings.request_timeout,
+                stream=True,
+            ) as response:
+                if response.status_code >= 400:
+                    raise RuntimeError(f"Groq request failed ({response.status_code}): {response.text}")
+                for line in response.iter_lines(decode_unicode=True):
+                    chunk = _groq_stream_chunk(line)
+                    if chunk is None:
+                        break
+                    yield chunk
+        except requests.RequestException as exc:
+            raise RuntimeError(f"Groq request failed: {exc}") from exc
+
+    # Async path ---------------------------------------------------------
+    def _async_http_client(self) -> httpx.AsyncClient:
+        key = (
+            self.settings.max_connections,
+            self.settings.max_keepalive_connections,
+            self.settings.request_timeout,
+        )
+        clients = _loop_resources().http_clients
+        client = clients.get(key)
+        if client is None:
+            client = clients[key] = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.settings.max_connections,
+                    max_keepalive_connections=self.settings.max_keepalive_connections,
+                ),
+                timeout=httpx.Timeout(self.settings.request_timeout, connect=10.0),
+            )
+        return client
+
+    def _async_openai_client(self) -> AsyncOpenAI:
+        key = (self._openai_key, self.settings.request_timeout)
+        clients = _loop_resources().openai_clients
+        client = clients.get(key)
+        if client is None:
+            client = clients[key] = AsyncOpenAI(
+                api_key=self._openai_key,
+                timeout=self.settings.request_timeout,
+            )
+        return client
+
+    def _provider_semaphore(self) -> asyncio.Semaphore:
+        # The first client for a provider fixes its limit for the loop's lifetime.
+        semaphores = _loop_resources().semaphores
+        semaphore = semaphores.get(self.provider)
+        if semaphore is None:
+            semaphore = semaphores[self.provider] = asyncio.Semaphore(
+                max(1, self.settings.max_concurrency)
+            )
+        return semaphore
+
+    async def aanswer(
+        self,
+        *,
+        title: str,
+        timestamp: str,
+        question: str,
+        context: str,
+        history: Dict,
+        previously_watched: Optional[List[str]] = None,
+        passages: Optional[List[str]] = None,
+        summaries: Optional[List[str]] = None,
+        watched_limit: Optional[int] = None,
+    ) -> str:
+        """Async counterpart of `answer` that reuses pooled connections."""
+
+        messages = self._build_messages(
+            title=title,
+            timestamp=timestamp,
+            question=question,
+            context=context,
+            history=history,
+            previously_watched=previously_watched,
+            passages=passages,
+            summaries=summaries,
+            watched_limit=watched_limit,
+        )
+
+        if self.provider == "ollama":
+            payload = self._ollama_payload(messages, stream=False)
+            client = self._async_http_client()
+
+            attempt = 0
+            last_error: Optional[BaseException] = None
+            while attempt < 3:
+                try:
+                    # Hold a concurrency slot per attempt, not through the backoff below.
+                    async with self._provider_semaphore():
+                        response = await client.post(f"{self._ollama_url}/api/chat", json=payload)
+                    response.raise_for_status()
+                    return _ollama_content(response.json())
+                except httpx.TimeoutException as exc:
+                    last_error = exc
+                except httpx.HTTPError as exc:
+                    last_error = exc
+                    break
+                attempt += 1
+                if attempt < 3:
+                    await asyncio.sleep(2 ** attempt)
+
+            raise RuntimeError(f"Ollama request failed after retries: {last_error}") from last_error
+
+        async with self._provider_semaphore():
+            if self.provider == "openai":
+                try:
+                    response = await self._async_openai_client().chat.completions.create(
+                        model=self.settings.model,
+                        temperature=self.settings.temperature,
+                        max_tokens=self.settings.max_output_tokens,
+                        messages=messages,
+                    )
+                except APIError as exc:
+                    raise RuntimeError(f"OpenAI request failed: {exc}") from exc
+                return response.choices[0].message.content.strip()
+
+            if self.provider == "groq":
+                try:
+                    response = await self._async_http_client().post(
+                        GROQ_CHAT_URL,
+                        headers=self._groq_headers(),
+                        json=self._groq_payload(messages, stream=False),
+                    )
+                except httpx.HTTPError as exc:
+                    raise RuntimeError(f"Groq request failed: {exc}") from exc
+                if response.status_code >= 400:
+                    raise RuntimeError(f"Groq request failed ({response.status_code}): {response.text}")
+                return _groq_content(response.json())
 
         raise LLMConfigurationError(f"Unsupported provider at runtime: {self.provider}")
+
+    async def astream_answer(
+        self,
+        *,
+        title: str,
+        timestamp: str,
+        question: str,
+        context: str,
+        history: Dict,
+        previously_watched: Optional[List[str]] = None,
+        passages: Optional[List[str]] = None,
+        summaries: Optional[List[str]] = None,
+        watched_limit: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        """Async counterpart of `stream_answer` that reuses pooled connections.
+
+        Raises:
+            RuntimeError: If the provider request fails or produces no text.
+        """
+
+        messages = self._build_messages(
+            title=title,
+            timestamp=timestamp,
+            question=question,
+            context=context,
+            history=history,
+            previously_watched=previously_watched,
+            passages=passages,
+            summaries=summaries,
+            watched_limit=watched_limit,
+        )
+
+        if self.provider == "openai":
+            chunks = self._astream_openai(messages)
+        elif self.provider == "ollama":
+            chunks = self._astream_ollama(messages)
+        elif self.provider == "groq":
+            chunks = self._astream_groq(messages)
+        else:
+            raise LLMConfigurationError(f"Unsupported provider at runtime: {self.provider}")
+
+        produced = False
+        async with self._provider_semaphore():
+            async for chunk in chunks:
+                if chunk:
+                    produced = True
+                    yield chunk
+        if not produced:
+            raise RuntimeError(f"{self.provider} returned an empty response.")
+
+    async def awarm_up(self) -> None:
+        """Load the Ollama model and prefill the system prompt ahead of the first question.
+
+        Does nothing for hosted providers.
+
+        Raises:
+            RuntimeError: If Ollama cannot be reached or rejects the request.
+        """
+
+        if self.provider != "ollama":
+            return
+        payload = self._ollama_payload(
+            [{"role": "system", "content": self.settings.system_prompt}], stream=False
+        )
+        payload["options"]["num_predict"] = 1
+        try:
+            response = await self._async_http_client().post(f"{self._ollama_url}/api/chat", json=payload)
+            response.raise_for_status()
+        except httpx.HTTPError as exc:
+            raise RuntimeError(f"Ollama warm-up failed: {exc}") from exc
+
+    async def _astream_openai(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        try:
+            stream = await self._async_openai_client().chat.completions.create(
+                model=self.settings.model,
+                temperature=self.settings.temperature,
+                max_tokens=self.settings.max_output_tokens,
+                messages=messages,
+                stream=True,
+            )
+            async for chunk in stream:
+                if chunk.choices:
+                    yield chunk.choices[0].delta.content or ""
+        except (APIError, httpx.HTTPError) as exc:
+            # The SDK raises httpx errors directly when the connection drops mid-stream.
+            raise RuntimeError(f"OpenAI request failed: {exc}") from exc
+
+    async def _astream_ollama(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        try:
+            async with self._async_http_client().stream(
+                "POST",
+                f"{self._ollama_url}/api/chat",
+                json=self._ollama_payload(messages, stream=True),
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    chunk, done = _ollama_stream_chunk(line)
+                    yield chunk
+                    if done:
+                        break
+        except httpx.HTTPError as exc:
+            raise RuntimeError(f"Ollama request failed: {exc}") from exc
+
+    async def _astream_groq(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        try:
+            async with self._async_http_client().stream(
+                "POST",
+                GROQ_CHAT_URL,
+                headers=self._groq_headers(),
+                json=self._groq_payload(messages, stream=True),
+            ) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                    raise RuntimeError(f"Groq request failed ({response.status_code}): {response.text}")
+                async for line in response.aiter_lines():
+                    chunk = _groq_stream_chunk(line)
+                    if chunk is None:
+                        break
+                    yield chunk
+        except httpx.HTTPError as exc:
+            raise RuntimeError(f"Groq request failed: {exc}") from exc
@@ -0,0 +1,119 @@
+"""Per-viewer playback sessions that keep an incremental context tracker alive."""
+
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from .subtitles import PlaybackContextTracker
+
+
+DEFAULT_SESSION_MAX_ENTRIES = 1024
+DEFAULT_SESSION_TTL_SECONDS = 30 * 60
+
+
+def session_track_id(session_id: str) -> Optional[str]:
+    """Return the track ID a session ID was issued for, or `None` if it has none.
+
+    Session IDs are `<track_id>.<random hex>`, so a worker that never saw a
+    session can rebuild it from the track.
+    """
+
+    track_id, dot, token = session_id.partition(".")
+    if not dot or not track_id.isalnum() or not token.isalnum():
+        return None
+    return track_id
+
+
+@dataclass
+class PlaybackSession:
+    session_id: str
+    track_id: str
+    tracker: PlaybackContextTracker
+    last_access: float
+
+
+class PlaybackSessionStore:
+    """Thread-safe LRU of playback sessions with an idle timeout.
+
+    Each session holds a `PlaybackContextTracker` over an already indexed
+    track, so it keeps working even if the track later drops out of the
+    subtitle cache. Tracker versions encode the window itself, so a session
+    recreated under the same ID (e.g. in another worker) continues where
+    the client left off.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_SESSION_MAX_ENTRIES,
+        ttl_seconds: Optional[float] = DEFAULT_SESSION_TTL_SECONDS,
+    ) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+        self._sessions: "OrderedDict[str, PlaybackSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expire(self, now: float) -> None:
+        if self.ttl_seconds is None:
+            return
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_access <= self.ttl_seconds:
+                break
+            del self._sessions[session_id]
+            self.expirations += 1
+
+    def create(
+        self, track_id: str, tracker: PlaybackContextTracker, *, session_id: Optional[str] = None
+    ) -> PlaybackSession:
+        """Start a session for `track_id`, evicting the least recently used if full.
+
+        Pass `session_id` to recreate a session issued elsewhere.
+        """
+
+        session = PlaybackSession(
+            session_id=session_id or f"{track_id}.{uuid.uuid4().hex}",
+            track_id=track_id,
+            tracker=tracker,
+            last_access=time.monotonic(),
+        )
+        with self._lock:
+            self._expire(session.last_access)
+            self._sessions[session.session_id] = session
+            self.created += 1
+            while len(self._sessions) > self.max_entries:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+        return session
+
+    def get(self, session_id: str) -> Optional[PlaybackSession]:
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_access = now
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def remove(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def stats(self) -> Dict[str, int]:
+        """Return live session count and lifecycle counters."""
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "max_entries": self.max_entries,
+                "created": self.created,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,224 @@
+"""Background preprocessing of uploaded subtitle files into reusable track artifacts."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, ContextManager, Dict, List, Optional, Sequence, Tuple
+
+from .file_lock import FileLock
+from .prompt_budget import Tokenizer, cue_token_prefix, remember_cue_token_prefix
+from .subtitle_cache import subtitle_hash
+from .subtitles import SubtitleIndex, SubtitleLoaderError, parse_subtitles_text
+from .track_format import TrackFormatError, open_track, write_track
+
+
+DEFAULT_PREPROCESS_WORKERS = 2
+DEFAULT_PREPROCESS_MAX_JOBS = 1024
+
+
+class TrackArtifactStore:
+    """Preprocessed tracks on disk, one `<track_id>.track` per subtitle content hash.
+
+    The track ID is the same content hash `SubtitleCache` uses, so a track
+    registered by any viewer, in any worker process, is found here instead
+    of being parsed again. Each file holds the normalized, end-sorted cues
+    of a `SubtitleIndex` and the per-cue token prefix sums of every
+    tokenizer that was configured when it was written, in the binary
+    `track_format` layout. Loading maps the file rather than reading it, so
+    workers share one page-cached copy of each track.
+    """
+
+    def __init__(self, directory: str | Path, *, shared: bool = False) -> None:
+        self.directory = Path(directory)
+        self.shared = shared
+
+    def path(self, track_id: str) -> Path:
+        return self.directory / f"{track_id}.track"
+
+    def lock(self, track_id: str) -> ContextManager:
+        if not self.shared:
+            return nullcontext()
+        return FileLock(self.path(track_id).with_suffix(".track.lock"))
+
+    def save(self, track_id: str, track: SubtitleIndex, token_prefixes: Dict[str, Sequence[int]]) -> None:
+        write_track(self.path(track_id), track, token_prefixes)
+
+    def ensure(self, track_id: str, track: SubtitleIndex) -> None:
+        """Save `track` unless it is already stored, e.g. by another worker."""
+
+        with self.lock(track_id):
+            if not self.path(track_id).exists():
+                self.save(track_id, track, {})
+
+    def load(self, track_id: str) -> Optional[Tuple[SubtitleIndex, Dict[str, Sequence[int]]]]:
+        """Return the mapped track and token prefix sums, or `None` if absent or unreadable."""
+
+        if not track_id.isalnum():
+            return None
+        try:
+            track, prefixes = open_track(self.path(track_id))
+        except (OSError, TrackFormatError):
+            return None
+        for name, prefix in prefixes.items():
+            remember_cue_token_prefix(track, name, prefix)
+        return track, prefixes
+
+    def load_track(self, track_id: str) -> Optional[SubtitleIndex]:
+        """`SubtitleCache` loader: the stored track, with its token counts memoized."""
+
+        loaded = self.load(track_id)
+        return loaded[0] if loaded is not None else None
+
+
+@dataclass
+class PreprocessJob:
+    """Progress of one subtitle file through the preprocessing stage."""
+
+    key: str
+    path: str
+    state: str = "queued"  # queued, running, done or failed
+    track_id: Optional[str] = None
+    cues: Optional[int] = None
+    # True when the artifacts already existed and were only loaded.
+    reused: bool = False
+    error: Optional[str] = None
+    queued_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def status(self) -> Dict[str, object]:
+        return asdict(self)
+
+
+class SubtitlePreprocessor:
+    """Parses uploaded subtitle files ahead of the first viewer on a bounded pool.
+
+    A job reads the file once, parses and normalizes it into a
+    `SubtitleIndex` (the sorted time index), computes per-cue token counts
+    for `tokenizer`, and saves the result in `store`. With `warm=True` the
+    track is then handed to each `on_ready` callback, which the server uses
+    to put it in the subtitle cache (building the lexical index) and to
+    start embeddings and scene summaries. A file whose artifacts already
+    exist is not parsed again.
+    """
+
+    def __init__(
+        self,
+        store: TrackArtifactStore,
+        *,
+        tokenizer: Optional[Tokenizer] = None,
+        on_ready: Optional[List[Callable[[str, SubtitleIndex], None]]] = None,
+        workers: int = DEFAULT_PREPROCESS_WORKERS,
+        max_jobs: int = DEFAULT_PREPROCESS_MAX_JOBS,
+    ) -> None:
+        self.store = store
+        self.tokenizer = tokenizer
+        self.on_ready = list(on_ready or [])
+        self.max_jobs = max(1, max_jobs)
+        self._jobs: "OrderedDict[str, PreprocessJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="subtitle-preprocess")
+        self._closed = False
+        self.parsed = 0
+        self.reused = 0
+        self.failed = 0
+
+    # Internal helpers -------------------------------------------------
+    def _prepare(self, path: Path) -> Tuple[str, SubtitleIndex, bool]:
+        try:
+            # Decoded as a browser reads the file as text (BOM dropped, newlines kept),
+            # so the ID matches what the front end registers.
+            text = path.read_bytes().decode("utf-8-sig", errors="replace")
+        except OSError as exc:
+            raise SubtitleLoaderError(f"Subtitle file not readable: {path}") from exc
+        track_id = subtitle_hash(text)
+        with self.store.lock(track_id):
+            loaded = self.store.load(track_id)
+            if loaded is not None and (self.tokenizer is None or self.tokenizer.name in loaded[1]):
+                return track_id, loaded[0], True
+            track = loaded[0] if loaded is not None else parse_subtitles_text(text)
+            prefixes = dict(loaded[1]) if loaded is not None else {}
+            if self.tokenizer is not None:
+                prefixes[self.tokenizer.name] = cue_token_prefix(track, self.tokenizer)
+            self.store.save(track_id, track, prefixes)
+        # Hand out the mapped copy, which other workers share, rather than the parsed one.
+        return track_id, self.store.load_track(track_id) or track, False
+
+    def _run(self, job: PreprocessJob, warm: bool) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            job.state, job.started_at = "running", time.time()
+        try:
+            track_id, track, reused = self._prepare(Path(job.path))
+            if warm:
+                for callback in self.on_ready:
+                    callback(track_id, track)
+        except Exception as exc:
+            logging.getLogger(__name__).warning("Subtitle preprocessing failed for %s", job.path, exc_info=exc)
+            with self._lock:
+                job.state, job.error, job.finished_at = "failed", str(exc), time.time()
+                self.failed += 1
+            return
+        with self._lock:
+            job.track_id, job.cues, job.reused = track_id, len(track), reused
+            job.state, job.finished_at = "done", time.time()
+            if reused:
+                self.reused += 1
+            else:
+                self.parsed += 1
+
+    # Public API -------------------------------------------------------
+    def submit(self, key: str, path: str | Path, *, warm: bool = True) -> PreprocessJob:
+        """Queue `path` under `key` unless a job for it is queued, running or done.
+
+        Failed jobs are retried. `key` is usually the file's SHA-256.
+        """
+
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.state != "failed":
+                self._jobs.move_to_end(key)
+                return job
+            job = PreprocessJob(key=key, path=str(path), queued_at=time.time())
+            self._jobs[key] = job
+            # Forget the oldest finished jobs; their artifacts stay on disk.
+            while len(self._jobs) > self.max_jobs:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.state in ("queued", "running"):
+                    break
+                self._jobs.popitem(last=False)
+            if not self._closed:
+                self._executor.submit(self._run, job, warm)
+        return job
+
+    def job(self, key: str) -> Optional[PreprocessJob]:
+        with self._lock:
+            return self._jobs.get(key)
+
+    def close(self) -> None:
+        """Finish running jobs and drop queued ones."""
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, int]:
+        """Return job counts by state and parse/reuse counters."""
+        with self._lock:
+            states = [job.state for job in self._jobs.values()]
+            return {
+                "queued": states.count("queued"),
+                "running": states.count("running"),
+                "done": states.count("done"),
+                "failed": states.count("failed"),
+                "parsed": self.parsed,
+                "reused": self.reused,
+                "errors": self.failed,
+            }
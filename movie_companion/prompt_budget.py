@@ -0,0 +1,207 @@
+"""Token-budgeted prompt assembly over precomputed per-cue token counts."""
+
+from __future__ import annotations
+
+import threading
+import weakref
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Protocol
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None  # type: ignore[assignment]
+
+from .subtitles import DEFAULT_CONTEXT_WINDOW_SECONDS, SubtitleIndex, context_window
+
+
+DEFAULT_TOKENIZER = "approx"
+
+
+class Tokenizer(Protocol):
+    """Counts the tokens a model would see for a piece of text."""
+
+    # Identifies the tokenizer; cached counts are kept per name.
+    name: str
+
+    def count(self, text: str) -> int:
+        ...
+
+
+class ApproximateTokenizer:
+    """Dependency-free estimate of roughly four characters per token."""
+
+    name = "approx"
+
+    def count(self, text: str) -> int:
+        return (len(text) + 3) // 4
+
+
+class TiktokenTokenizer:
+    """Exact counts for OpenAI-style BPE encodings via the optional `tiktoken` package."""
+
+    def __init__(self, encoding: str = "cl100k_base") -> None:
+        if tiktoken is None:
+            raise ValueError("The tiktoken tokenizer requires `pip install tiktoken`.")
+        self._encoding = tiktoken.get_encoding(encoding)
+        self.name = f"tiktoken:{encoding}"
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+def make_tokenizer(spec: str = DEFAULT_TOKENIZER) -> Tokenizer:
+    """Build a tokenizer from `approx`, `tiktoken` or `tiktoken:<encoding>`.
+
+    Raises:
+        ValueError: If the spec is unknown or its package is missing.
+    """
+
+    kind, _, option = spec.partition(":")
+    if kind == "approx":
+        return ApproximateTokenizer()
+    if kind == "tiktoken":
+        return TiktokenTokenizer(option or "cl100k_base")
+    raise ValueError(f"Unknown tokenizer: {spec}")
+
+
+_COUNTS: "weakref.WeakKeyDictionary[SubtitleIndex, Dict[str, array]]" = weakref.WeakKeyDictionary()
+_COUNTS_LOCK = threading.Lock()
+
+
+def cue_token_prefix(track: SubtitleIndex, tokenizer: Tokenizer) -> array:
+    """Return prefix sums of per-cue token counts, computed once per track and tokenizer.
+
+    `prefix[i]` is the token count of cues `[0, i)`, each including its
+    newline, so any cue range costs `prefix[hi] - prefix[lo]`.
+    """
+
+    with _COUNTS_LOCK:
+        prefix = _COUNTS.get(track, {}).get(tokenizer.name)
+    if prefix is None:
+        prefix = array("q", [0])
+        total = 0
+        for line in track.lines_between(0, len(track)):
+            total += tokenizer.count(line) + 1
+            prefix.append(total)
+        with _COUNTS_LOCK:
+            prefix = _COUNTS.setdefault(track, {}).setdefault(tokenizer.name, prefix)
+    return prefix
+
+
+def remember_cue_token_prefix(track: SubtitleIndex, tokenizer_name: str, prefix: array) -> None:
+    """Seed the memo with prefix sums computed earlier, e.g. loaded from disk."""
+
+    with _COUNTS_LOCK:
+        _COUNTS.setdefault(track, {}).setdefault(tokenizer_name, prefix)
+
+
+@dataclass
+class BudgetedPrompt:
+    """Prompt parts chosen to fit `max_tokens`, with the tokens each part uses."""
+
+    max_tokens: int
+    fixed_tokens: int
+    context: str = ""
+    context_start: int = 0
+    context_tokens: int = 0
+    passages: List[str] = field(default_factory=list)
+    passage_tokens: int = 0
+    summaries: List[str] = field(default_factory=list)
+    summary_tokens: int = 0
+    watched_limit: int = 0
+    history_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return (
+            self.fixed_tokens
+            + self.context_tokens
+            + self.passage_tokens
+            + self.summary_tokens
+            + self.history_tokens
+        )
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.max_tokens - self.total_tokens)
+
+    def usage(self) -> Dict[str, int]:
+        """Token counts per part, for responses and logs."""
+        return {
+            "budget": self.max_tokens,
+            "total": self.total_tokens,
+            "fixed": self.fixed_tokens,
+            "context": self.context_tokens,
+            "passages": self.passage_tokens,
+            "summaries": self.summary_tokens,
+            "history": self.history_tokens,
+        }
+
+
+class PromptBudget:
+    """Fill a token budget by priority: recent window, passages, scene summaries, history.
+
+    The fixed parts of the prompt (system prompt, title, timestamp, question)
+    are always sent and are counted first. The recent window replaces the
+    character cap of `extract_context`: it keeps the newest cues of the time
+    window whose precomputed token counts fit, found with one bisect. Call
+    `start`, then `add_passages`, `add_summaries` and `add_history` in that
+    order.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        *,
+        tokenizer: Optional[Tokenizer] = None,
+        window_seconds: Optional[int] = DEFAULT_CONTEXT_WINDOW_SECONDS,
+    ) -> None:
+        self.max_tokens = max(1, max_tokens)
+        self.tokenizer = tokenizer or ApproximateTokenizer()
+        self.window_seconds = window_seconds
+
+    def start(self, track: SubtitleIndex, seconds: int, fixed_text: str) -> BudgetedPrompt:
+        """Count the fixed text and take as much of the recent window as fits."""
+
+        prompt = BudgetedPrompt(max_tokens=self.max_tokens, fixed_tokens=self.tokenizer.count(fixed_text))
+        lo, hi = context_window(track, seconds, window_seconds=self.window_seconds, max_characters=None)
+        prefix = cue_token_prefix(track, self.tokenizer)
+        lo = bisect_left(prefix, prefix[hi] - prompt.remaining, lo, hi) if lo < hi else lo
+        prompt.context = track.text_between(lo, hi).strip()
+        prompt.context_start = lo
+        prompt.context_tokens = prefix[hi] - prefix[lo]
+        return prompt
+
+    def add_passages(self, prompt: BudgetedPrompt, passages: List[str]) -> None:
+        """Keep the passages that still fit, in the order given."""
+
+        for passage in passages:
+            cost = self.tokenizer.count(passage) + 1
+            if cost <= prompt.remaining:
+                prompt.passages.append(passage)
+                prompt.passage_tokens += cost
+
+    def add_summaries(self, prompt: BudgetedPrompt, summaries: List[str]) -> None:
+        """Keep the most recent scene summaries that still fit, oldest first."""
+
+        kept: List[str] = []
+        for summary in reversed(summaries):
+            cost = self.tokenizer.count(summary) + 1
+            if cost > prompt.remaining:
+                break
+            kept.append(summary)
+            prompt.summary_tokens += cost
+        prompt.summaries = kept[::-1]
+
+    def add_history(self, prompt: BudgetedPrompt, watched_entries: List[str]) -> None:
+        """Keep the most recent previously watched entries that still fit."""
+
+        for entry in reversed(watched_entries):
+            cost = self.tokenizer.count(entry) + 1
+            if cost > prompt.remaining:
+                break
+            prompt.watched_limit += 1
+            prompt.history_tokens += cost
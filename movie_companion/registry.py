@@ -0,0 +1,125 @@
+"""Process-level registry that reuses companions (and their LLM clients) across requests."""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Dict, Optional, Tuple
+
+from .answer_cache import AnswerCache
+from .assistant import CompanionConfig, MovieCompanion
+from .history import WatchedHistory
+from .singleflight import SingleFlight
+
+
+DEFAULT_REGISTRY_MAX_ENTRIES = 16
+
+CompanionKey = Tuple[str, str, float, int]
+
+
+class CompanionRegistry:
+    """Hand out shared `MovieCompanion` instances keyed by model settings.
+
+    Companions are keyed on (provider, model, temperature, max output tokens);
+    every other setting comes from the base config. All companions share a
+    single `WatchedHistory`, so the history file is read once per process,
+    and the optional `AnswerCache` and `SingleFlight` coalescer.
+    The registry is a small LRU so arbitrary model names cannot grow it
+    without bound.
+    """
+
+    def __init__(
+        self,
+        base_config: Optional[CompanionConfig] = None,
+        *,
+        max_entries: int = DEFAULT_REGISTRY_MAX_ENTRIES,
+        history: Optional[WatchedHistory] = None,
+        answer_cache: Optional[AnswerCache] = None,
+        flights: Optional[SingleFlight] = None,
+    ) -> None:
+        self.base_config = base_config or CompanionConfig()
+        self.max_entries = max(1, max_entries)
+        self.history = history or WatchedHistory(self.base_config.history_path)
+        self.answer_cache = answer_cache
+        self.flights = flights
+        self._companions: "OrderedDict[CompanionKey, MovieCompanion]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _config_for(
+        self,
+        provider: Optional[str],
+        model: Optional[str],
+        temperature: Optional[float],
+        max_output_tokens: Optional[int],
+    ) -> CompanionConfig:
+        overrides = {}
+        if provider:
+            overrides["provider"] = provider
+        if model:
+            overrides["model"] = model
+        if temperature is not None:
+            overrides["temperature"] = temperature
+        if max_output_tokens is not None:
+            overrides["max_output_tokens"] = max_output_tokens
+        return replace(self.base_config, **overrides)
+
+    def get(
+        self,
+        *,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_output_tokens: Optional[int] = None,
+    ) -> MovieCompanion:
+        """Return the shared companion for these settings, creating it on first use.
+
+        Raises:
+            LLMConfigurationError: If the provider cannot be configured (nothing is cached).
+        """
+
+        config = self._config_for(provider, model, temperature, max_output_tokens)
+        key: CompanionKey = (
+            config.provider.lower(),
+            config.model,
+            float(config.temperature),
+            int(config.max_output_tokens),
+        )
+        with self._lock:
+            companion = self._companions.get(key)
+            if companion is not None:
+                self._companions.move_to_end(key)
+                self.hits += 1
+                return companion
+            self.misses += 1
+
+        # Construct outside the lock; a racing duplicate is harmless and discarded.
+        companion = MovieCompanion(
+            config,
+            history=self.history,
+            answer_cache=self.answer_cache,
+            flights=self.flights,
+        )
+        with self._lock:
+            existing = self._companions.get(key)
+            if existing is not None:
+                return existing
+            self._companions[key] = companion
+            while len(self._companions) > self.max_entries:
+                self._companions.popitem(last=False)
+                self.evictions += 1
+        return companion
+
+    def stats(self) -> Dict[str, int]:
+        """Return registry size and hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                "entries": len(self._companions),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
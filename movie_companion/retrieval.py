@@ -0,0 +1,204 @@
+"""Lexical (BM25) retrieval of earlier subtitle passages for long-range context."""
+
+from __future__ import annotations
+
+import math
+import re
+import sys
+import threading
+import weakref
+from array import array
+from bisect import bisect_left
+from heapq import nlargest
+from typing import Dict, List, Optional, Tuple
+
+from .subtitles import (
+    DEFAULT_CONTEXT_MAX_CHARACTERS,
+    DEFAULT_CONTEXT_WINDOW_SECONDS,
+    SubtitleIndex,
+    context_window,
+)
+from .time_utils import format_seconds
+
+
+DEFAULT_RETRIEVAL_TOP_K = 3
+DEFAULT_RETRIEVAL_CHUNK_CUES = 8
+
+# Okapi BM25 parameters.
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Function words that match almost every chunk and only add noise to scores.
+_STOPWORDS = frozenset(
+    """
+    a about all am an and any are as at be been but by can could did do does
+    for from had has have he her here him his how i if in into is it its just
+    me my no not now of on or our out she so some than that the their them
+    then there these they this to too up us was we were what when where which
+    who whom why will with would you your yeah oh okay ok uh um hey well get
+    got go going know like re s t ll ve d m don didn
+    """.split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords and single characters removed."""
+
+    return [
+        token
+        for token in _TOKEN_RE.findall(text.casefold())
+        if len(token) > 1 and token not in _STOPWORDS
+    ]
+
+
+class LexicalIndex:
+    """Inverted index over fixed-size chunks of consecutive cues.
+
+    Chunk `c` covers cues `[c * chunk_cues, (c + 1) * chunk_cues)` of the
+    end-sorted `SubtitleIndex`, so chunk order is end-time order. Each term's
+    postings are parallel `array('i')`s of chunk ids (ascending) and term
+    frequencies, which means the chunks allowed for a query are always a
+    prefix: document frequencies, the collection size and the average chunk
+    length are all computed over that prefix with a bisect and a prefix sum.
+    Scores therefore never depend on dialogue after the cutoff.
+
+    The index keeps no reference to the track, so it can be cached against
+    the track without keeping it alive.
+    """
+
+    __slots__ = ("chunk_cues", "cues", "postings", "lengths", "length_sums")
+
+    def __init__(self, track: SubtitleIndex, *, chunk_cues: int = DEFAULT_RETRIEVAL_CHUNK_CUES) -> None:
+        self.chunk_cues = max(1, chunk_cues)
+        self.cues = len(track)
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.lengths = array("i")
+        self.length_sums = array("q", [0])
+
+        total = 0
+        for chunk_id, lo in enumerate(range(0, len(track), self.chunk_cues)):
+            tokens = tokenize(track.text_between(lo, min(lo + self.chunk_cues, len(track))))
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                posting = self.postings.get(token)
+                if posting is None:
+                    posting = self.postings[token] = (array("i"), array("i"))
+                posting[0].append(chunk_id)
+                posting[1].append(count)
+            self.lengths.append(len(tokens))
+            total += len(tokens)
+            self.length_sums.append(total)
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the postings and chunk lengths."""
+        size = sys.getsizeof(self.postings)
+        for term, (ids, freqs) in self.postings.items():
+            size += sys.getsizeof(term) + ids.itemsize * len(ids) + freqs.itemsize * len(freqs)
+        return size + self.lengths.itemsize * len(self.lengths) + self.length_sums.itemsize * len(self.length_sums)
+
+    def chunk_range(self, chunk_id: int) -> Tuple[int, int]:
+        """Return the `[lo, hi)` cue range covered by a chunk."""
+        lo = chunk_id * self.chunk_cues
+        return lo, min(lo + self.chunk_cues, self.cues)
+
+    def search(
+        self, query: str, *, before_cue: int, top_k: int = DEFAULT_RETRIEVAL_TOP_K
+    ) -> List[Tuple[int, float]]:
+        """Return up to `top_k` `(chunk_id, score)` pairs, best first.
+
+        Only chunks made entirely of cues before `before_cue` are considered.
+        """
+
+        limit = min(max(0, before_cue) // self.chunk_cues, len(self.lengths))
+        terms = set(tokenize(query))
+        if top_k <= 0 or limit == 0 or not terms:
+            return []
+
+        average_length = self.length_sums[limit] / limit or 1.0
+        lengths = self.lengths
+        scores: Dict[int, float] = {}
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            ids, freqs = posting
+            df = bisect_left(ids, limit)
+            if df == 0:
+                continue
+            idf = math.log(1.0 + (limit - df + 0.5) / (df + 0.5))
+            for position in range(df):
+                chunk_id = ids[position]
+                tf = freqs[position]
+                norm = BM25_K1 * (1.0 - BM25_B + BM25_B * lengths[chunk_id] / average_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (BM25_K1 + 1.0) / (tf + norm)
+
+        return nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+
+_INDEXES: "weakref.WeakKeyDictionary[SubtitleIndex, LexicalIndex]" = weakref.WeakKeyDictionary()
+_INDEXES_LOCK = threading.Lock()
+
+
+def lexical_index(track: SubtitleIndex, *, chunk_cues: int = DEFAULT_RETRIEVAL_CHUNK_CUES) -> LexicalIndex:
+    """Return the lexical index for `track`, building it on first use.
+
+    The index lives as long as the track does, so every cache entry,
+    playback session or request holding the track shares one build. The
+    chunk size of the first build wins.
+    """
+
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(track)
+    if index is None:
+        built = LexicalIndex(track, chunk_cues=chunk_cues)
+        with _INDEXES_LOCK:
+            index = _INDEXES.setdefault(track, built)
+    return index
+
+
+def retrieve_passages(
+    track: SubtitleIndex,
+    question: str,
+    seconds: int,
+    *,
+    top_k: int = DEFAULT_RETRIEVAL_TOP_K,
+    window_seconds: Optional[int] = DEFAULT_CONTEXT_WINDOW_SECONDS,
+    max_characters: Optional[int] = DEFAULT_CONTEXT_MAX_CHARACTERS,
+    chunk_cues: int = DEFAULT_RETRIEVAL_CHUNK_CUES,
+    before_cue: Optional[int] = None,
+) -> List[str]:
+    """Return rendered passages relevant to `question` from before the recent window.
+
+    Only cues that end before the `extract_context` window for `seconds`
+    (with the same limits) are searched, so passages never repeat the recent
+    context and never reach past the timestamp. Pass `before_cue` when the
+    window was chosen some other way. Passages come back in chronological
+    order.
+    """
+
+    if top_k <= 0:
+        return []
+    lo = before_cue
+    if lo is None:
+        lo, _ = context_window(track, seconds, window_seconds=window_seconds, max_characters=max_characters)
+    index = lexical_index(track, chunk_cues=chunk_cues)
+    hits = index.search(question, before_cue=lo, top_k=top_k)
+    return render_passages(track, [index.chunk_range(chunk_id) for chunk_id, _ in hits])
+
+
+def render_passages(track: SubtitleIndex, ranges: List[Tuple[int, int]]) -> List[str]:
+    """Format `[lo, hi)` cue ranges for the prompt, in chronological order."""
+
+    passages = []
+    for lo, hi in sorted(ranges):
+        start = format_seconds(min(track.starts[lo:hi]) // 1000)
+        passages.append(f"[{start}] " + " ".join(track.lines_between(lo, hi)))
+    return passages
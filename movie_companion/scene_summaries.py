@@ -0,0 +1,285 @@
+"""Background scene summaries that give questions a compact recap of earlier events."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import ContextManager, Dict, List, Optional, Tuple
+
+from .file_lock import FileLock
+from .llm import LLMClient
+from .subtitles import SubtitleIndex, track_fingerprint
+from .time_utils import format_seconds
+
+
+DEFAULT_SUMMARY_DIR = Path("data/summaries")
+DEFAULT_SCENE_GAP_SECONDS = 8
+DEFAULT_SCENE_MIN_SECONDS = 60
+DEFAULT_SCENE_MAX_SECONDS = 5 * 60
+DEFAULT_SUMMARY_INPUT_MAX_CHARACTERS = 6000
+DEFAULT_SUMMARY_MAX_TRACKS = 256
+# After a failed run a track is retried after this long, doubling per failure up to the maximum.
+DEFAULT_SUMMARY_RETRY_SECONDS = 60.0
+DEFAULT_SUMMARY_MAX_RETRY_SECONDS = 60 * 60.0
+
+_FORMAT_VERSION = 1
+
+
+def segment_track(
+    track: SubtitleIndex,
+    *,
+    gap_seconds: float = DEFAULT_SCENE_GAP_SECONDS,
+    min_seconds: float = DEFAULT_SCENE_MIN_SECONDS,
+    max_seconds: float = DEFAULT_SCENE_MAX_SECONDS,
+) -> List[Tuple[int, int]]:
+    """Split a track into `[lo, hi)` cue ranges at pauses in the dialogue.
+
+    A new segment starts at a silence of at least `gap_seconds` once the
+    current one spans `min_seconds`, and always once it spans `max_seconds`.
+    """
+
+    starts, ends = track.starts, track.ends
+    gap_ms, min_ms, max_ms = gap_seconds * 1000, min_seconds * 1000, max_seconds * 1000
+    segments: List[Tuple[int, int]] = []
+    lo = 0
+    for i in range(1, len(track)):
+        span = ends[i - 1] - starts[lo]
+        if span >= max_ms or (span >= min_ms and starts[i] - ends[i - 1] >= gap_ms):
+            segments.append((lo, i))
+            lo = i
+    if lo < len(track):
+        segments.append((lo, len(track)))
+    return segments
+
+
+@dataclass
+class SceneSummary:
+    lo: int
+    hi: int
+    start_ms: int
+    end_ms: int
+    summary: str
+
+    def render(self) -> str:
+        return f"[{format_seconds(self.start_ms // 1000)}-{format_seconds(self.end_ms // 1000)}] {self.summary}"
+
+
+@dataclass
+class _TrackSummaries:
+    scenes: List[SceneSummary]
+    complete: bool
+
+
+class SceneSummaryStore:
+    """Summarizes tracks scene by scene in the background and serves the results.
+
+    Summaries are written to `<directory>/<track fingerprint>.json` after
+    every scene, so they survive restarts, are shared by every viewer of the
+    same subtitles, and a half-finished track resumes where it stopped.
+    Questions never wait: they get the scenes summarized so far that ended
+    before the cutoff. With `shared=True` a file lock makes sure only one
+    worker process summarizes a given track. A track whose run failed (say,
+    the summary model is down) is not retried until a backoff has passed.
+    """
+
+    def __init__(
+        self,
+        llm: LLMClient,
+        *,
+        directory: str | Path = DEFAULT_SUMMARY_DIR,
+        gap_seconds: float = DEFAULT_SCENE_GAP_SECONDS,
+        min_seconds: float = DEFAULT_SCENE_MIN_SECONDS,
+        max_seconds: float = DEFAULT_SCENE_MAX_SECONDS,
+        input_max_characters: int = DEFAULT_SUMMARY_INPUT_MAX_CHARACTERS,
+        max_tracks: int = DEFAULT_SUMMARY_MAX_TRACKS,
+        retry_seconds: float = DEFAULT_SUMMARY_RETRY_SECONDS,
+        max_retry_seconds: float = DEFAULT_SUMMARY_MAX_RETRY_SECONDS,
+        shared: bool = False,
+    ) -> None:
+        self.llm = llm
+        self.directory = Path(directory)
+        self.gap_seconds = gap_seconds
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.input_max_characters = max(1, input_max_characters)
+        self.max_tracks = max(1, max_tracks)
+        self.retry_seconds = retry_seconds
+        self.max_retry_seconds = max_retry_seconds
+        self.shared = shared
+        self._tracks: "OrderedDict[str, _TrackSummaries]" = OrderedDict()
+        self._fingerprints: "weakref.WeakKeyDictionary[SubtitleIndex, str]" = weakref.WeakKeyDictionary()
+        self._jobs: Dict[str, Future] = {}
+        # fingerprint -> (consecutive failed runs, monotonic time of the next allowed run)
+        self._failures: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        # One worker: summaries are a background nicety and must not crowd out answers.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scene-summaries")
+        self._closed = False
+        self.scenes_summarized = 0
+        self.errors = 0
+
+    # Internal helpers -------------------------------------------------
+    def _path(self, fingerprint: str) -> Path:
+        return self.directory / f"{fingerprint}.json"
+
+    def _fingerprint(self, track: SubtitleIndex) -> str:
+        with self._lock:
+            fingerprint = self._fingerprints.get(track)
+        if fingerprint is None:
+            fingerprint = track_fingerprint(track)
+            with self._lock:
+                self._fingerprints[track] = fingerprint
+        return fingerprint
+
+    def _read(self, fingerprint: str) -> Optional[_TrackSummaries]:
+        try:
+            with self._path(fingerprint).open("r", encoding="utf-8") as handle:
+                data = json.load(handle)
+            scenes = [SceneSummary(**scene) for scene in data.get("scenes", [])]
+        except (OSError, ValueError, TypeError):
+            return None
+        return _TrackSummaries(scenes=scenes, complete=bool(data.get("complete")))
+
+    def _write(self, fingerprint: str, summaries: _TrackSummaries) -> None:
+        path = self._path(fingerprint)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": _FORMAT_VERSION,
+            "complete": summaries.complete,
+            "scenes": [asdict(scene) for scene in summaries.scenes],
+        }
+        fd, tmp_name = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(data, handle)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    def _publish(self, fingerprint: str, summaries: _TrackSummaries) -> None:
+        with self._lock:
+            self._tracks[fingerprint] = summaries
+            self._tracks.move_to_end(fingerprint)
+            while len(self._tracks) > self.max_tracks:
+                self._tracks.popitem(last=False)
+
+    def _file_lock(self, fingerprint: str) -> ContextManager:
+        if not self.shared:
+            return nullcontext()
+        return FileLock(self._path(fingerprint).with_suffix(".json.lock"))
+
+    def _summarize(self, fingerprint: str, track: SubtitleIndex) -> None:
+        with self._file_lock(fingerprint):
+            stored = self._read(fingerprint)
+            if stored is not None and stored.complete:
+                self._publish(fingerprint, stored)
+                return
+            known = {(scene.lo, scene.hi): scene for scene in (stored.scenes if stored else [])}
+            scenes: List[SceneSummary] = []
+            segments = segment_track(
+                track,
+                gap_seconds=self.gap_seconds,
+                min_seconds=self.min_seconds,
+                max_seconds=self.max_seconds,
+            )
+            for lo, hi in segments:
+                if self._closed:
+                    return
+                scene = known.get((lo, hi))
+                if scene is None:
+                    start_ms, end_ms = min(track.starts[lo:hi]), track.ends[hi - 1]
+                    summary = self.llm.summarize_scene(
+                        start=format_seconds(start_ms // 1000),
+                        end=format_seconds(end_ms // 1000),
+                        dialogue=track.text_between(lo, hi)[: self.input_max_characters],
+                    )
+                    scene = SceneSummary(lo=lo, hi=hi, start_ms=start_ms, end_ms=end_ms, summary=summary)
+                    with self._lock:
+                        self.scenes_summarized += 1
+                scenes.append(scene)
+                progress = _TrackSummaries(scenes=list(scenes), complete=len(scenes) == len(segments))
+                if scene is not known.get((lo, hi)) or progress.complete:
+                    self._write(fingerprint, progress)
+                self._publish(fingerprint, progress)
+
+    def _run(self, fingerprint: str, track: SubtitleIndex) -> None:
+        try:
+            self._summarize(fingerprint, track)
+            with self._lock:
+                self._failures.pop(fingerprint, None)
+        except Exception as exc:  # keep the partial summaries; ensure() retries after a backoff
+            with self._lock:
+                self.errors += 1
+                failures = self._failures.get(fingerprint, (0, 0.0))[0] + 1
+                delay = min(self.retry_seconds * 2 ** (failures - 1), self.max_retry_seconds)
+                self._failures[fingerprint] = (failures, time.monotonic() + delay)
+            logging.getLogger(__name__).warning("Scene summarization failed", exc_info=exc)
+        finally:
+            with self._lock:
+                self._jobs.pop(fingerprint, None)
+
+    # Public API -------------------------------------------------------
+    def ensure(self, track: SubtitleIndex) -> None:
+        """Start summarizing `track` in the background unless it is done, underway or backing off."""
+
+        fingerprint = self._fingerprint(track)
+        with self._lock:
+            if self._closed or fingerprint in self._jobs:
+                return
+            failure = self._failures.get(fingerprint)
+            if failure is not None and time.monotonic() < failure[1]:
+                return
+            summaries = self._tracks.get(fingerprint)
+            if summaries is not None and summaries.complete:
+                return
+            self._jobs[fingerprint] = self._executor.submit(self._run, fingerprint, track)
+
+    def summaries_before(self, track: SubtitleIndex, before_cue: int) -> List[str]:
+        """Rendered summaries of the scenes that end before cue `before_cue`, oldest first.
+
+        Starts summarization if the track has not been fully summarized yet.
+        """
+
+        fingerprint = self._fingerprint(track)
+        with self._lock:
+            summaries = self._tracks.get(fingerprint)
+            if summaries is not None:
+                self._tracks.move_to_end(fingerprint)
+        if summaries is None:
+            summaries = self._read(fingerprint)
+            if summaries is not None:
+                self._publish(fingerprint, summaries)
+        if summaries is None or not summaries.complete:
+            self.ensure(track)
+        if summaries is None:
+            return []
+        return [scene.render() for scene in summaries.scenes if scene.hi <= before_cue]
+
+    def close(self) -> None:
+        """Stop after the scene in progress and drop queued tracks."""
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, int]:
+        """Return track counts and summarization counters."""
+        with self._lock:
+            return {
+                "tracks": len(self._tracks),
+                "complete": sum(1 for summaries in self._tracks.values() if summaries.complete),
+                "jobs": len(self._jobs),
+                "backing_off": sum(1 for _, retry_at in self._failures.values() if time.monotonic() < retry_at),
+                "scenes_summarized": self.scenes_summarized,
+                "errors": self.errors,
+            }
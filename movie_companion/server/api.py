@@ -3,20 +3,130 @@
 from __future__ import annotations
 
 import asyncio
+import json
 import logging
 import os
+import uuid
+from dataclasses import asdict, replace
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Optional
 
-from fastapi import FastAPI, HTTPException, Body
+from fastapi import FastAPI, HTTPException, Body, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.requests import ClientDisconnect
 from pydantic import BaseModel, Field
 
+from movie_companion.answer_cache import (
+    DEFAULT_ANSWER_CACHE_MAX_ENTRIES,
+    DEFAULT_ANSWER_CACHE_TTL_SECONDS,
+    DEFAULT_TIMESTAMP_BUCKET_SECONDS,
+    AnswerCache,
+)
 from movie_companion.assistant import CompanionConfig, MovieCompanion
-from movie_companion.subtitles import extract_context_from_text
+from movie_companion.embeddings import (
+    DEFAULT_EMBEDDING_CACHE_DIR,
+    DEFAULT_HASHING_DIMENSIONS,
+    DEFAULT_OLLAMA_EMBEDDING_MODEL,
+    EmbeddingError,
+    EmbeddingStore,
+    HashingEmbedder,
+    OllamaEmbedder,
+)
+from movie_companion.history import DEFAULT_FLUSH_MAX_BATCH, WatchedHistory
+from movie_companion.library import LibraryEntry, open_library_store
+from movie_companion.playback_sessions import (
+    DEFAULT_SESSION_MAX_ENTRIES,
+    DEFAULT_SESSION_TTL_SECONDS,
+    PlaybackSessionStore,
+    session_track_id,
+)
+from movie_companion.llm import LLMConfigurationError, aclose_async_clients
+from movie_companion.preprocess import DEFAULT_PREPROCESS_WORKERS, SubtitlePreprocessor, TrackArtifactStore
+from movie_companion.prompt_budget import DEFAULT_TOKENIZER, PromptBudget, make_tokenizer
+from movie_companion.registry import DEFAULT_REGISTRY_MAX_ENTRIES, CompanionRegistry
+from movie_companion.retrieval import (
+    DEFAULT_RETRIEVAL_CHUNK_CUES,
+    DEFAULT_RETRIEVAL_TOP_K,
+    retrieve_passages,
+)
+from movie_companion.scene_summaries import DEFAULT_SUMMARY_DIR, SceneSummaryStore
+from movie_companion.server.playback_channel import PlaybackChannel
+from movie_companion.server.upload_form import receive_upload_form
+from movie_companion.server.video_stream import DEFAULT_STREAM_CHUNK_BYTES, resolve_media_path, video_response
+from movie_companion.singleflight import SingleFlight
+from movie_companion.subtitle_cache import (
+    DEFAULT_CACHE_MAX_BYTES,
+    DEFAULT_CACHE_MAX_ENTRIES,
+    DEFAULT_TRACK_TTL_SECONDS,
+    SubtitleCache,
+)
+from movie_companion.subtitles import (
+    PlaybackContextTracker,
+    SubtitleLoaderError,
+    context_window,
+    extract_context,
+    load_subtitles,
+)
 from movie_companion.time_utils import parse_timestamp, format_seconds
+from movie_companion.uploads import (
+    DEFAULT_MEDIA_DIR,
+    DEFAULT_UPLOAD_SESSION_TTL_SECONDS,
+    MediaStore,
+    StoredFile,
+    UploadBusy,
+    UploadError,
+    UploadOffsetMismatch,
+)
+
+
+# ------------------------------------------------------------
+# Models
+# ------------------------------------------------------------
+
+class TrackAskRequest(BaseModel):
+    title: str = Field(..., description="Movie or episode title")
+    timestamp: str | int = Field(..., description="Current playback timestamp")
+    question: str = Field(..., description="Viewer question")
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    temperature: Optional[float] = None
+    max_output_tokens: Optional[int] = None
+    previously_watched: Optional[list[str]] = None
+
+
+class AskRequest(TrackAskRequest):
+    subtitles_text: str = Field(..., description="Full subtitle file content as text")
+
+
+class RegisterSubtitlesRequest(BaseModel):
+    subtitles_text: str = Field(..., description="Full subtitle file content as text")
+
+
+class CreateUploadRequest(BaseModel):
+    kind: str = Field(..., description="`video` or `subtitles`")
+    filename: str = Field(..., description="Original file name")
+    size: int = Field(..., ge=0, description="Total size of the file in bytes")
+
+
+class TrackContextRequest(BaseModel):
+    timestamp: str | int = Field(..., description="Current playback timestamp")
+
+
+class SessionContextRequest(TrackContextRequest):
+    version: Optional[int] = Field(None, description="Context version the client currently holds")
+
+
+def _check_subtitles(path: Path) -> None:
+    """Reject subtitle uploads without a single readable cue."""
+    if len(load_subtitles(path)) == 0:
+        raise SubtitleLoaderError("No subtitle cues found.")
+
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
 # ------------------------------------------------------------
@@ -50,20 +160,200 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
-    # ------------------------------------------------------------
-    # Models
-    # ------------------------------------------------------------
+    # Parsed subtitle tracks shared by /context, /ask and registered track IDs,
+    # keyed by content hash. Idle tracks expire so registrations stay bounded.
+    retrieval_top_k = int(os.getenv("RETRIEVAL_TOP_K", DEFAULT_RETRIEVAL_TOP_K))
+    retrieval_chunk_cues = int(os.getenv("RETRIEVAL_CHUNK_CUES", DEFAULT_RETRIEVAL_CHUNK_CUES))
+    subtitle_cache = SubtitleCache(
+        max_entries=int(os.getenv("SUBTITLE_CACHE_MAX_ENTRIES", DEFAULT_CACHE_MAX_ENTRIES)),
+        max_bytes=int(os.getenv("SUBTITLE_CACHE_MAX_BYTES", DEFAULT_CACHE_MAX_BYTES)),
+        ttl_seconds=float(os.getenv("SUBTITLE_TRACK_TTL_SECONDS", DEFAULT_TRACK_TTL_SECONDS)),
+        # Build the retrieval index when a track is parsed, not on the first question.
+        chunk_cues=retrieval_chunk_cues if retrieval_top_k > 0 else None,
+    )
+
+    # Playback sessions keep a sliding context window per viewer so each tick
+    # only sends the cues that changed.
+    sessions = PlaybackSessionStore(
+        max_entries=int(os.getenv("PLAYBACK_SESSION_MAX_ENTRIES", DEFAULT_SESSION_MAX_ENTRIES)),
+        ttl_seconds=float(os.getenv("PLAYBACK_SESSION_TTL_SECONDS", DEFAULT_SESSION_TTL_SECONDS)),
+    )
+
+    # Connection pool and concurrency limits for the async LLM client.
+    llm_limits = {
+        "request_timeout": float(os.getenv("LLM_REQUEST_TIMEOUT", "60")),
+        "max_connections": int(os.getenv("LLM_MAX_CONNECTIONS", "100")),
+        "max_keepalive_connections": int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20")),
+        "max_concurrency": int(os.getenv("LLM_MAX_CONCURRENCY", "32")),
+    }
+
+    # Answers to repeated questions at nearby timestamps; optionally persisted
+    # so they survive restarts.
+    answer_cache = AnswerCache(
+        max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", DEFAULT_ANSWER_CACHE_MAX_ENTRIES)),
+        ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", DEFAULT_ANSWER_CACHE_TTL_SECONDS)),
+        bucket_seconds=int(os.getenv("ANSWER_CACHE_BUCKET_SECONDS", DEFAULT_TIMESTAMP_BUCKET_SECONDS)),
+        path=os.getenv("ANSWER_CACHE_PATH") or None,
+    )
+
+    # Companions (and their LLM clients) are reused across requests and share
+    # one watched-history store and answer cache. Identical concurrent asks
+    # share a single upstream LLM call.
+    flights = SingleFlight()
+    base_config = CompanionConfig(
+        **llm_limits,
+        ollama_base_url=os.getenv("OLLAMA_BASE_URL", CompanionConfig.ollama_base_url),
+        ollama_keep_alive=os.getenv("OLLAMA_KEEP_ALIVE") or None,
+    )
+    # Several uvicorn workers share the history and library files; run_server.py
+    # sets this when started with --workers > 1.
+    shared_state = os.getenv("SHARED_STATE", "").lower() in {"1", "true", "yes"}
+    # History writes are batched off the request path by a background thread.
+    history = WatchedHistory(
+        base_config.history_path,
+        flush_interval=float(os.getenv("HISTORY_FLUSH_INTERVAL_SECONDS", "1.0")),
+        max_batch=int(os.getenv("HISTORY_FLUSH_MAX_BATCH", DEFAULT_FLUSH_MAX_BATCH)),
+        shared=shared_state,
+    )
+    companions = CompanionRegistry(
+        base_config,
+        history=history,
+        max_entries=int(os.getenv("COMPANION_REGISTRY_MAX_ENTRIES", DEFAULT_REGISTRY_MAX_ENTRIES)),
+        answer_cache=answer_cache,
+        flights=flights,
+    )
 
-    class AskRequest(BaseModel):
-        title: str = Field(..., description="Movie or episode title")
-        timestamp: str | int = Field(..., description="Current playback timestamp")
-        subtitles_text: str = Field(..., description="Full subtitle file content as text")
-        question: str = Field(..., description="Viewer question")
-        provider: Optional[str] = None
-        model: Optional[str] = None
-        temperature: Optional[float] = None
-        max_output_tokens: Optional[int] = None
-        previously_watched: Optional[list[str]] = None
+    # Optional token budget for the prompt; it replaces the character cap on
+    # the recent window and also limits passages and watched history.
+    prompt_token_budget = int(os.getenv("PROMPT_TOKEN_BUDGET", "0"))
+    prompt_budget: Optional[PromptBudget] = None
+    if prompt_token_budget > 0:
+        prompt_budget = PromptBudget(
+            prompt_token_budget,
+            tokenizer=make_tokenizer(os.getenv("PROMPT_TOKENIZER", DEFAULT_TOKENIZER)),
+        )
+
+    # Optional embedding retrieval instead of BM25. Vectors are persisted per
+    # track under EMBEDDING_CACHE_DIR and memory-mapped on later loads.
+    embedding_store: Optional[EmbeddingStore] = None
+    if os.getenv("RETRIEVAL_BACKEND", "bm25").lower() == "embedding":
+        if os.getenv("EMBEDDING_BACKEND", "ollama").lower() == "hashing":
+            embedder = HashingEmbedder(int(os.getenv("EMBEDDING_DIMENSIONS", DEFAULT_HASHING_DIMENSIONS)))
+        else:
+            embedder = OllamaEmbedder(
+                os.getenv("OLLAMA_BASE_URL", base_config.ollama_base_url),
+                os.getenv("EMBEDDING_MODEL", DEFAULT_OLLAMA_EMBEDDING_MODEL),
+                timeout=base_config.request_timeout,
+            )
+        embedding_store = EmbeddingStore(
+            embedder,
+            cache_dir=os.getenv("EMBEDDING_CACHE_DIR", str(DEFAULT_EMBEDDING_CACHE_DIR)),
+            chunk_cues=retrieval_chunk_cues,
+        )
+
+    # Optional scene summaries, generated in the background once per track and
+    # stored on disk, so questions carry a recap of everything before the window.
+    summary_store: Optional[SceneSummaryStore] = None
+    if os.getenv("SCENE_SUMMARIES", "").lower() in {"1", "true", "yes"}:
+        try:
+            summarizer = companions.get(
+                provider=os.getenv("SUMMARY_PROVIDER") or None,
+                model=os.getenv("SUMMARY_MODEL") or None,
+            )
+        except LLMConfigurationError as exc:
+            logging.getLogger(__name__).error("Scene summaries disabled", exc_info=exc)
+        else:
+            summary_store = SceneSummaryStore(
+                summarizer.llm,
+                directory=os.getenv("SUMMARY_DIR", str(DEFAULT_SUMMARY_DIR)),
+                shared=shared_state,
+            )
+
+    # Library metadata; a .sqlite3/.db path selects the SQLite backend.
+    library = open_library_store(os.getenv("LIBRARY_PATH", "data/library.json"), shared=shared_state)
+    # Uploaded files, stored once per content hash, and resumable upload sessions.
+    media = MediaStore(
+        os.getenv("MEDIA_DIR", str(DEFAULT_MEDIA_DIR)),
+        session_ttl_seconds=float(os.getenv("UPLOAD_SESSION_TTL_SECONDS", DEFAULT_UPLOAD_SESSION_TTL_SECONDS)),
+        shared=shared_state,
+        in_use=lambda sha256: bool(library.find_by_hash(sha256)),
+    )
+    # Largest slice of a video file held in memory per streaming response.
+    stream_chunk_bytes = int(os.getenv("VIDEO_STREAM_CHUNK_BYTES", DEFAULT_STREAM_CHUNK_BYTES))
+
+    # Subtitle files attached to the library are parsed, token-counted and saved
+    # under media/subtitles/tracks by a background pool, so the first viewer
+    # finds them ready. The subtitle cache loads saved tracks instead of parsing.
+    track_artifacts = TrackArtifactStore(media.root / "subtitles" / "tracks", shared=shared_state)
+    subtitle_cache.loader = track_artifacts.load_track
+
+    def _index_embeddings(track_id: str, track) -> None:
+        try:
+            embedding_store.index_for(track)
+        except EmbeddingError as exc:
+            logging.getLogger(__name__).warning("Embedding index not built for %s", track_id, exc_info=exc)
+
+    preprocess_workers = int(os.getenv("SUBTITLE_PREPROCESS_WORKERS", DEFAULT_PREPROCESS_WORKERS))
+    preprocessor: Optional[SubtitlePreprocessor] = None
+    if preprocess_workers > 0:
+        on_ready = [subtitle_cache.add]
+        if embedding_store is not None:
+            on_ready.append(_index_embeddings)
+        if summary_store is not None:
+            on_ready.append(lambda track_id, track: summary_store.ensure(track))
+        preprocessor = SubtitlePreprocessor(
+            track_artifacts,
+            tokenizer=prompt_budget.tokenizer if prompt_budget is not None else None,
+            on_ready=on_ready,
+            workers=preprocess_workers,
+        )
+
+    def _preprocess_subtitles(entry: LibraryEntry, *, warm: bool = True):
+        if preprocessor is None or not entry.subtitle_path:
+            return None
+        return preprocessor.submit(
+            entry.subtitle_sha256 or entry.subtitle_path, resolve_media_path(entry.subtitle_path), warm=warm
+        )
+
+    # Load the Ollama model (and prefill the system prompt) at startup instead of
+    # on the first question. Runs in the background so startup is not delayed.
+    warmup_model = os.getenv("OLLAMA_WARMUP_MODEL")
+    warmup_tasks: set[asyncio.Task] = set()
+
+    async def _warm_up(model: str) -> None:
+        try:
+            await companions.get(provider="ollama", model=model).llm.awarm_up()
+        except RuntimeError as exc:
+            logging.getLogger(__name__).warning("Ollama warm-up failed", exc_info=exc)
+        else:
+            logging.getLogger(__name__).info("Ollama model %s is loaded", model)
+
+    @app.on_event("startup")
+    async def warm_up_ollama() -> None:
+        if warmup_model:
+            task = asyncio.create_task(_warm_up(warmup_model))
+            warmup_tasks.add(task)
+            task.add_done_callback(warmup_tasks.discard)
+
+    @app.on_event("startup")
+    async def preprocess_library_subtitles() -> None:
+        # Catch up on subtitles added while the server was down; finished ones are skipped.
+        if preprocessor is not None:
+            for entry in library.list_videos():
+                _preprocess_subtitles(entry, warm=False)
+
+    @app.on_event("shutdown")
+    async def close_llm_clients() -> None:
+        for task in warmup_tasks:
+            task.cancel()
+        await aclose_async_clients()
+        answer_cache.close()
+        history.close()
+        library.close()
+        if summary_store is not None:
+            summary_store.close()
+        if preprocessor is not None:
+            preprocessor.close()
 
     # ------------------------------------------------------------
     # Routes
@@ -73,51 +363,144 @@ def create_app() -> FastAPI:
     async def health() -> dict[str, str]:
         return {"status": "ok", "mode": "vercel-demo"}
 
+    @app.get("/cache/subtitles")
+    async def subtitle_cache_stats() -> dict[str, int]:
+        return subtitle_cache.stats()
+
+    @app.get("/cache/companions")
+    async def companion_registry_stats() -> dict[str, int]:
+        return companions.stats()
+
+    @app.get("/cache/answers")
+    async def answer_cache_stats() -> dict:
+        return answer_cache.stats()
+
+    @app.get("/cache/sessions")
+    async def playback_session_stats() -> dict[str, int]:
+        return sessions.stats()
+
+    @app.get("/cache/inflight")
+    async def inflight_stats() -> dict[str, int]:
+        return flights.stats()
+
+    @app.get("/cache/embeddings")
+    async def embedding_stats() -> dict:
+        return embedding_store.stats() if embedding_store is not None else {"enabled": False}
+
+    @app.get("/cache/summaries")
+    async def summary_stats() -> dict:
+        return summary_store.stats() if summary_store is not None else {"enabled": False}
+
+    @app.get("/history/stats")
+    async def history_stats() -> dict:
+        return history.stats()
+
+    @app.get("/cache/preprocess")
+    async def preprocess_stats() -> dict:
+        return preprocessor.stats() if preprocessor is not None else {"enabled": False}
+
+    @app.get("/media/stats")
+    async def media_stats() -> dict[str, int]:
+        return media.stats()
+
     @app.post("/context")
     async def get_context(payload: AskRequest = Body(...)) -> dict:
         seconds = parse_timestamp(payload.timestamp)
-        context = extract_context_from_text(
-            subtitles_text=payload.subtitles_text,
-            current_time=seconds,
-        )
+        subtitles = subtitle_cache.get_or_parse(payload.subtitles_text)
+        context = extract_context(subtitles, seconds)
         return {
             "context": context,
             "timestamp": format_seconds(seconds),
         }
 
-    def _build_companion_config(request: AskRequest) -> CompanionConfig:
-        config_kwargs = {}
-        if request.provider:
-            config_kwargs["provider"] = request.provider
-        if request.model:
-            config_kwargs["model"] = request.model
-        if request.temperature is not None:
-            config_kwargs["temperature"] = request.temperature
-        if request.max_output_tokens is not None:
-            config_kwargs["max_output_tokens"] = request.max_output_tokens
-        return CompanionConfig(**config_kwargs)
+    def _companion_for(request: TrackAskRequest) -> MovieCompanion:
+        return companions.get(
+            provider=request.provider,
+            model=request.model,
+            temperature=request.temperature,
+            max_output_tokens=request.max_output_tokens,
+        )
 
-    @app.post("/ask")
-    async def ask_question(payload: AskRequest = Body(...)) -> dict:
-        seconds = parse_timestamp(payload.timestamp)
-        context = extract_context_from_text(
-            subtitles_text=payload.subtitles_text,
-            current_time=seconds,
+    async def _passages(
+        subtitles, question: str, seconds: int, before_cue: Optional[int] = None
+    ) -> list[str]:
+        if embedding_store is not None:
+            try:
+                # Embedding calls block (and the first one per track builds the index).
+                return await asyncio.to_thread(
+                    embedding_store.retrieve_passages,
+                    subtitles,
+                    question,
+                    seconds,
+                    top_k=retrieval_top_k,
+                    before_cue=before_cue,
+                )
+            except EmbeddingError as exc:
+                logging.getLogger(__name__).warning("Embedding retrieval failed; using BM25", exc_info=exc)
+        return retrieve_passages(
+            subtitles,
+            question,
+            seconds,
+            top_k=retrieval_top_k,
+            chunk_cues=retrieval_chunk_cues,
+            before_cue=before_cue,
+        )
+
+    async def _summaries(subtitles, before_cue: int) -> list[str]:
+        if summary_store is None:
+            return []
+        # The first call per track hashes the whole track and reads (and, shared, locks) its file.
+        return await asyncio.to_thread(summary_store.summaries_before, subtitles, before_cue)
+
+    async def _prompt_parts(
+        payload: TrackAskRequest, subtitles, seconds: int, companion: MovieCompanion
+    ) -> tuple[dict, Optional[dict]]:
+        """Choose context, passages and history for the prompt, plus token usage if budgeted."""
+
+        if prompt_budget is None:
+            window_start, _ = context_window(subtitles, seconds)
+            return {
+                "context": extract_context(subtitles, seconds),
+                "passages": await _passages(subtitles, payload.question, seconds),
+                "summaries": await _summaries(subtitles, window_start),
+            }, None
+
+        # With shared state this may reload the history file under a cross-process lock.
+        history_record = await asyncio.to_thread(companion.history.get, payload.title)
+        fixed_text = companion.llm.prompt_text(
+            title=payload.title,
+            timestamp=format_seconds(seconds),
+            question=payload.question,
+            context="",
+            history=history_record,
+            watched_limit=0,
+        )
+        prompt = prompt_budget.start(subtitles, seconds, fixed_text)
+        passages = await _passages(subtitles, payload.question, seconds, before_cue=prompt.context_start)
+        prompt_budget.add_passages(prompt, passages)
+        prompt_budget.add_summaries(prompt, await _summaries(subtitles, prompt.context_start))
+        prompt_budget.add_history(
+            prompt, payload.previously_watched or history_record.get("entries") or []
         )
+        parts = {
+            "context": prompt.context,
+            "passages": prompt.passages,
+            "summaries": prompt.summaries,
+            "watched_limit": prompt.watched_limit,
+        }
+        return parts, prompt.usage()
 
-        companion = MovieCompanion(_build_companion_config(payload))
-        loop = asyncio.get_event_loop()
+    async def _answer(payload: TrackAskRequest, subtitles, seconds: int) -> dict:
+        companion = _companion_for(payload)
+        prompt_parts, usage = await _prompt_parts(payload, subtitles, seconds, companion)
 
         try:
-            answer = await loop.run_in_executor(
-                None,
-                lambda: companion.answer_from_context(
-                    title=payload.title,
-                    context=context,
-                    timestamp=seconds,
-                    question=payload.question,
-                    previously_watched=payload.previously_watched,
-                ),
+            answer = await companion.aanswer_from_context(
+                title=payload.title,
+                timestamp=seconds,
+                question=payload.question,
+                previously_watched=payload.previously_watched,
+                **prompt_parts,
             )
         except RuntimeError as exc:
             logging.getLogger(__name__).error("LLM request failed", exc_info=exc)
@@ -126,6 +509,439 @@ def create_app() -> FastAPI:
                 detail="Failed to generate answer. Try again.",
             ) from exc
 
+        if usage is not None:
+            return {"answer": answer, "prompt_tokens": usage}
         return {"answer": answer}
 
+    async def _stream_answer(payload: TrackAskRequest, subtitles, seconds: int) -> StreamingResponse:
+        companion = _companion_for(payload)
+        prompt_parts, usage = await _prompt_parts(payload, subtitles, seconds, companion)
+
+        async def events() -> AsyncIterator[str]:
+            parts: list[str] = []
+            try:
+                async for chunk in companion.astream_from_context(
+                    title=payload.title,
+                    timestamp=seconds,
+                    question=payload.question,
+                    previously_watched=payload.previously_watched,
+                    **prompt_parts,
+                ):
+                    parts.append(chunk)
+                    yield _sse_event("token", {"token": chunk})
+            except Exception as exc:
+                # Headers are already sent, so a failure must end the stream with an
+                # error event rather than look like a complete answer.
+                logging.getLogger(__name__).error("LLM request failed", exc_info=exc)
+                yield _sse_event("error", {"detail": "Failed to generate answer. Try again."})
+                return
+            done = {"answer": "".join(parts).strip()}
+            if usage is not None:
+                done["prompt_tokens"] = usage
+            yield _sse_event("done", done)
+
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @app.post("/ask")
+    async def ask_question(payload: AskRequest = Body(...)) -> dict:
+        seconds = parse_timestamp(payload.timestamp)
+        subtitles = subtitle_cache.get_or_parse(payload.subtitles_text)
+        return await _answer(payload, subtitles, seconds)
+
+    @app.post("/ask/stream")
+    async def ask_question_stream(payload: AskRequest = Body(...)) -> StreamingResponse:
+        seconds = parse_timestamp(payload.timestamp)
+        subtitles = subtitle_cache.get_or_parse(payload.subtitles_text)
+        return await _stream_answer(payload, subtitles, seconds)
+
+    # ------------------------------------------------------------
+    # Registered subtitle tracks (upload once, refer by ID)
+    # ------------------------------------------------------------
+
+    def _registered_track(track_id: str):
+        subtitles = subtitle_cache.get(track_id)
+        if subtitles is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Unknown or expired subtitle track. Register the subtitles again.",
+            )
+        return subtitles
+
+    @app.post("/subtitles")
+    async def register_subtitles(payload: RegisterSubtitlesRequest = Body(...)) -> dict:
+        try:
+            track_id, subtitles = subtitle_cache.register(payload.subtitles_text)
+        except SubtitleLoaderError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        if shared_state:
+            # Other workers find the track through the cache loader.
+            await asyncio.to_thread(track_artifacts.ensure, track_id, subtitles)
+        if summary_store is not None:
+            summary_store.ensure(subtitles)
+        return {"track_id": track_id, "cues": len(subtitles)}
+
+    @app.post("/subtitles/{track_id}/context")
+    async def get_track_context(track_id: str, payload: TrackContextRequest = Body(...)) -> dict:
+        seconds = parse_timestamp(payload.timestamp)
+        context = extract_context(_registered_track(track_id), seconds)
+        return {
+            "context": context,
+            "timestamp": format_seconds(seconds),
+        }
+
+    @app.post("/subtitles/{track_id}/ask")
+    async def ask_track_question(track_id: str, payload: TrackAskRequest = Body(...)) -> dict:
+        seconds = parse_timestamp(payload.timestamp)
+        return await _answer(payload, _registered_track(track_id), seconds)
+
+    @app.post("/subtitles/{track_id}/ask/stream")
+    async def ask_track_question_stream(
+        track_id: str, payload: TrackAskRequest = Body(...)
+    ) -> StreamingResponse:
+        seconds = parse_timestamp(payload.timestamp)
+        return await _stream_answer(payload, _registered_track(track_id), seconds)
+
+    @app.post("/subtitles/{track_id}/sessions")
+    async def create_playback_session(track_id: str) -> dict:
+        session = sessions.create(track_id, PlaybackContextTracker(_registered_track(track_id)))
+        return {"session_id": session.session_id, "track_id": track_id}
+
+    @app.post("/sessions/{session_id}/context")
+    async def get_session_context(session_id: str, payload: SessionContextRequest = Body(...)) -> dict:
+        session = sessions.get(session_id)
+        if session is None:
+            # Created by another worker (or before a restart): rebuild it from its track.
+            track_id = session_track_id(session_id)
+            subtitles = subtitle_cache.get(track_id) if track_id else None
+            if subtitles is None:
+                raise HTTPException(status_code=404, detail="Unknown or expired playback session.")
+            session = sessions.create(track_id, PlaybackContextTracker(subtitles), session_id=session_id)
+        delta = session.tracker.update(payload.timestamp, known_version=payload.version)
+        return {
+            **asdict(delta),
+            "timestamp": format_seconds(session.tracker.seconds),
+        }
+
+    @app.delete("/sessions/{session_id}")
+    async def close_playback_session(session_id: str) -> dict:
+        return {"closed": sessions.remove(session_id)}
+
+    async def _answer_over_channel(channel: PlaybackChannel, subtitles, message: dict) -> None:
+        ask_id = message.get("id")
+        try:
+            payload = TrackAskRequest.model_validate(message)
+            seconds = parse_timestamp(payload.timestamp)
+        except ValueError as exc:
+            await channel.send({"type": "error", "id": ask_id, "detail": str(exc)})
+            return
+
+        parts: list[str] = []
+        try:
+            companion = _companion_for(payload)
+            prompt_parts, usage = await _prompt_parts(payload, subtitles, seconds, companion)
+            async for chunk in companion.astream_from_context(
+                title=payload.title,
+                timestamp=seconds,
+                question=payload.question,
+                previously_watched=payload.previously_watched,
+                **prompt_parts,
+            ):
+                parts.append(chunk)
+                await channel.send({"type": "token", "id": ask_id, "token": chunk})
+        except Exception as exc:
+            # The ask runs as a detached task, so every failure must reach the client
+            # as a frame; otherwise its pending ask never settles.
+            logging.getLogger(__name__).error("LLM request failed", exc_info=exc)
+            await channel.send(
+                {"type": "error", "id": ask_id, "detail": "Failed to generate answer. Try again."}
+            )
+            return
+        done = {"type": "done", "id": ask_id, "answer": "".join(parts).strip()}
+        if usage is not None:
+            done["prompt_tokens"] = usage
+        await channel.send(done)
+
+    @app.websocket("/subtitles/{track_id}/playback")
+    async def playback_socket(websocket: WebSocket, track_id: str) -> None:
+        subtitles = subtitle_cache.get(track_id)
+        # Accept before closing: a close during the handshake reaches browsers as
+        # a bare failure (1006), and the client needs 4404 to register again.
+        await websocket.accept()
+        if subtitles is None:
+            await websocket.close(code=4404, reason="Unknown or expired subtitle track.")
+            return
+
+        channel = PlaybackChannel(websocket, PlaybackContextTracker(subtitles))
+        writer = channel.start_writer()
+        answers: set[asyncio.Task] = set()
+        try:
+            while True:
+                frame = await websocket.receive()
+                if frame["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(frame.get("code", 1000))
+                try:
+                    # Binary frames carry no text and are rejected like invalid JSON.
+                    if frame.get("text") is None:
+                        raise ValueError("binary frame")
+                    message = json.loads(frame["text"])
+                except ValueError:
+                    await channel.send({"type": "error", "detail": "Messages must be JSON."})
+                    continue
+                kind = message.get("type") if isinstance(message, dict) else None
+                if kind == "tick":
+                    channel.report_tick(message.get("timestamp", 0))
+                elif kind == "ask":
+                    task = asyncio.create_task(_answer_over_channel(channel, subtitles, message))
+                    answers.add(task)
+                    task.add_done_callback(answers.discard)
+                else:
+                    await channel.send({"type": "error", "detail": f"Unknown message type: {kind!r}"})
+        except WebSocketDisconnect:
+            pass
+        finally:
+            writer.cancel()
+            for task in answers:
+                task.cancel()
+
+    @app.get("/videos")
+    async def list_videos(
+        response: Response,
+        offset: int = Query(0, ge=0),
+        limit: Optional[int] = Query(None, ge=1, le=1000),
+        title: Optional[str] = None,
+    ) -> list[dict]:
+        if title is not None:
+            entries = library.find_by_title(title)
+            total = len(entries)
+            entries = entries[offset:None if limit is None else offset + limit]
+        else:
+            total = library.count()
+            entries = library.list_videos(offset=offset, limit=limit)
+        response.headers["X-Total-Count"] = str(total)
+        return [asdict(entry) for entry in entries]
+
+    @app.get("/videos/{video_id}")
+    async def get_video(video_id: str) -> dict:
+        entry = library.get_video(video_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Video not found.")
+        return asdict(entry)
+
+    def _validator(kind: str):
+        return _check_subtitles if kind == "subtitles" else None
+
+    @app.post("/videos")
+    async def upload_video(request: Request, response: Response) -> dict:
+        try:
+            form = await receive_upload_form(request, media, file_fields=("video", "subtitles"))
+        except UploadError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        try:
+            title = form.fields.get("title", "").strip()
+            if not title:
+                raise HTTPException(status_code=400, detail="A title is required.")
+            # Each file comes either in the form itself or as a finished resumable upload.
+            sources = {}
+            for kind in ("video", "subtitles"):
+                uploaded = form.files.get(kind)
+                if uploaded is not None and uploaded.writer.size > 0:
+                    sources[kind] = uploaded
+                elif form.fields.get(f"{kind}_upload_id"):
+                    sources[kind] = form.fields[f"{kind}_upload_id"]
+            if "video" not in sources:
+                raise HTTPException(status_code=400, detail="A video file is required.")
+            entry, duplicate = await asyncio.to_thread(_add_to_library, title, sources)
+        except (UploadError, SubtitleLoaderError) as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        finally:
+            for uploaded in form.files.values():
+                media.discard(uploaded.writer)
+
+        _preprocess_subtitles(entry)
+        if not duplicate:
+            response.status_code = 201
+        return {**asdict(entry), "duplicate": duplicate}
+
+    def _add_to_library(title: str, sources: dict) -> tuple[LibraryEntry, bool]:
+        # A commit may deduplicate onto a file that only other entries reference, so
+        # deletions wait until the new entry points at it.
+        # Finished upload sessions are only forgotten once the entry is saved, so
+        # a failure leaves them in place for the client to retry with.
+        with media.references():
+            stored: dict[str, StoredFile] = {}
+            try:
+                for kind, source in sources.items():
+                    if isinstance(source, str):
+                        stored[kind] = media.completed_upload(source, kind)
+                for kind, source in sources.items():
+                    if not isinstance(source, str):
+                        stored[kind] = media.commit(source.writer, kind, source.filename, validate=_validator(kind))
+                entry, duplicate = _save_entry(title, stored["video"], stored.get("subtitles"))
+            except BaseException:
+                for kind, source in sources.items():
+                    if kind in stored and not isinstance(source, str):
+                        _delete_unreferenced(stored[kind].path, stored[kind].sha256)
+                raise
+            for source in sources.values():
+                if isinstance(source, str):
+                    media.forget_session(source)
+            return entry, duplicate
+
+    def _save_entry(
+        title: str, video: StoredFile, subtitles: Optional[StoredFile]
+    ) -> tuple[LibraryEntry, bool]:
+        existing = next(
+            (entry for entry in library.find_by_hash(video.sha256) if entry.video_sha256 == video.sha256),
+            None,
+        )
+        if existing is None:
+            entry = LibraryEntry(
+                video_id=uuid.uuid4().hex,
+                title=title,
+                video_path=video.path,
+                subtitle_path=subtitles.path if subtitles else None,
+                video_sha256=video.sha256,
+                subtitle_sha256=subtitles.sha256 if subtitles else None,
+            )
+            library.upsert_video(entry)
+            return entry, False
+
+        # The same video is already in the library: keep its entry and attach new subtitles.
+        entry = existing
+        if subtitles is not None and subtitles.sha256 != existing.subtitle_sha256:
+            entry = replace(existing, subtitle_path=subtitles.path, subtitle_sha256=subtitles.sha256)
+            library.upsert_video(entry)
+            _delete_unreferenced(existing.subtitle_path, existing.subtitle_sha256)
+        return entry, True
+
+    def _delete_unreferenced(path: Optional[str], sha256: Optional[str]) -> None:
+        # Files are shared by content hash; keep them while any entry, or a finished
+        # upload not yet added to the library, still points at them. Callers hold
+        # `media.references()`.
+        if path and not (sha256 and (library.find_by_hash(sha256) or media.pending(sha256))):
+            media.delete(resolve_media_path(path))
+
+    def _remove_from_library(entry: LibraryEntry) -> None:
+        with media.references():
+            library.remove_video(entry.video_id)
+            _delete_unreferenced(entry.video_path, entry.video_sha256)
+            _delete_unreferenced(entry.subtitle_path, entry.subtitle_sha256)
+
+    @app.delete("/videos/{video_id}", status_code=204)
+    async def delete_video(video_id: str) -> Response:
+        entry = library.get_video(video_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Video not found.")
+        await asyncio.to_thread(_remove_from_library, entry)
+        return Response(status_code=204)
+
+    @app.get("/videos/{video_id}/subtitles")
+    async def get_video_subtitles(video_id: str) -> FileResponse:
+        entry = library.get_video(video_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Video not found.")
+        path = resolve_media_path(entry.subtitle_path) if entry.subtitle_path else None
+        if path is None or not path.is_file():
+            raise HTTPException(status_code=404, detail="Subtitles not found.")
+        media_type = "text/vtt" if path.suffix.lower() == ".vtt" else "text/plain; charset=utf-8"
+        return FileResponse(path, media_type=media_type)
+
+    @app.get("/videos/{video_id}/subtitles/status")
+    async def get_subtitle_preprocessing(video_id: str) -> dict:
+        entry = library.get_video(video_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Video not found.")
+        if not entry.subtitle_path:
+            raise HTTPException(status_code=404, detail="Subtitles not found.")
+        if preprocessor is None:
+            return {"enabled": False}
+        # Another worker may have run the job; resubmitting finds its saved artifacts.
+        job = preprocessor.job(entry.subtitle_sha256 or entry.subtitle_path) or _preprocess_subtitles(entry)
+        return job.status()
+
+    @app.api_route("/videos/{video_id}/stream", methods=["GET", "HEAD"])
+    async def stream_video(video_id: str, request: Request) -> Response:
+        entry = library.get_video(video_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Video not found.")
+        try:
+            return video_response(
+                resolve_media_path(entry.video_path),
+                request.headers,
+                method=request.method,
+                chunk_bytes=stream_chunk_bytes,
+            )
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Video file not found.")
+
+    # Resumable uploads: create a session, PUT the file in chunks at the
+    # returned offset (GET the session to find where to resume), then pass
+    # its `upload_id` to POST /videos as `video_upload_id`/`subtitles_upload_id`.
+    def _upload_session(upload_id: str):
+        session = media.get_session(upload_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Unknown or expired upload.")
+        return session
+
+    @app.post("/uploads", status_code=201)
+    async def create_upload(payload: CreateUploadRequest = Body(...)) -> dict:
+        try:
+            session = await asyncio.to_thread(media.create_session, payload.kind, payload.filename, payload.size)
+        except UploadError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        return session.status()
+
+    @app.get("/uploads/{upload_id}")
+    async def get_upload(upload_id: str) -> dict:
+        return _upload_session(upload_id).status()
+
+    @app.put("/uploads/{upload_id}")
+    async def put_upload_chunk(request: Request, upload_id: str, offset: int = Query(..., ge=0)) -> dict:
+        session = _upload_session(upload_id)
+        try:
+            writer = await asyncio.to_thread(media.open_chunk, session, offset)
+        except UploadOffsetMismatch as exc:
+            raise HTTPException(
+                status_code=409, detail=str(exc), headers={"Upload-Offset": str(exc.offset)}
+            ) from exc
+        except UploadBusy as exc:
+            raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+        oversized = False
+        try:
+            async for chunk in request.stream():
+                if writer.size + len(chunk) > session.size:
+                    oversized = True
+                    break
+                await asyncio.to_thread(writer.write, chunk)
+        except ClientDisconnect:
+            pass
+        except BaseException:
+            # Keep what arrived so the client can resume, and release the upload.
+            media.finish_chunk(session, writer)
+            raise
+        try:
+            session = await asyncio.to_thread(
+                media.finish_chunk, session, writer, validate=_validator(session.kind)
+            )
+        except (UploadError, SubtitleLoaderError) as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        if oversized:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Upload exceeds its declared size of {session.size} bytes.",
+                headers={"Upload-Offset": str(session.offset)},
+            )
+        return session.status()
+
+    @app.delete("/uploads/{upload_id}", status_code=204)
+    async def delete_upload(upload_id: str) -> Response:
+        if not await asyncio.to_thread(media.abort_session, upload_id):
+            raise HTTPException(status_code=404, detail="Unknown or expired upload.")
+        return Response(status_code=204)
+
     return app
@@ -0,0 +1,130 @@
+"""Outbound side of the playback WebSocket: coalesced context pushes and answer tokens."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from dataclasses import asdict
+from typing import Any, Deque, Dict, Optional
+
+from fastapi import WebSocket
+
+from movie_companion.subtitles import PlaybackContextTracker
+from movie_companion.time_utils import format_seconds
+
+
+DEFAULT_OUTBOX_SIZE = 256
+
+
+class PlaybackChannel:
+    """Serialize everything the server sends on one playback connection.
+
+    Playhead ticks are not queued: each one replaces the previous pending
+    tick, so a client that reports faster than the server can answer only
+    gets the latest window. Answer tokens go through a bounded outbox; when
+    it is full, producers wait (backpressure reaches the LLM stream), and
+    tokens that piled up for the same answer are merged into one frame.
+    A single writer task owns the socket, so frames never interleave; if
+    it fails, the socket is closed so the client falls back to HTTP.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        tracker: PlaybackContextTracker,
+        *,
+        outbox_size: int = DEFAULT_OUTBOX_SIZE,
+    ) -> None:
+        self.websocket = websocket
+        self.tracker = tracker
+        self._pending_tick: Optional[int | str] = None
+        self._outbox: Deque[Dict[str, Any]] = deque()
+        self._space = asyncio.Semaphore(max(1, outbox_size))
+        self._wake = asyncio.Event()
+        self.ticks_received = 0
+        self.ticks_coalesced = 0
+        self.frames_sent = 0
+
+    def report_tick(self, timestamp: int | str) -> None:
+        """Record the latest playhead; an unprocessed earlier tick is dropped."""
+
+        self.ticks_received += 1
+        if self._pending_tick is not None:
+            self.ticks_coalesced += 1
+        self._pending_tick = timestamp
+        self._wake.set()
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        """Queue a message, waiting while the outbox is full."""
+
+        await self._space.acquire()
+        self._outbox.append(message)
+        self._wake.set()
+
+    def _pop(self) -> Dict[str, Any]:
+        self._space.release()
+        return self._outbox.popleft()
+
+    def _next_message(self) -> Optional[Dict[str, Any]]:
+        if self._pending_tick is not None:
+            timestamp, self._pending_tick = self._pending_tick, None
+            delta = self.tracker.update(timestamp)
+            if not delta.reset and not delta.drop and not delta.lines:
+                return self._next_message()
+            return {
+                "type": "context",
+                **asdict(delta),
+                "timestamp": format_seconds(self.tracker.seconds),
+            }
+        if not self._outbox:
+            return None
+        message = self._pop()
+        if message.get("type") == "token":
+            # Merge tokens that queued up behind a slow socket.
+            tokens = [message["token"]]
+            while self._outbox:
+                following = self._outbox[0]
+                if following.get("type") != "token" or following.get("id") != message.get("id"):
+                    break
+                tokens.append(self._pop()["token"])
+            message = {**message, "token": "".join(tokens)}
+        return message
+
+    async def run_writer(self) -> None:
+        """Send queued frames until cancelled."""
+
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            while True:
+                try:
+                    message = self._next_message()
+                except (ValueError, OverflowError, TypeError) as exc:  # unusable timestamp from the client
+                    message = {"type": "error", "detail": f"Invalid timestamp: {exc}"}
+                except Exception:
+                    logging.getLogger(__name__).exception("Playback context update failed")
+                    message = {"type": "error", "detail": "Could not update the context."}
+                if message is None:
+                    break
+                await self.websocket.send_json(message)
+                self.frames_sent += 1
+
+    def start_writer(self) -> asyncio.Task:
+        """Run `run_writer` in a task that closes the socket if it fails."""
+
+        task = asyncio.create_task(self.run_writer())
+        task.add_done_callback(self._writer_done)
+        return task
+
+    def _writer_done(self, task: asyncio.Task) -> None:
+        if task.cancelled() or task.exception() is None:
+            return
+        logging.getLogger(__name__).warning("Playback writer stopped", exc_info=task.exception())
+        asyncio.ensure_future(self._close())
+
+    async def _close(self) -> None:
+        try:
+            await self.websocket.close(code=1011)
+        except Exception:
+            pass  # already closed by the client
@@ -0,0 +1,150 @@
+"""Streaming multipart parsing that writes uploaded files straight to hashing writers."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from starlette.requests import Request
+
+try:
+    from python_multipart import MultipartParser
+    from python_multipart.exceptions import FormParserError
+    from python_multipart.multipart import parse_options_header
+except ImportError:  # pragma: no cover - older python-multipart releases
+    from multipart import MultipartParser  # type: ignore[no-redef]
+    from multipart.exceptions import FormParserError  # type: ignore[no-redef]
+    from multipart.multipart import parse_options_header  # type: ignore[no-redef]
+
+from movie_companion.uploads import HashingWriter, MediaStore, UploadError
+
+
+# Plain form fields are small (titles, upload ids); larger ones are refused.
+MAX_FIELD_BYTES = 64 * 1024
+
+
+@dataclass
+class UploadedFile:
+    filename: str
+    writer: HashingWriter
+
+
+@dataclass
+class UploadForm:
+    """Form fields plus the files written so far, keyed by field name."""
+
+    fields: Dict[str, str] = field(default_factory=dict)
+    files: Dict[str, UploadedFile] = field(default_factory=dict)
+
+
+@dataclass
+class _Part:
+    headers: Dict[bytes, bytes] = field(default_factory=dict)
+    name: str = ""
+    data: bytearray = field(default_factory=bytearray)
+    file: Optional[UploadedFile] = None
+    skip: bool = False
+
+
+async def receive_upload_form(request: Request, media: MediaStore, *, file_fields: Tuple[str, ...]) -> UploadForm:
+    """Parse a `multipart/form-data` body as it arrives.
+
+    File parts named in `file_fields` are streamed into `media` writers,
+    which hash while they write, so no file is ever buffered in memory or
+    spooled to a second temporary file. Other file parts are skipped. On
+    any error the partial files are removed. URL-encoded forms, which
+    cannot carry files, are read whole.
+
+    Raises:
+        UploadError: If the body is not valid form data.
+    """
+
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type == b"application/x-www-form-urlencoded":
+        fields = await request.form(max_part_size=MAX_FIELD_BYTES)
+        return UploadForm(fields={name: value for name, value in fields.items() if isinstance(value, str)})
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise UploadError("Expected multipart/form-data with a boundary.")
+
+    form = UploadForm()
+    part = _Part()
+    header_field = b""
+    header_value = b""
+    # File bytes produced while parsing one request chunk, written together off the loop.
+    pending: List[Tuple[HashingWriter, bytes]] = []
+
+    def on_part_begin() -> None:
+        nonlocal part
+        part = _Part()
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        nonlocal header_field
+        header_field += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        nonlocal header_value
+        header_value += data[start:end]
+
+    def on_header_end() -> None:
+        nonlocal header_field, header_value
+        part.headers[header_field.lower()] = header_value
+        header_field = header_value = b""
+
+    def on_headers_finished() -> None:
+        _, options = parse_options_header(part.headers.get(b"content-disposition"))
+        part.name = options.get(b"name", b"").decode("utf-8", "replace")
+        filename = options.get(b"filename")
+        if filename is None:
+            return
+        if part.name not in file_fields or part.name in form.files:
+            part.skip = True
+            return
+        part.file = UploadedFile(filename=filename.decode("utf-8", "replace"), writer=media.new_writer())
+        form.files[part.name] = part.file
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        if part.skip:
+            return
+        if part.file is not None:
+            pending.append((part.file.writer, data[start:end]))
+            return
+        part.data += data[start:end]
+        if len(part.data) > MAX_FIELD_BYTES:
+            raise UploadError(f"Form field {part.name!r} is too large.")
+
+    def on_part_end() -> None:
+        if part.file is None and not part.skip:
+            form.fields[part.name] = part.data.decode("utf-8", "replace")
+
+    def write_pending(batch: List[Tuple[HashingWriter, bytes]]) -> None:
+        for writer, data in batch:
+            writer.write(data)
+
+    parser = MultipartParser(
+        boundary,
+        {
+            "on_part_begin": on_part_begin,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+        },
+    )
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if pending:
+                batch, pending = pending, []
+                await asyncio.to_thread(write_pending, batch)
+        parser.finalize()
+    except BaseException as exc:
+        for uploaded in form.files.values():
+            media.discard(uploaded.writer)
+        if isinstance(exc, FormParserError):
+            raise UploadError("Invalid multipart form data.") from exc
+        raise
+    return form
@@ -0,0 +1,302 @@
+"""HTTP byte-range streaming of library video files."""
+
+from __future__ import annotations
+
+import asyncio
+import mimetypes
+import mmap
+import os
+import secrets
+import stat as stat_module
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+
+from starlette.responses import Response
+
+
+DEFAULT_STREAM_CHUNK_BYTES = 256 * 1024
+# More ranges than this in one request is treated as abuse rather than seeking.
+MAX_RANGES = 16
+
+ZERO_COPY_EXTENSION = "http.response.zerocopysend"
+
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+class RangeNotSatisfiable(ValueError):
+    """Raised when none of the requested byte ranges overlap the file."""
+
+
+def resolve_media_path(video_path: str) -> Path:
+    """Turn a stored `video_path` into a local path.
+
+    Library files written on Windows use backslashes; they are treated as
+    separators everywhere else too.
+    """
+
+    if os.sep == "/":
+        video_path = video_path.replace("\\", "/")
+    return Path(video_path)
+
+
+def parse_range(header: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """Parse a `Range: bytes=...` header into sorted, merged `[start, end)` ranges.
+
+    Returns `None` when the header is malformed or not in bytes, in which
+    case the whole file is sent, as RFC 9110 asks.
+
+    Raises:
+        RangeNotSatisfiable: If no range overlaps the file, or there are too many.
+    """
+
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+    ranges: List[Tuple[int, int]] = []
+    for part in spec.split(","):
+        first, dash, last = part.strip().partition("-")
+        if not dash or not (first or last) or not (first or "0").isdigit() or not (last or "0").isdigit():
+            return None
+        if not first:
+            # Suffix range: the last N bytes.
+            length = int(last)
+            if length > 0 and size > 0:
+                ranges.append((max(0, size - length), size))
+            continue
+        start = int(first)
+        end = size if not last else min(int(last) + 1, size)
+        if last and int(last) < start:
+            return None
+        if start < size:
+            ranges.append((start, end))
+    if not ranges:
+        raise RangeNotSatisfiable(header)
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        if start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    if len(merged) > MAX_RANGES:
+        raise RangeNotSatisfiable(header)
+    return merged
+
+
+@dataclass(frozen=True)
+class _FileInfo:
+    path: Path
+    size: int
+    etag: str
+    last_modified: str
+    mtime: int
+    media_type: str
+
+    @classmethod
+    def stat(cls, path: Path) -> "_FileInfo":
+        stat = path.stat()
+        if not stat_module.S_ISREG(stat.st_mode):
+            raise FileNotFoundError(f"Not a regular file: {path}")
+        media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        return cls(
+            path=path,
+            size=stat.st_size,
+            # Same inputs as `file_signature`: a replaced or rewritten file gets a new tag.
+            etag=f'"{stat.st_ino:x}-{stat.st_mtime_ns:x}-{stat.st_size:x}"',
+            last_modified=formatdate(stat.st_mtime, usegmt=True),
+            mtime=int(stat.st_mtime),
+            media_type=media_type,
+        )
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # Weak comparison, as required for If-None-Match.
+    if header.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in tags
+
+
+def _not_modified_since(header: str, mtime: int) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    return since.tzinfo is not None and mtime <= since.timestamp()
+
+
+def _if_range_matches(header: str, info: _FileInfo) -> bool:
+    # If-Range needs a strong validator: an exact ETag or the exact date.
+    header = header.strip()
+    if header.startswith('"'):
+        return header == info.etag
+    return header == info.last_modified
+
+
+def video_response(
+    path: Path,
+    headers: Mapping[str, str],
+    *,
+    method: str = "GET",
+    chunk_bytes: int = DEFAULT_STREAM_CHUNK_BYTES,
+) -> Response:
+    """Build the response for a GET or HEAD of `path`, honoring validators and ranges.
+
+    Answers 304 when `If-None-Match` / `If-Modified-Since` show the client's
+    copy is current, 206 for satisfiable ranges (`multipart/byteranges` for
+    several), 416 for unsatisfiable ones and 200 otherwise.
+
+    Raises:
+        FileNotFoundError: If the file does not exist or is not a regular file.
+    """
+
+    info = _FileInfo.stat(path)
+    common = {
+        "accept-ranges": "bytes",
+        "etag": info.etag,
+        "last-modified": info.last_modified,
+    }
+
+    if_none_match = headers.get("if-none-match")
+    if_modified_since = headers.get("if-modified-since")
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, info.etag):
+            return Response(status_code=304, headers=common)
+    elif if_modified_since is not None and _not_modified_since(if_modified_since, info.mtime):
+        return Response(status_code=304, headers=common)
+
+    ranges: Optional[List[Tuple[int, int]]] = None
+    range_header = headers.get("range")
+    if_range = headers.get("if-range")
+    if range_header and (if_range is None or _if_range_matches(if_range, info)):
+        try:
+            ranges = parse_range(range_header, info.size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**common, "content-range": f"bytes */{info.size}"})
+
+    return FileRangeResponse(
+        info,
+        ranges,
+        headers=common,
+        send_body=method.upper() != "HEAD",
+        chunk_bytes=chunk_bytes,
+    )
+
+
+class FileRangeResponse(Response):
+    """Sends byte ranges of a file without ever holding more than one chunk.
+
+    When the server offers the ASGI zero-copy send extension, the kernel
+    copies file pages straight to the socket (`sendfile`). Otherwise the
+    file is memory-mapped and sent in `chunk_bytes` slices read off the
+    event loop; each send waits for the transport to drain, so a slow
+    viewer holds one chunk at a time no matter how large the file is.
+    Streaming stops as soon as the client disconnects.
+    """
+
+    def __init__(
+        self,
+        info: _FileInfo,
+        ranges: Optional[List[Tuple[int, int]]],
+        *,
+        headers: Mapping[str, str],
+        send_body: bool = True,
+        chunk_bytes: int = DEFAULT_STREAM_CHUNK_BYTES,
+    ) -> None:
+        self.info = info
+        self.send_body = send_body
+        self.chunk_bytes = max(4096, chunk_bytes)
+        # Each part is (preamble, start, end); the preamble is sent before the file bytes.
+        self.parts: List[Tuple[bytes, int, int]] = []
+        self.epilogue = b""
+        headers = dict(headers)
+        if ranges is None:
+            status_code = 200
+            media_type = info.media_type
+            self.parts.append((b"", 0, info.size))
+        elif len(ranges) == 1:
+            status_code = 206
+            media_type = info.media_type
+            start, end = ranges[0]
+            headers["content-range"] = f"bytes {start}-{end - 1}/{info.size}"
+            self.parts.append((b"", start, end))
+        else:
+            status_code = 206
+            boundary = secrets.token_hex(16)
+            media_type = f"multipart/byteranges; boundary={boundary}"
+            for index, (start, end) in enumerate(ranges):
+                preamble = (
+                    ("\r\n" if index else "")
+                    + f"--{boundary}\r\n"
+                    + f"content-type: {info.media_type}\r\n"
+                    + f"content-range: bytes {start}-{end - 1}/{info.size}\r\n\r\n"
+                )
+                self.parts.append((preamble.encode("latin-1"), start, end))
+            self.epilogue = f"\r\n--{boundary}--\r\n".encode("latin-1")
+        length = sum(len(preamble) + end - start for preamble, start, end in self.parts) + len(self.epilogue)
+        headers["content-length"] = str(length)
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+
+    async def __call__(self, scope: Dict[str, Any], receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if not self.send_body or not any(start < end for _, start, end in self.parts):
+            await send({"type": "http.response.body", "body": self.epilogue if self.send_body else b""})
+            return
+
+        disconnected = asyncio.Event()
+
+        async def watch_disconnect() -> None:
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            with self.info.path.open("rb") as handle:
+                if ZERO_COPY_EXTENSION in scope.get("extensions", {}):
+                    await self._send_zero_copy(handle, send, disconnected)
+                else:
+                    await self._send_mapped(handle, send, disconnected)
+        finally:
+            watcher.cancel()
+
+    async def _send_zero_copy(self, handle: Any, send: Send, disconnected: asyncio.Event) -> None:
+        for preamble, start, end in self.parts:
+            if preamble:
+                await send({"type": "http.response.body", "body": preamble, "more_body": True})
+            for offset in range(start, end, self.chunk_bytes):
+                if disconnected.is_set():
+                    return
+                await send(
+                    {
+                        "type": ZERO_COPY_EXTENSION,
+                        "file": handle,
+                        "offset": offset,
+                        "count": min(self.chunk_bytes, end - offset),
+                        "more_body": True,
+                    }
+                )
+        await send({"type": "http.response.body", "body": self.epilogue})
+
+    async def _send_mapped(self, handle: Any, send: Send, disconnected: asyncio.Event) -> None:
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            size = len(mapped)
+            for preamble, start, end in self.parts:
+                if preamble:
+                    await send({"type": "http.response.body", "body": preamble, "more_body": True})
+                for offset in range(start, end, self.chunk_bytes):
+                    if disconnected.is_set():
+                        return
+                    stop = min(offset + self.chunk_bytes, end)
+                    if stop > size:
+                        # The file shrank after the headers went out; the length can no longer be met.
+                        raise RuntimeError(f"{self.info.path} changed while it was being streamed.")
+                    # Page faults on a cold file would block the event loop, so slice in a thread.
+                    chunk = await asyncio.to_thread(mapped.__getitem__, slice(offset, stop))
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": self.epilogue})
@@ -0,0 +1,137 @@
+"""Single-flight coalescing so identical concurrent LLM requests share one upstream call."""
+
+from __future__ import annotations
+
+import asyncio
+import weakref
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+
+class _SharedStream:
+    """Fan a single upstream chunk stream out to any number of subscribers.
+
+    The upstream iterator is driven by its own task, so one subscriber going
+    away (e.g. a closed browser tab) does not cut the answer short for the
+    others. Late subscribers replay the chunks produced so far. The task is
+    cancelled once the last subscriber leaves.
+    """
+
+    def __init__(self, source: AsyncIterator[str]) -> None:
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self._wake = asyncio.Event()
+        self.task = asyncio.ensure_future(self._pump(source))
+
+    def _notify(self) -> None:
+        self._wake.set()
+        self._wake = asyncio.Event()
+
+    async def _pump(self, source: AsyncIterator[str]) -> None:
+        try:
+            async for chunk in source:
+                self.chunks.append(chunk)
+                self._notify()
+        except Exception as exc:  # surfaced to every subscriber
+            self.error = exc
+        finally:
+            self.done = True
+            self._notify()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        self.subscribers += 1
+        position = 0
+        try:
+            while True:
+                while position < len(self.chunks):
+                    yield self.chunks[position]
+                    position += 1
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._wake.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done:
+                self.task.cancel()
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one in-flight call.
+
+    `do` is for coroutines returning a value and `stream` for async chunk
+    iterators. Callers arriving while a call with the same key is running
+    await its result (or replay its chunks) instead of starting their own.
+    In-flight calls are tracked per event loop since futures cannot cross
+    loops.
+    """
+
+    def __init__(self) -> None:
+        self._calls: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Future]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._streams: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, _SharedStream]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """Return the result of `factory()`, sharing it with concurrent callers of `key`."""
+
+        calls = self._calls.setdefault(asyncio.get_running_loop(), {})
+        task = calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            calls[key] = task
+            self.calls += 1
+
+            def _finished(done: asyncio.Future) -> None:
+                if calls.get(key) is done:
+                    del calls[key]
+                if not done.cancelled():
+                    done.exception()  # mark retrieved; callers re-raise it
+
+            task.add_done_callback(_finished)
+        else:
+            self.coalesced += 1
+        # Shield so one caller being cancelled does not cancel the shared call.
+        return await asyncio.shield(task)
+
+    async def stream(
+        self, key: str, factory: Callable[[], AsyncIterator[str]]
+    ) -> AsyncIterator[str]:
+        """Yield the chunks of `factory()`, sharing them with concurrent callers of `key`."""
+
+        streams = self._streams.setdefault(asyncio.get_running_loop(), {})
+        shared = streams.get(key)
+        if shared is None or shared.done:
+            shared = _SharedStream(factory())
+            streams[key] = shared
+            self.calls += 1
+
+            def _finished(_: asyncio.Future, shared: _SharedStream = shared) -> None:
+                if streams.get(key) is shared:
+                    del streams[key]
+
+            shared.task.add_done_callback(_finished)
+        else:
+            self.coalesced += 1
+        async for chunk in shared.subscribe():
+            yield chunk
+
+    def stats(self) -> Dict[str, int]:
+        """Return upstream call, coalesced request and in-flight counts."""
+
+        in_flight = sum(len(calls) for calls in self._calls.values())
+        in_flight += sum(len(streams) for streams in self._streams.values())
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": in_flight,
+        }
@@ -0,0 +1,179 @@
+"""Bounded in-memory cache of parsed subtitle tracks keyed by content hash."""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from .retrieval import DEFAULT_RETRIEVAL_CHUNK_CUES, lexical_index
+from .subtitles import SubtitleIndex, parse_subtitles_text
+
+
+DEFAULT_CACHE_MAX_ENTRIES = 32
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TRACK_TTL_SECONDS = 6 * 60 * 60
+
+
+def subtitle_hash(subtitles_text: str) -> str:
+    """Return the stable content hash used to key a subtitle track."""
+    return hashlib.sha256(subtitles_text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+@dataclass
+class _CacheEntry:
+    track: SubtitleIndex
+    size: int
+    last_access: float
+
+
+class SubtitleCache:
+    """Thread-safe LRU of indexed subtitle tracks bounded by entry count and bytes.
+
+    Entry sizes are the approximate memory held by each `SubtitleIndex`, plus
+    its lexical retrieval index when `chunk_cues` is set (that index is built
+    as soon as a track is parsed, so questions never pay for it). When
+    `ttl_seconds` is set, tracks that have not been accessed within that period
+    are dropped as well, which lets the cache double as the store behind
+    registered track IDs. An optional `loader` is asked for tracks the cache
+    does not hold (for example ones preprocessed to disk), before parsing.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+        ttl_seconds: Optional[float] = None,
+        chunk_cues: Optional[int] = DEFAULT_RETRIEVAL_CHUNK_CUES,
+        loader: Optional[Callable[[str], Optional[SubtitleIndex]]] = None,
+    ) -> None:
+        self.max_entries = max(1, max_entries)
+        self.chunk_cues = chunk_cues if chunk_cues and chunk_cues > 0 else None
+        self.max_bytes = max(1, max_bytes)
+        self.ttl_seconds = ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+        self.loader = loader
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.loads = 0
+
+    # Internal helpers -------------------------------------------------
+    def _expire(self, now: float) -> None:
+        if self.ttl_seconds is None:
+            return
+        # Entries are kept in access order, so expired ones sit at the front.
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if now - entry.last_access <= self.ttl_seconds:
+                break
+            del self._entries[key]
+            self._bytes -= entry.size
+            self.expirations += 1
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+
+    def _load(self, key: str) -> Optional[SubtitleIndex]:
+        if self.loader is None:
+            return None
+        track = self.loader(key)
+        if track is not None:
+            self.add(key, track)
+            with self._lock:
+                self.loads += 1
+        return track
+
+    # Public API -------------------------------------------------------
+    def get(self, key: str) -> Optional[SubtitleIndex]:
+        """Return the track for `key`, counting a hit or a miss, or ask the loader."""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                entry.last_access = now
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.track
+        return self._load(key)
+
+    def put(self, key: str, track: SubtitleIndex, size: Optional[int] = None) -> None:
+        """Store an indexed track, evicting least recently used entries as needed."""
+        if size is None:
+            size = track.nbytes
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = _CacheEntry(track=track, size=size, last_access=now)
+            self._bytes += size
+            self._evict()
+
+    def add(self, key: str, track: SubtitleIndex) -> None:
+        """Store a track, building its lexical index first when `chunk_cues` is set."""
+        size = track.nbytes
+        if self.chunk_cues is not None:
+            size += lexical_index(track, chunk_cues=self.chunk_cues).nbytes
+        self.put(key, track, size)
+
+    def get_or_parse(self, subtitles_text: str) -> SubtitleIndex:
+        """Return the indexed track for the raw text, parsing only on a cache miss.
+
+        Raises:
+            SubtitleLoaderError: If the text fails to parse.
+        """
+
+        return self.register(subtitles_text)[1]
+
+    def register(self, subtitles_text: str) -> Tuple[str, SubtitleIndex]:
+        """Parse (if needed) and store a track, returning its ID and the indexed track.
+
+        The ID is the content hash, so registering the same text twice is cheap
+        and yields the same ID.
+
+        Raises:
+            SubtitleLoaderError: If the text fails to parse.
+        """
+
+        key = subtitle_hash(subtitles_text)
+        track = self.get(key)
+        if track is None:
+            track = parse_subtitles_text(subtitles_text)
+            self.add(key, track)
+        return key, track
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return size and hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "loads": self.loads,
+            }
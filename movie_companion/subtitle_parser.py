@@ -0,0 +1,113 @@
+"""Lightweight streaming parser for SRT and WebVTT subtitle text.
+
+The parser mirrors pysrt's lenient behaviour: cues are split on blank lines,
+an optional index line is skipped, and malformed cues are dropped instead of
+aborting the whole file. It yields plain `(start_ms, end_ms, text)` tuples so
+callers can pack them into compact storage without per-cue objects.
+"""
+
+from __future__ import annotations
+
+import html
+import re
+from typing import Iterable, Iterator, Optional, Tuple
+
+
+Cue = Tuple[int, int, str]
+
+_TIMESTAMP_SEPARATOR = "-->"
+_SRT_TIME = re.compile(r"(\d+):(\d+):(\d+)[,.](\d+)")
+_TIME_SEPARATORS = re.compile(r"[:.,]")
+_LEADING_DIGITS = re.compile(r"^(\d+)")
+_VTT_TIME = re.compile(r"(?:(\d+):)?(\d+):(\d+)\.(\d+)")
+_VTT_TAG = re.compile(r"<[^>]*>")
+
+
+class InvalidCue(ValueError):
+    """Raised internally when a cue block cannot be parsed."""
+
+
+def _parse_int(digits: str) -> int:
+    # Same fallbacks as pysrt: plain int, then leading digits, then zero.
+    try:
+        return int(digits)
+    except ValueError:
+        match = _LEADING_DIGITS.match(digits)
+        return int(match.group()) if match else 0
+
+
+def _parse_srt_time(token: str) -> int:
+    if not token:
+        return 0
+    match = _SRT_TIME.fullmatch(token)
+    if match:
+        hours, minutes, seconds, millis = match.groups()
+        return int(hours) * 3_600_000 + int(minutes) * 60_000 + int(seconds) * 1000 + int(millis)
+    parts = _TIME_SEPARATORS.split(token)
+    if len(parts) != 4:
+        raise InvalidCue(f"Invalid time string: {token!r}")
+    hours, minutes, seconds, millis = (_parse_int(part) for part in parts)
+    return hours * 3_600_000 + minutes * 60_000 + seconds * 1000 + millis
+
+
+def _parse_vtt_time(token: str) -> int:
+    match = _VTT_TIME.fullmatch(token)
+    if not match:
+        raise InvalidCue(f"Invalid time string: {token!r}")
+    hours, minutes, seconds, millis = match.groups()
+    return int(hours or 0) * 3_600_000 + int(minutes) * 60_000 + int(seconds) * 1000 + int(millis)
+
+
+def _clean_vtt_text(text: str) -> str:
+    return html.unescape(_VTT_TAG.sub("", text))
+
+
+def _parse_block(lines: list[str], webvtt: bool) -> Cue:
+    if len(lines) < 2:
+        raise InvalidCue("Cue block is too short.")
+    lines = [line.rstrip() for line in lines]
+    if _TIMESTAMP_SEPARATOR not in lines[0]:
+        lines.pop(0)  # cue index / identifier
+
+    timestamps = lines[0].split(_TIMESTAMP_SEPARATOR)
+    if len(timestamps) != 2:
+        raise InvalidCue("Missing timing line.")
+    start_token = timestamps[0].strip()
+    # Anything after the end time is positioning (SRT) or cue settings (WebVTT).
+    end_token = timestamps[1].lstrip().split(" ", 1)[0].strip()
+    text = "\n".join(lines[1:])
+
+    if webvtt:
+        return _parse_vtt_time(start_token), _parse_vtt_time(end_token), _clean_vtt_text(text)
+    return _parse_srt_time(start_token), _parse_srt_time(end_token), text
+
+
+def iter_cues(lines: Iterable[str], *, webvtt: Optional[bool] = None) -> Iterator[Cue]:
+    """Yield `(start_ms, end_ms, text)` for every well-formed cue in `lines`.
+
+    Args:
+        lines: Subtitle lines, with or without line terminators (e.g. an open file).
+        webvtt: Force WebVTT (`True`) or SRT (`False`) parsing. When omitted the
+            format is detected from a leading `WEBVTT` header.
+
+    Malformed cues are skipped, matching pysrt's default error handling.
+    """
+
+    block: list[str] = []
+    for line in lines:
+        if line.strip():
+            if webvtt is None:
+                webvtt = line.lstrip("\ufeff").startswith("WEBVTT")
+            block.append(line)
+            continue
+        if block:
+            try:
+                yield _parse_block(block, bool(webvtt))
+            except InvalidCue:
+                pass
+            block = []
+    if block:
+        try:
+            yield _parse_block(block, bool(webvtt))
+        except InvalidCue:
+            pass
@@ -2,12 +2,17 @@
 
 from __future__ import annotations
 
-from collections import deque
+import hashlib
+import sys
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Iterable
 
 import pysrt
 
+from .subtitle_parser import Cue, iter_cues
 from .time_utils import parse_timestamp, TimestampParseError
 
 
@@ -19,14 +24,15 @@ DEFAULT_CONTEXT_WINDOW_SECONDS: int | None = 5 * 60  # five minutes
 DEFAULT_CONTEXT_MAX_CHARACTERS: int | None = 4000
 
 
-def load_subtitles(subtitle_path: str | Path) -> pysrt.SubRipFile:
-    """Load an SRT subtitle file.
+def load_subtitles(subtitle_path: str | Path) -> "SubtitleIndex":
+    """Load an SRT or WebVTT subtitle file, or a preprocessed `.track` file.
 
     Args:
-        subtitle_path: Path to the SRT file.
+        subtitle_path: Path to the subtitle file.
 
     Returns:
-        A `pysrt.SubRipFile` representing the subtitles.
+        A `SubtitleIndex` built while streaming the file, or mapped from it
+        for `.track` files.
 
     Raises:
         SubtitleLoaderError: If the file does not exist or fails to parse.
@@ -36,16 +42,47 @@ def load_subtitles(subtitle_path: str | Path) -> pysrt.SubRipFile:
     if not path.exists():
         raise SubtitleLoaderError(f"Subtitle file not found: {path}")
 
+    if path.suffix == ".track":
+        from .track_format import TrackFormatError, open_track
+
+        try:
+            return open_track(path)[0]
+        except (OSError, TrackFormatError) as exc:
+            raise SubtitleLoaderError(f"Failed to load track: {exc}") from exc
+
     try:
-        # pysrt expects `error_handling` instead of `errors`.
-        return pysrt.open(str(path), encoding="utf-8", error_handling="ignore")
-    except Exception as exc:  # pragma: no cover - defensive
+        with path.open("r", encoding="utf-8-sig", errors="replace") as handle:
+            return SubtitleIndex.from_cues(iter_cues(handle))
+    except OSError as exc:  # pragma: no cover - defensive
         raise SubtitleLoaderError(f"Failed to parse subtitles: {exc}") from exc
 
 
-def _to_seconds(subtitle_entry: pysrt.SubRipItem) -> int:
-    """Convert a subtitle entry's end time to seconds."""
-    return subtitle_entry.end.ordinal // 1000
+def parse_subtitles_text(subtitles_text: str) -> "SubtitleIndex":
+    """Parse raw SRT or WebVTT text without touching the filesystem.
+
+    Args:
+        subtitles_text: Raw `.srt`/`.vtt` file contents as a string.
+
+    Returns:
+        A `SubtitleIndex` representing the subtitles.
+
+    Raises:
+        SubtitleLoaderError: If the text fails to parse.
+    """
+
+    try:
+        return SubtitleIndex.from_cues(iter_cues(subtitles_text.splitlines()))
+    except Exception as exc:  # pragma: no cover - defensive
+        raise SubtitleLoaderError(f"Failed to parse subtitle text: {exc}") from exc
+
+
+_INT32_MIN = -(2**31)
+_INT32_MAX = 2**31 - 1
+
+
+def _clamp_milliseconds(milliseconds: int) -> int:
+    """Clamp a cue time to the index's int32 range."""
+    return min(max(milliseconds, _INT32_MIN), _INT32_MAX)
 
 
 def _normalize_text(text: str) -> str:
@@ -53,13 +90,124 @@ def _normalize_text(text: str) -> str:
     return " ".join(text.split())
 
 
+class SubtitleIndex:
+    """Precomputed, bisectable view of a subtitle track.
+
+    Cues are kept sorted by end time with their text normalized once up front.
+    Normalized lines are stored back to back in a single newline-terminated
+    buffer, so `offsets[i]` is where line `i` starts and doubles as the prefix
+    sum of line lengths (plus separators). Time windows are found with bisect
+    and the character cap is applied with one more bisect over the offsets.
+    """
+
+    __slots__ = ("starts", "ends", "offsets", "text", "__weakref__")
+
+    def __init__(self, starts: array, ends: array, offsets: array, text: str) -> None:
+        self.starts = starts
+        self.ends = ends
+        self.offsets = offsets
+        self.text = text
+
+    @classmethod
+    def from_items(cls, subtitles: Iterable[pysrt.SubRipItem]) -> "SubtitleIndex":
+        """Build an index from pysrt subtitle entries."""
+
+        return cls.from_cues(
+            (entry.start.ordinal, entry.end.ordinal, entry.text) for entry in subtitles
+        )
+
+    @classmethod
+    def from_cues(cls, subtitles: Iterable[Cue]) -> "SubtitleIndex":
+        """Build an index from `(start_ms, end_ms, text)` cues, dropping cues without text."""
+
+        cues = []
+        for start, end, raw_text in subtitles:
+            normalized = _normalize_text(raw_text)
+            if normalized:
+                cues.append((_clamp_milliseconds(end), _clamp_milliseconds(start), normalized))
+        # Stable sort keeps file order for cues that end at the same time.
+        cues.sort(key=lambda cue: cue[0])
+
+        starts = array("i", (cue[1] for cue in cues))
+        ends = array("i", (cue[0] for cue in cues))
+        offsets = array("q", [0])
+        position = 0
+        for _, _, normalized in cues:
+            position += len(normalized) + 1
+            offsets.append(position)
+        text = "".join(f"{cue[2]}\n" for cue in cues)
+        return cls(starts, ends, offsets, text)
+
+    def __len__(self) -> int:
+        return len(self.ends)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the index."""
+        return (
+            self.starts.itemsize * len(self.starts)
+            + self.ends.itemsize * len(self.ends)
+            + self.offsets.itemsize * len(self.offsets)
+            + sys.getsizeof(self.text)
+        )
+
+    def window(self, start_seconds: int, end_seconds: int) -> tuple[int, int]:
+        """Return the `[lo, hi)` cue range whose end second lies within the bounds."""
+
+        lo = bisect_left(self.ends, start_seconds * 1000)
+        hi = bisect_left(self.ends, (end_seconds + 1) * 1000, lo)
+        return lo, hi
+
+    def trim(self, lo: int, hi: int, max_characters: int | None) -> int:
+        """Return the first cue of the longest suffix of `[lo, hi)` within the cap."""
+
+        if max_characters is None or max_characters <= 0 or lo >= hi:
+            return lo
+        # Joined length of cues [j, hi) is offsets[hi] - offsets[j] - 1.
+        floor = self.offsets[hi] - 1 - max_characters
+        return bisect_left(self.offsets, floor, lo, hi)
+
+    def text_between(self, lo: int, hi: int) -> str:
+        """Return cues `[lo, hi)` joined by newlines."""
+
+        if lo >= hi:
+            return ""
+        return self.text[self.offsets[lo] : self.offsets[hi] - 1]
+
+    def lines_between(self, lo: int, hi: int) -> list[str]:
+        """Return cues `[lo, hi)` as a list of normalized lines."""
+
+        text = self.text_between(lo, hi)
+        return text.split("\n") if text else []
+
+
+def track_fingerprint(track: SubtitleIndex) -> str:
+    """Content hash of an indexed track, independent of how it was loaded."""
+
+    digest = hashlib.sha256()
+    digest.update(track.starts.tobytes())
+    digest.update(track.ends.tobytes())
+    digest.update(track.text.encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+
+def as_subtitle_index(
+    subtitles: SubtitleIndex | Iterable[pysrt.SubRipItem],
+) -> SubtitleIndex:
+    """Return `subtitles` as a `SubtitleIndex`, building one when needed."""
+
+    if isinstance(subtitles, SubtitleIndex):
+        return subtitles
+    return SubtitleIndex.from_items(subtitles)
+
+
 def context_until_timestamp(
-    subtitles: Iterable[pysrt.SubRipItem], timestamp: int
+    subtitles: SubtitleIndex | Iterable[pysrt.SubRipItem], timestamp: int
 ) -> str:
     """Return subtitle text that occurs at or before the timestamp.
 
     Args:
-        subtitles: Iterable of subtitle entries.
+        subtitles: Subtitle index or iterable of subtitle entries.
         timestamp: Timestamp in seconds.
 
     Returns:
@@ -71,7 +219,7 @@ def context_until_timestamp(
 
 
 def _collect_window_lines(
-    subtitles: Iterable[pysrt.SubRipItem],
+    subtitles: SubtitleIndex | Iterable[pysrt.SubRipItem],
     *,
     start_seconds: int,
     end_seconds: int,
@@ -79,38 +227,14 @@ def _collect_window_lines(
 ) -> list[str]:
     """Collect normalized subtitle lines within a time (and optional char) window."""
 
-    if max_characters is not None and max_characters <= 0:
-        max_characters = None
-
-    window: deque[str] = deque()
-    text_length = 0
-
-    for entry in subtitles:
-        entry_end = _to_seconds(entry)
-        if entry_end > end_seconds:
-            break
-        if entry_end < start_seconds:
-            continue
-
-        normalized = _normalize_text(entry.text)
-        if not normalized:
-            continue
-
-        window.append(normalized)
-        text_length += len(normalized)
-
-        if max_characters is None:
-            continue
-
-        while window and (text_length + (len(window) - 1)) > max_characters:
-            removed = window.popleft()
-            text_length -= len(removed)
-
-    return list(window)
+    index = as_subtitle_index(subtitles)
+    lo, hi = index.window(start_seconds, end_seconds)
+    lo = index.trim(lo, hi, max_characters)
+    return index.lines_between(lo, hi)
 
 
 def extract_context(
-    subtitles: pysrt.SubRipFile,
+    subtitles: SubtitleIndex | Iterable[pysrt.SubRipItem],
     timestamp: int | str,
     *,
     window_seconds: int | None = DEFAULT_CONTEXT_WINDOW_SECONDS,
@@ -119,7 +243,7 @@ def extract_context(
     """Obtain relevant subtitle context up to a timestamp.
 
     Args:
-        subtitles: Parsed subtitle data.
+        subtitles: Parsed subtitle data, ideally a prebuilt `SubtitleIndex`.
         timestamp: Target timestamp as seconds or HH:MM:SS.
         window_seconds: Optional number of seconds of context to retain (latest first).
         max_characters: Optional hard cap on the returned context length.
@@ -134,18 +258,28 @@ def extract_context(
 
     seconds = parse_timestamp(timestamp)
 
+    index = as_subtitle_index(subtitles)
+    lo, hi = context_window(index, seconds, window_seconds=window_seconds, max_characters=max_characters)
+    return index.text_between(lo, hi).strip()
+
+
+def context_window(
+    index: SubtitleIndex,
+    seconds: int,
+    *,
+    window_seconds: int | None = DEFAULT_CONTEXT_WINDOW_SECONDS,
+    max_characters: int | None = DEFAULT_CONTEXT_MAX_CHARACTERS,
+) -> tuple[int, int]:
+    """Return the `[lo, hi)` cue range `extract_context` uses for `seconds`."""
+
     effective_window = window_seconds if window_seconds and window_seconds > 0 else None
     start_seconds = seconds - effective_window if effective_window else 0
     if start_seconds < 0:
         start_seconds = 0
 
-    lines = _collect_window_lines(
-        subtitles,
-        start_seconds=start_seconds,
-        end_seconds=seconds,
-        max_characters=max_characters,
-    )
-    return "\n".join(lines).strip()
+    lo, hi = index.window(start_seconds, seconds)
+    return index.trim(lo, hi, max_characters), hi
+
 
 def extract_context_from_text(
     subtitles_text: str,
@@ -166,14 +300,135 @@ def extract_context_from_text(
     Returns:
         Subtitle context string.
     """
-    try:
-        subtitles = pysrt.from_string(subtitles_text)
-    except Exception as exc:
-        raise SubtitleLoaderError(f"Failed to parse subtitle text: {exc}") from exc
-
     return extract_context(
-        subtitles,
+        parse_subtitles_text(subtitles_text),
         current_time,
         window_seconds=window_seconds,
         max_characters=max_characters,
     )
+
+
+# Forward jumps longer than this re-seek with bisect instead of walking cues.
+TRACKER_SEEK_THRESHOLD_SECONDS = 30
+
+
+@dataclass
+class ContextDelta:
+    """Change to a playback context window since the previous update.
+
+    When `reset` is true, `lines` is the complete window. Otherwise the client
+    drops `drop` lines from the front of its copy and appends `lines`.
+    `version` encodes the resulting window's cue range, so any tracker over the
+    same track (e.g. in another worker process) can continue from it.
+    """
+
+    version: int
+    reset: bool
+    drop: int = 0
+    lines: list[str] = field(default_factory=list)
+
+
+class PlaybackContextTracker:
+    """Sliding `extract_context` window that moves with the playhead.
+
+    The window is kept as a `[lo, hi)` cue range into a `SubtitleIndex`.
+    Small forward moves walk the range edges, so each update costs
+    O(changed cues); backward moves and long jumps (scrubbing) fall back to an
+    indexed seek. The window always matches what `extract_context` returns
+    for the same timestamp and limits.
+    """
+
+    __slots__ = ("index", "window_seconds", "max_characters", "seconds", "lo", "hi", "version")
+
+    def __init__(
+        self,
+        subtitles: SubtitleIndex | Iterable[pysrt.SubRipItem],
+        *,
+        window_seconds: int | None = DEFAULT_CONTEXT_WINDOW_SECONDS,
+        max_characters: int | None = DEFAULT_CONTEXT_MAX_CHARACTERS,
+    ) -> None:
+        self.index = as_subtitle_index(subtitles)
+        self.window_seconds = window_seconds if window_seconds and window_seconds > 0 else None
+        self.max_characters = max_characters
+        self.seconds = -1
+        self.lo = 0
+        self.hi = 0
+        self.version = 0
+
+    @property
+    def context(self) -> str:
+        """Current window text, identical to `extract_context` at `seconds`."""
+        return self.index.text_between(self.lo, self.hi)
+
+    def _window_start(self, seconds: int) -> int:
+        if self.window_seconds is None:
+            return 0
+        return max(0, seconds - self.window_seconds)
+
+    def _version_of(self, lo: int, hi: int) -> int:
+        return lo * (len(self.index) + 1) + hi
+
+    def _window_of(self, version: int) -> tuple[int, int] | None:
+        if version < 0:
+            return None
+        lo, hi = divmod(version, len(self.index) + 1)
+        return (lo, hi) if lo <= hi else None
+
+    def _seek(self, seconds: int) -> tuple[int, int]:
+        lo, hi = self.index.window(self._window_start(seconds), seconds)
+        return self.index.trim(lo, hi, self.max_characters), hi
+
+    def _walk(self, seconds: int) -> tuple[int, int]:
+        ends = self.index.ends
+        count = len(ends)
+        hi = self.hi
+        limit = (seconds + 1) * 1000
+        while hi < count and ends[hi] < limit:
+            hi += 1
+        lo = self.lo
+        floor = self._window_start(seconds) * 1000
+        while lo < hi and ends[lo] < floor:
+            lo += 1
+        return self.index.trim(lo, hi, self.max_characters), hi
+
+    def update(self, timestamp: int | str, *, known_version: int | None = None) -> ContextDelta:
+        """Move the playhead to `timestamp` and return what changed.
+
+        Args:
+            timestamp: Playback position as seconds or HH:MM:SS.
+            known_version: Version of the window the caller currently holds,
+                or `None` for the window of the previous update. The delta is
+                computed against that window; a version that is not one
+                (e.g. -1 before the first update) yields a full reset.
+
+        Raises:
+            TimestampParseError: If the timestamp cannot be parsed.
+        """
+
+        seconds = parse_timestamp(timestamp)
+        if known_version is None:
+            held = (self.lo, self.hi) if self.seconds >= 0 else None
+        else:
+            held = self._window_of(known_version)
+        if self.seconds < 0 or seconds < self.seconds:
+            lo, hi = self._seek(seconds)
+        elif seconds - self.seconds > TRACKER_SEEK_THRESHOLD_SECONDS:
+            lo, hi = self._seek(seconds)
+        else:
+            lo, hi = self._walk(seconds)
+
+        self.seconds, self.lo, self.hi = seconds, lo, hi
+        self.version = self._version_of(lo, hi)
+        if held == (lo, hi):
+            return ContextDelta(self.version, False)
+        if held is None or lo < held[0] or hi < held[1]:
+            # Scrubbed backwards (or the caller lost track): send the whole window.
+            return ContextDelta(self.version, True, 0, self.index.lines_between(lo, hi))
+        # Forward move: both edges only advance.
+        previous_lo, previous_hi = held
+        return ContextDelta(
+            self.version,
+            False,
+            min(lo, previous_hi) - previous_lo,
+            self.index.lines_between(max(previous_hi, lo), hi),
+        )
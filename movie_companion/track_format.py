@@ -0,0 +1,192 @@
+"""Versioned binary file format for indexed subtitle tracks, loaded with `mmap`.
+
+Layout (little-endian, every section starts on an 8-byte boundary)::
+
+    header        magic b"STVTRACK", u16 version, u16 table count,
+                  u32 cue count, u32 reserved, u64 text bytes (32 bytes)
+    starts        int32[cues]        cue start times in ms, end-time order
+    ends          int32[cues]        cue end times in ms, ascending
+    offsets       int64[cues + 1]    character offsets of each line in the text
+    byte_offsets  int64[cues + 1]    the same offsets in UTF-8 bytes
+    text          u8[text bytes]     newline-terminated normalized lines
+    tables        per table: u16 name length, UTF-8 name, then
+                  int64[cues + 1] per-cue token prefix sums
+
+A loaded track is a `SubtitleIndex` whose arrays are views straight into
+the mapping, so opening one costs a header check, and every worker process
+that maps the same file shares one page-cached copy.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+from .subtitles import SubtitleIndex
+
+
+MAGIC = b"STVTRACK"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<8sHHIIQ")
+_HEADER_SIZE = 32
+_NAME_LENGTH = struct.Struct("<H")
+
+
+class TrackFormatError(ValueError):
+    """Raised when a track file is truncated, corrupt or of another version."""
+
+
+def _align(position: int) -> int:
+    return (position + 7) & ~7
+
+
+class MappedSubtitleIndex(SubtitleIndex):
+    """A `SubtitleIndex` backed by a memory-mapped track file.
+
+    `starts`, `ends` and `offsets` are typed memoryviews into the mapping
+    and behave like the arrays of a parsed index. Text is decoded only for
+    the cues a lookup returns.
+    """
+
+    __slots__ = ("byte_offsets", "_blob", "_mapping")
+
+    def __init__(
+        self,
+        starts: Sequence[int],
+        ends: Sequence[int],
+        offsets: Sequence[int],
+        byte_offsets: Sequence[int],
+        blob: memoryview,
+        mapping: mmap.mmap,
+    ) -> None:
+        self.starts = starts
+        self.ends = ends
+        self.offsets = offsets
+        self.byte_offsets = byte_offsets
+        self._blob = blob
+        self._mapping = mapping
+
+    @property  # type: ignore[override]
+    def text(self) -> str:
+        return str(self._blob, "utf-8", "surrogatepass")
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the mapping; its pages are shared with other processes."""
+        return len(self._mapping)
+
+    def text_between(self, lo: int, hi: int) -> str:
+        if lo >= hi:
+            return ""
+        return str(self._blob[self.byte_offsets[lo] : self.byte_offsets[hi] - 1], "utf-8", "surrogatepass")
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder != "little":  # pragma: no cover - big-endian hosts
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def write_track(path: str | Path, track: SubtitleIndex, token_prefixes: Optional[Dict[str, Sequence[int]]] = None) -> None:
+    """Write `track` (and optional per-tokenizer prefix sums) atomically to `path`."""
+
+    path = Path(path)
+    cues = len(track)
+    lines = [line.encode("utf-8", "surrogatepass") for line in track.lines_between(0, cues)]
+    byte_offsets = array("q", [0])
+    for line in lines:
+        byte_offsets.append(byte_offsets[-1] + len(line) + 1)
+    text = b"".join(line + b"\n" for line in lines)
+    tables = dict(token_prefixes or {})
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as handle:
+
+            def section(data: bytes) -> None:
+                handle.write(data)
+                handle.write(b"\0" * (_align(handle.tell()) - handle.tell()))
+
+            section(_HEADER.pack(MAGIC, FORMAT_VERSION, len(tables), cues, 0, len(text)).ljust(_HEADER_SIZE, b"\0"))
+            section(_little_endian(array("i", track.starts)))
+            section(_little_endian(array("i", track.ends)))
+            section(_little_endian(array("q", track.offsets)))
+            section(_little_endian(byte_offsets))
+            section(text)
+            for name, prefix in tables.items():
+                encoded = name.encode("utf-8")
+                section(_NAME_LENGTH.pack(len(encoded)) + encoded)
+                section(_little_endian(array("q", prefix)))
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def open_track(path: str | Path) -> Tuple[MappedSubtitleIndex, Dict[str, memoryview]]:
+    """Map a track file and return the index and its token prefix tables.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        TrackFormatError: If the file is not a valid track of this version.
+    """
+
+    if sys.byteorder != "little":  # pragma: no cover - big-endian hosts
+        raise TrackFormatError("Track files can only be mapped on little-endian hosts.")
+    with open(path, "rb") as handle:
+        size = os.fstat(handle.fileno()).st_size
+        if size < _HEADER_SIZE:
+            raise TrackFormatError(f"Truncated track file: {path}")
+        mapping = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    # Every view into the mapping, so a rejected file can be unmapped again.
+    views: list[memoryview] = []
+    try:
+        magic, version, table_count, cues, _, text_bytes = _HEADER.unpack_from(mapping, 0)
+        if magic != MAGIC:
+            raise TrackFormatError(f"Not a track file: {path}")
+        if version != FORMAT_VERSION:
+            raise TrackFormatError(f"Unsupported track format version {version}: {path}")
+        view = memoryview(mapping)
+        views.append(view)
+        position = _HEADER_SIZE
+
+        def take(length: int, fmt: str = "B") -> memoryview:
+            nonlocal position
+            end = position + length
+            if end > size:
+                raise TrackFormatError(f"Truncated track file: {path}")
+            section = view[position:end]
+            views.append(section)
+            position = _align(end)
+            if fmt != "B":
+                section = section.cast(fmt)
+                views.append(section)
+            return section
+
+        starts = take(4 * cues, "i")
+        ends = take(4 * cues, "i")
+        offsets = take(8 * (cues + 1), "q")
+        byte_offsets = take(8 * (cues + 1), "q")
+        blob = take(text_bytes)
+        tables: Dict[str, memoryview] = {}
+        for _ in range(table_count):
+            (name_length,) = _NAME_LENGTH.unpack_from(mapping, position)
+            name = str(take(_NAME_LENGTH.size + name_length)[_NAME_LENGTH.size :], "utf-8")
+            tables[name] = take(8 * (cues + 1), "q")
+    except BaseException as exc:
+        for created in reversed(views):
+            created.release()
+        mapping.close()
+        if isinstance(exc, (struct.error, ValueError)) and not isinstance(exc, TrackFormatError):
+            raise TrackFormatError(f"Corrupt track file: {path}") from exc
+        raise
+    return MappedSubtitleIndex(starts, ends, offsets, byte_offsets, blob, mapping), tables
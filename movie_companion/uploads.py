@@ -0,0 +1,461 @@
+"""Content-addressed media storage with hashed, streaming and resumable uploads."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, ContextManager, Dict, Optional, Tuple
+
+from .file_lock import FileLock
+
+
+DEFAULT_MEDIA_DIR = Path("media")
+DEFAULT_UPLOAD_SESSION_TTL_SECONDS = 24 * 60 * 60
+
+# Upload kind -> (directory under the media root, suffix when the filename has none).
+UPLOAD_KINDS: Dict[str, Tuple[str, str]] = {
+    "video": ("videos", ".mp4"),
+    "subtitles": ("subtitles", ".srt"),
+}
+
+_READ_BYTES = 1024 * 1024
+
+
+class UploadError(ValueError):
+    """Raised for an invalid upload, upload chunk or upload session."""
+
+
+class UploadOffsetMismatch(UploadError):
+    """Raised when a chunk does not start where the stored part ends."""
+
+    def __init__(self, offset: int) -> None:
+        super().__init__(f"Upload is at byte {offset}.")
+        self.offset = offset
+
+
+class UploadBusy(UploadError):
+    """Raised when another request is already writing to the same upload."""
+
+
+@dataclass(frozen=True)
+class StoredFile:
+    """A file committed under its content hash."""
+
+    path: str
+    sha256: str
+    size: int
+    # False when an identical file was already stored and the upload was dropped.
+    created: bool
+
+
+@dataclass
+class UploadSession:
+    upload_id: str
+    kind: str
+    filename: str
+    size: int
+    created_at: float
+    offset: int = 0
+    sha256: Optional[str] = None
+    path: Optional[str] = None
+    # Whether finishing the upload stored a new file rather than finding it stored.
+    created: bool = False
+
+    @property
+    def complete(self) -> bool:
+        return self.path is not None
+
+    def status(self) -> Dict[str, object]:
+        return {**asdict(self), "complete": self.complete}
+
+
+class HashingWriter:
+    """Appends to a file and hashes the bytes as they are written."""
+
+    def __init__(self, path: Path, *, fd: Optional[int] = None, hasher: Optional["hashlib._Hash"] = None) -> None:
+        self.path = path
+        self._hasher = hasher or hashlib.sha256()
+        self._handle = os.fdopen(fd, "wb") if fd is not None else path.open("ab")
+        self.size = self._handle.tell()
+
+    def write(self, data: bytes) -> None:
+        self._hasher.update(data)
+        self._handle.write(data)
+        self.size += len(data)
+
+    def close(self) -> None:
+        self._handle.close()
+
+    def hexdigest(self) -> str:
+        return self._hasher.hexdigest()
+
+    def hasher(self) -> "hashlib._Hash":
+        return self._hasher.copy()
+
+
+def _suffix(kind: str, filename: str) -> str:
+    suffix = Path(filename).suffix.lower()
+    if not suffix or len(suffix) > 10 or not suffix[1:].isalnum():
+        suffix = UPLOAD_KINDS[kind][1]
+    return suffix
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+class MediaStore:
+    """Stores uploaded videos and subtitles under `<root>/<kind>/<sha256><suffix>`.
+
+    Uploads are written to `<root>/incoming` while they are hashed and only
+    then moved into place, so an identical file is stored once however often
+    it is uploaded. Resumable uploads keep `<upload_id>.json` and
+    `<upload_id>.part` in the same directory; the part's size is the upload
+    offset, so a session survives restarts and works across worker
+    processes. The running hash is kept in memory between chunks and
+    rebuilt from the part file when a chunk lands on another process.
+
+    Stored files are shared by content hash, so committing a file and
+    recording a reference to it must not interleave with deleting files
+    nothing references; both sides hold `references()`. With `shared=True`
+    that is a file lock across worker processes. `in_use(sha256)` tells
+    whether anything outside the store (the library) still references a
+    hash, so aborted or expired uploads can drop the file they stored.
+    """
+
+    def __init__(
+        self,
+        root: str | Path = DEFAULT_MEDIA_DIR,
+        *,
+        session_ttl_seconds: float = DEFAULT_UPLOAD_SESSION_TTL_SECONDS,
+        shared: bool = False,
+        in_use: Optional[Callable[[str], bool]] = None,
+    ) -> None:
+        self.root = Path(root)
+        self.incoming = self.root / "incoming"
+        self.session_ttl_seconds = session_ttl_seconds
+        self._lock = threading.Lock()
+        self._references: ContextManager = FileLock(self.root / "references.lock") if shared else threading.RLock()
+        self.in_use = in_use
+        # upload_id -> (offset, hasher) for the bytes hashed so far.
+        self._hashers: Dict[str, Tuple[int, "hashlib._Hash"]] = {}
+        self.files_stored = 0
+        self.duplicates = 0
+        self.bytes_received = 0
+
+    # Internal helpers -------------------------------------------------
+    def _session_path(self, upload_id: str) -> Path:
+        return self.incoming / f"{upload_id}.json"
+
+    def _part_path(self, upload_id: str) -> Path:
+        return self.incoming / f"{upload_id}.part"
+
+    def _claim_path(self, upload_id: str) -> Path:
+        return self.incoming / f"{upload_id}.writer"
+
+    def _write_session(self, session: UploadSession) -> None:
+        path = self._session_path(session.upload_id)
+        fd, tmp_name = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=self.incoming)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(asdict(session), handle)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    def _claim(self, upload_id: str) -> None:
+        # One writer per upload across threads and processes: a marker holding
+        # the writer's pid, taken over only when that process is gone. The pid
+        # is written first and the marker hard-linked into place, so nobody
+        # ever reads a half-written marker as a dead writer.
+        path = self._claim_path(upload_id)
+        fd, tmp_name = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=self.incoming)
+        try:
+            with os.fdopen(fd, "w") as handle:
+                handle.write(str(os.getpid()))
+            for _ in range(2):
+                try:
+                    os.link(tmp_name, path)
+                    return
+                except FileExistsError:
+                    pass
+                try:
+                    pid = int(path.read_text())
+                except FileNotFoundError:
+                    continue
+                except (OSError, ValueError):
+                    pid = 0
+                if pid and (pid == os.getpid() or _pid_alive(pid)):
+                    raise UploadBusy("Another request is writing to this upload.")
+                path.unlink(missing_ok=True)
+            raise UploadBusy("Another request is writing to this upload.")
+        finally:
+            Path(tmp_name).unlink(missing_ok=True)
+
+    def _rehash(self, path: Path) -> "hashlib._Hash":
+        hasher = hashlib.sha256()
+        with path.open("rb") as handle:
+            for block in iter(lambda: handle.read(_READ_BYTES), b""):
+                hasher.update(block)
+        return hasher
+
+    def _store(self, source: Path, kind: str, filename: str, sha256: str, size: int) -> StoredFile:
+        directory, _ = UPLOAD_KINDS[kind]
+        target_dir = self.root / directory
+        target_dir.mkdir(parents=True, exist_ok=True)
+        existing = next(target_dir.glob(f"{sha256}.*"), None)
+        if existing is not None:
+            source.unlink(missing_ok=True)
+            with self._lock:
+                self.duplicates += 1
+            return StoredFile(path=existing.as_posix(), sha256=sha256, size=size, created=False)
+        target = target_dir / f"{sha256}{_suffix(kind, filename)}"
+        os.replace(source, target)
+        with self._lock:
+            self.files_stored += 1
+        return StoredFile(path=target.as_posix(), sha256=sha256, size=size, created=True)
+
+    def _delete_unreferenced(self, stored_path: str, sha256: str) -> None:
+        # Callers hold `references()` and have already removed their own session record.
+        if not ((self.in_use is not None and self.in_use(sha256)) or self.pending(sha256)):
+            self.delete(stored_path)
+
+    def references(self) -> ContextManager:
+        """Re-entrant lock to hold while committing or deleting stored files."""
+        return self._references
+
+    def pending(self, sha256: str) -> bool:
+        """Whether a completed upload session, not yet consumed, holds `sha256`."""
+
+        for path in self.incoming.glob("*.json"):
+            session = self.get_session(path.stem)
+            if session is not None and session.sha256 == sha256:
+                return True
+        return False
+
+    # Single-request uploads -------------------------------------------
+    def new_writer(self) -> HashingWriter:
+        """Open a hashing writer on a fresh temporary file under `incoming`."""
+
+        self.incoming.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(suffix=".upload", dir=self.incoming)
+        return HashingWriter(Path(tmp_name), fd=fd)
+
+    def discard(self, writer: HashingWriter) -> None:
+        writer.close()
+        writer.path.unlink(missing_ok=True)
+
+    def commit(
+        self,
+        writer: HashingWriter,
+        kind: str,
+        filename: str,
+        *,
+        validate: Optional[Callable[[Path], None]] = None,
+    ) -> StoredFile:
+        """Close `writer` and move its file into place, or drop it if already stored.
+
+        `validate` may inspect the finished file first; whatever it raises
+        propagates and the file is discarded. Hold `references()` until the
+        returned file is referenced somewhere.
+        """
+
+        writer.close()
+        with self._lock:
+            self.bytes_received += writer.size
+        try:
+            if validate is not None:
+                validate(writer.path)
+            return self._store(writer.path, kind, filename, writer.hexdigest(), writer.size)
+        except BaseException:
+            writer.path.unlink(missing_ok=True)
+            raise
+
+    # Resumable uploads ------------------------------------------------
+    def create_session(self, kind: str, filename: str, size: int) -> UploadSession:
+        if kind not in UPLOAD_KINDS:
+            raise UploadError(f"Unknown upload kind: {kind!r}")
+        if size < 0:
+            raise UploadError("Upload size must not be negative.")
+        self.purge_expired()
+        self.incoming.mkdir(parents=True, exist_ok=True)
+        session = UploadSession(
+            upload_id=uuid.uuid4().hex,
+            kind=kind,
+            filename=Path(filename).name,
+            size=size,
+            created_at=time.time(),
+        )
+        self._part_path(session.upload_id).touch()
+        self._write_session(session)
+        return session
+
+    def get_session(self, upload_id: str) -> Optional[UploadSession]:
+        """Return the session with its current offset, or `None` if unknown."""
+
+        if not upload_id.isalnum():
+            return None
+        try:
+            with self._session_path(upload_id).open("r", encoding="utf-8") as handle:
+                session = UploadSession(**json.load(handle))
+        except (OSError, ValueError, TypeError):
+            return None
+        if not session.complete:
+            try:
+                session.offset = self._part_path(upload_id).stat().st_size
+            except FileNotFoundError:
+                return None
+        return session
+
+    def open_chunk(self, session: UploadSession, offset: int) -> HashingWriter:
+        """Claim the session and open a writer positioned at `offset`.
+
+        Raises:
+            UploadOffsetMismatch: If `offset` is not the stored part's size.
+            UploadBusy: If another request is writing to this upload.
+        """
+
+        if session.complete or offset != session.offset:
+            raise UploadOffsetMismatch(session.offset)
+        self._claim(session.upload_id)
+        try:
+            part = self._part_path(session.upload_id)
+            size = part.stat().st_size
+            if size != offset:
+                raise UploadOffsetMismatch(size)
+            with self._lock:
+                cached = self._hashers.pop(session.upload_id, None)
+            hasher = cached[1] if cached is not None and cached[0] == size else self._rehash(part)
+            return HashingWriter(part, hasher=hasher)
+        except BaseException:
+            self._claim_path(session.upload_id).unlink(missing_ok=True)
+            raise
+
+    def finish_chunk(
+        self,
+        session: UploadSession,
+        writer: HashingWriter,
+        *,
+        validate: Optional[Callable[[Path], None]] = None,
+    ) -> UploadSession:
+        """Release the claim and, once every byte has arrived, store the file.
+
+        Raises:
+            UploadError: If more bytes arrived than the session declared.
+        """
+
+        writer.close()
+        try:
+            with self._lock:
+                self.bytes_received += writer.size - session.offset
+            session.offset = writer.size
+            if writer.size > session.size:
+                self._part_path(session.upload_id).unlink(missing_ok=True)
+                self._session_path(session.upload_id).unlink(missing_ok=True)
+                raise UploadError(f"Upload exceeds its declared size of {session.size} bytes.")
+            if writer.size < session.size:
+                with self._lock:
+                    self._hashers[session.upload_id] = (writer.size, writer.hasher())
+                return session
+            try:
+                if validate is not None:
+                    validate(writer.path)
+                # The completed session record is the file's reference until it is consumed.
+                with self.references():
+                    stored = self._store(writer.path, session.kind, session.filename, writer.hexdigest(), writer.size)
+                    try:
+                        session.sha256, session.path, session.created = stored.sha256, stored.path, stored.created
+                        self._write_session(session)
+                    except BaseException:
+                        self._session_path(session.upload_id).unlink(missing_ok=True)
+                        self._delete_unreferenced(stored.path, stored.sha256)
+                        raise
+            except BaseException:
+                self.abort_session(session.upload_id)
+                raise
+            return session
+        finally:
+            self._claim_path(session.upload_id).unlink(missing_ok=True)
+
+    def completed_upload(self, upload_id: str, kind: str) -> StoredFile:
+        """Return the file stored by a completed upload of `kind`.
+
+        The session stays until `forget_session`, so call that only once the
+        file is referenced somewhere, holding `references()` in between.
+
+        Raises:
+            UploadError: If the session is unknown, incomplete or of another kind.
+        """
+
+        session = self.get_session(upload_id)
+        if session is None or session.kind != kind or not session.complete:
+            raise UploadError(f"No completed {kind} upload {upload_id!r}.")
+        return StoredFile(path=session.path, sha256=session.sha256, size=session.size, created=session.created)
+
+    def forget_session(self, upload_id: str) -> None:
+        """Delete a consumed session record, leaving its stored file in place."""
+        self._session_path(upload_id).unlink(missing_ok=True)
+
+    def abort_session(self, upload_id: str) -> bool:
+        """Delete an upload session and its data; return whether it existed.
+
+        A completed session's stored file goes too, unless the library or
+        another completed upload still references it.
+        """
+
+        if not upload_id.isalnum():
+            return False
+        with self._lock:
+            self._hashers.pop(upload_id, None)
+        with self.references():
+            session = self.get_session(upload_id)
+            existed = self._session_path(upload_id).exists()
+            for path in (self._session_path(upload_id), self._part_path(upload_id)):
+                path.unlink(missing_ok=True)
+            if session is not None and session.complete:
+                self._delete_unreferenced(session.path, session.sha256)
+        return existed
+
+    def purge_expired(self) -> int:
+        """Delete sessions idle for longer than the TTL; return how many were removed."""
+
+        cutoff = time.time() - self.session_ttl_seconds
+        removed = 0
+        for path in self.incoming.glob("*.json"):
+            upload_id = path.stem
+            part = self._part_path(upload_id)
+            try:
+                last_write = max(path.stat().st_mtime, part.stat().st_mtime if part.exists() else 0)
+            except FileNotFoundError:
+                continue
+            if last_write < cutoff and not self._claim_path(upload_id).exists():
+                removed += self.abort_session(upload_id)
+        return removed
+
+    def delete(self, path: str | Path) -> None:
+        """Remove a stored file; the caller checks that nothing references it."""
+        Path(path).unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, int]:
+        """Return upload and deduplication counters."""
+        with self._lock:
+            return {
+                "files_stored": self.files_stored,
+                "duplicates": self.duplicates,
+                "bytes_received": self.bytes_received,
+                "sessions": sum(1 for _ in self.incoming.glob("*.json")) if self.incoming.exists() else 0,
+            }
@@ -29,6 +29,13 @@ const fullscreenToggleLabel = fullscreenToggle ? fullscreenToggle.querySelector(
 let currentVideoId = "";
 let debounceTimer = null;
 let subtitleCache = new Map();
+let subtitleTrackIds = new Map();
+let contextSession = null;
+let playbackChannel = null;
+let playbackChannelUnavailable = false; // e.g. hosts without WebSocket support
+let playbackChannelFailures = 0; // consecutive connections that never got a message
+let playbackChannelRetryAt = 0;
+let playbackAskCounter = 0;
 let activeSubtitleCues = [];
 let lastSubtitleText = "";
 let assistantCollapsed = false;
@@ -462,6 +469,247 @@ function attachSubtitles(videoId) {
     track.src = `/api/videos/${videoId}/subtitles`;
     videoPlayer.appendChild(track);
 }
+async function registerSubtitleTrack(videoId) {
+    const cached = subtitleTrackIds.get(videoId);
+    if (cached)
+        return cached;
+    // Upload the subtitle text once; the server keeps the parsed track under its hash
+    const subtitleResponse = await fetch(`/api/videos/${videoId}/subtitles`);
+    if (!subtitleResponse.ok)
+        return null;
+    const subtitlesText = await subtitleResponse.text();
+    if (!subtitlesText)
+        return null;
+    const requestBody = { subtitles_text: subtitlesText };
+    const response = await fetch("/api/subtitles", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify(requestBody),
+    });
+    if (!response.ok)
+        return null;
+    const data = await response.json();
+    subtitleTrackIds.set(videoId, data.track_id);
+    return data.track_id;
+}
+async function postToSubtitleTrack(videoId, action, body) {
+    for (let attempt = 0; attempt < 2; attempt += 1) {
+        const trackId = await registerSubtitleTrack(videoId);
+        if (!trackId)
+            return null;
+        const response = await fetch(`/api/subtitles/${trackId}/${action}`, {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: body ? JSON.stringify(body) : undefined,
+        });
+        if (response.status !== 404)
+            return response;
+        // The server expired the track (or restarted); register it again
+        subtitleTrackIds.delete(videoId);
+    }
+    return null;
+}
+async function readAnswerStream(response, onProgress) {
+    if (!response.body)
+        throw new Error("Streaming is not supported by this browser.");
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let partial = "";
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done)
+            break;
+        buffer += decoder.decode(value, { stream: true });
+        // Server-sent events are separated by a blank line
+        let boundary = buffer.indexOf("\n\n");
+        while (boundary !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            boundary = buffer.indexOf("\n\n");
+            let eventName = "message";
+            let dataText = "";
+            for (const line of rawEvent.split("\n")) {
+                if (line.startsWith("event:"))
+                    eventName = line.slice(6).trim();
+                else if (line.startsWith("data:"))
+                    dataText += line.slice(5).trim();
+            }
+            if (!dataText)
+                continue;
+            const data = JSON.parse(dataText);
+            if (eventName === "token" && data.token) {
+                partial += data.token;
+                onProgress(partial);
+            }
+            else if (eventName === "error") {
+                throw new Error(data.detail || "I'm having trouble answering right now.");
+            }
+            else if (eventName === "done") {
+                return data.answer ?? partial;
+            }
+        }
+    }
+    throw new Error("The answer stream ended unexpectedly.");
+}
+async function openContextSession(videoId) {
+    if (contextSession && contextSession.videoId === videoId)
+        return contextSession;
+    if (contextSession) {
+        // Best effort; the server also expires idle sessions
+        fetch(`/api/sessions/${contextSession.sessionId}`, { method: "DELETE" }).catch(() => undefined);
+        contextSession = null;
+    }
+    const response = await postToSubtitleTrack(videoId, "sessions");
+    if (!response || !response.ok)
+        return null;
+    const data = await response.json();
+    contextSession = { videoId, sessionId: data.session_id, version: -1, lines: [] };
+    return contextSession;
+}
+// Returns the context text, null when the video has no subtitles, or undefined
+// when the update should be skipped (request failed or a newer one landed first).
+async function fetchSessionContext(videoId, seconds) {
+    for (let attempt = 0; attempt < 2; attempt += 1) {
+        const session = await openContextSession(videoId);
+        if (!session)
+            return null;
+        const requestBody = { timestamp: seconds, version: session.version };
+        const response = await fetch(`/api/sessions/${session.sessionId}/context`, {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify(requestBody),
+        });
+        if (response.status === 404) {
+            // The session expired (or the server restarted); open a new one
+            if (contextSession === session)
+                contextSession = null;
+            continue;
+        }
+        if (!response.ok)
+            return undefined;
+        const delta = await response.json();
+        if (contextSession !== session)
+            return undefined;
+        if (session.version !== requestBody.version) {
+            // Responses crossed; ask for a full window on the next tick
+            session.version = -1;
+            return undefined;
+        }
+        session.lines = delta.reset ? delta.lines : session.lines.slice(delta.drop).concat(delta.lines);
+        session.version = delta.version;
+        return session.lines.join("\n");
+    }
+    return null;
+}
+function closePlaybackChannel() {
+    if (!playbackChannel)
+        return;
+    const channel = playbackChannel;
+    playbackChannel = null;
+    channel.socket.close();
+}
+function handlePlaybackMessage(channel, event) {
+    const message = JSON.parse(event.data);
+    if (message.type === "context") {
+        channel.lines = message.reset ? message.lines : channel.lines.slice(message.drop).concat(message.lines);
+        if (contextEl && currentVideoId === channel.videoId) {
+            contextEl.textContent = channel.lines.join("\n") || "(No dialogue yet.)";
+        }
+        return;
+    }
+    const pending = message.id ? channel.answers.get(message.id) : undefined;
+    if (!pending) {
+        if (message.type === "error")
+            console.error(message.detail);
+        return;
+    }
+    if (message.type === "token") {
+        pending.partial += message.token;
+        pending.onProgress(pending.partial);
+    }
+    else if (message.type === "done") {
+        channel.answers.delete(message.id);
+        pending.resolve(message.answer ?? pending.partial);
+    }
+    else {
+        channel.answers.delete(message.id);
+        pending.reject(new Error(message.detail || "I'm having trouble answering right now."));
+    }
+}
+const PLAYBACK_CHANNEL_MAX_FAILURES = 5;
+const PLAYBACK_CHANNEL_RETRY_MS = 1000;
+const PLAYBACK_CLOSE_UNKNOWN_TRACK = 4404;
+// Back off after each failed connection; give up on WebSockets after several in a row
+function notePlaybackChannelFailure() {
+    playbackChannelFailures += 1;
+    if (playbackChannelFailures >= PLAYBACK_CHANNEL_MAX_FAILURES) {
+        playbackChannelUnavailable = true;
+        return;
+    }
+    playbackChannelRetryAt = Date.now() + PLAYBACK_CHANNEL_RETRY_MS * 2 ** (playbackChannelFailures - 1);
+}
+// One WebSocket per video carries playhead ticks, context pushes and answers.
+// Returns null when WebSockets are unavailable (or backing off after a failed
+// connection) so callers fall back to HTTP.
+async function openPlaybackChannel(videoId) {
+    if (playbackChannel && playbackChannel.videoId === videoId) {
+        return playbackChannel.socket.readyState === WebSocket.OPEN ? playbackChannel : null;
+    }
+    closePlaybackChannel();
+    if (playbackChannelUnavailable || typeof WebSocket === "undefined")
+        return null;
+    if (Date.now() < playbackChannelRetryAt)
+        return null;
+    const trackId = await registerSubtitleTrack(videoId);
+    if (!trackId)
+        return null;
+    const scheme = window.location.protocol === "https:" ? "wss" : "ws";
+    const socket = new WebSocket(`${scheme}://${window.location.host}/api/subtitles/${trackId}/playback`);
+    const channel = { videoId, socket, lines: [], answers: new Map(), established: false };
+    playbackChannel = channel;
+    socket.addEventListener("message", (event) => {
+        channel.established = true;
+        playbackChannelFailures = 0;
+        handlePlaybackMessage(channel, event);
+    });
+    socket.addEventListener("close", (event) => {
+        for (const pending of channel.answers.values()) {
+            pending.reject(new Error("The connection closed before the answer finished."));
+        }
+        channel.answers.clear();
+        // Closes we asked for (switching videos) are not failures
+        if (playbackChannel !== channel)
+            return;
+        playbackChannel = null;
+        if (!channel.established)
+            notePlaybackChannelFailure();
+        if (event.code === PLAYBACK_CLOSE_UNKNOWN_TRACK) {
+            // The track expired or the server restarted; register it again and reconnect
+            if (subtitleTrackIds.get(videoId) === trackId)
+                subtitleTrackIds.delete(videoId);
+            if (currentVideoId === videoId)
+                scheduleContextUpdate();
+        }
+    });
+    const opened = await new Promise((resolve) => {
+        socket.addEventListener("open", () => resolve(true), { once: true });
+        socket.addEventListener("error", () => resolve(false), { once: true });
+        socket.addEventListener("close", () => resolve(false), { once: true });
+    });
+    return opened ? channel : null;
+}
+function sendPlaybackMessage(channel, message) {
+    channel.socket.send(JSON.stringify(message));
+}
+function askOverPlaybackChannel(channel, body, onProgress) {
+    playbackAskCounter += 1;
+    const id = `ask-${playbackAskCounter}`;
+    return new Promise((resolve, reject) => {
+        channel.answers.set(id, { partial: "", onProgress, resolve, reject });
+        sendPlaybackMessage(channel, { type: "ask", id, ...body });
+    });
+}
 function scheduleContextUpdate() {
     if (!currentVideoId || !videoPlayer || !timestampLabel || !contextEl)
         return;
@@ -472,38 +720,18 @@ function scheduleContextUpdate() {
         if (timestampLabel)
             timestampLabel.textContent = formatTime(seconds);
         try {
-            const entry = libraryItems.find((item) => item.video_id === currentVideoId);
-            if (!entry)
-                return;
-            // Fetch raw subtitle text for context endpoint
-            const subtitleResponse = await fetch(`/api/videos/${currentVideoId}/subtitles`);
-            if (!subtitleResponse.ok) {
-                if (contextEl)
-                    contextEl.textContent = "(No dialogue yet.)";
-                return;
-            }
-            const subtitlesText = await subtitleResponse.text();
-            if (!subtitlesText) {
-                if (contextEl)
-                    contextEl.textContent = "(No dialogue yet.)";
+            // With a playback channel the server pushes the new window itself
+            const channel = await openPlaybackChannel(currentVideoId);
+            if (channel) {
+                sendPlaybackMessage(channel, { type: "tick", timestamp: Math.floor(seconds) });
                 return;
             }
-            const requestBody = {
-                title: entry.title || "Unknown",
-                timestamp: Math.floor(seconds),
-                subtitles_text: subtitlesText,
-                question: "",
-            };
-            const response = await fetch("/api/context", {
-                method: "POST",
-                headers: { "Content-Type": "application/json" },
-                body: JSON.stringify(requestBody),
-            });
-            if (!response.ok)
+            // Only the cues that entered or left the window travel over the wire
+            const context = await fetchSessionContext(currentVideoId, Math.floor(seconds));
+            if (context === undefined)
                 return;
-            const data = await response.json();
             if (contextEl)
-                contextEl.textContent = data.context || "(No dialogue yet.)";
+                contextEl.textContent = context || "(No dialogue yet.)";
         }
         catch (error) {
             console.error(error);
@@ -649,15 +877,11 @@ async function askQuestion() {
         submitButton.disabled = false;
         return;
     }
-    // Fetch raw subtitle text
-    let subtitlesText = "";
+    // Register the subtitle track once; questions only send its ID
     try {
-        const subtitleResponse = await fetch(`/api/videos/${currentVideoId}/subtitles`);
-        if (subtitleResponse.ok) {
-            subtitlesText = await subtitleResponse.text();
-        }
-        else {
-            throw new Error("Failed to fetch subtitles");
+        const trackId = await registerSubtitleTrack(currentVideoId);
+        if (!trackId) {
+            throw new Error("Failed to register subtitles");
         }
     }
     catch (error) {
@@ -672,41 +896,51 @@ async function askQuestion() {
             const requestBody = {
                 title: entry.title || "Unknown",
                 timestamp: Math.floor(videoPlayer?.currentTime || 0),
-                subtitles_text: subtitlesText,
                 question,
                 provider: "ollama",
                 model: "llama3",
             };
-            const response = await fetch("/api/ask", {
-                method: "POST",
-                headers: { "Content-Type": "application/json" },
-                body: JSON.stringify(requestBody),
-            });
-            if (!response.ok) {
-                let message = "I'm having trouble answering right now.";
-                const raw = await response.text();
-                if (raw) {
-                    try {
-                        const data = JSON.parse(raw);
-                        if (data?.detail) {
-                            message = data.detail;
-                        }
-                        else if (data?.message) {
-                            message = data.message;
+            const onProgress = (partial) => {
+                if (placeholder.content)
+                    renderRichText(placeholder.content, partial);
+                scrollChatToBottom();
+            };
+            let answer;
+            const channel = await openPlaybackChannel(currentVideoId);
+            if (channel) {
+                answer = await askOverPlaybackChannel(channel, requestBody, onProgress);
+            }
+            else {
+                const response = await postToSubtitleTrack(currentVideoId, "ask/stream", requestBody);
+                if (!response) {
+                    throw new Error("Could not load subtitles.");
+                }
+                if (!response.ok) {
+                    let message = "I'm having trouble answering right now.";
+                    const raw = await response.text();
+                    if (raw) {
+                        try {
+                            const data = JSON.parse(raw);
+                            if (data?.detail) {
+                                message = data.detail;
+                            }
+                            else if (data?.message) {
+                                message = data.message;
+                            }
+                            else {
+                                message = raw;
+                            }
                         }
-                        else {
+                        catch {
                             message = raw;
                         }
                     }
-                    catch {
-                        message = raw;
-                    }
+                    throw new Error(message);
                 }
-                throw new Error(message);
+                answer = await readAnswerStream(response, onProgress);
             }
-            const data = await response.json();
             if (placeholder.content) {
-                renderRichText(placeholder.content, data.answer);
+                renderRichText(placeholder.content, answer);
             }
             if (placeholder.time) {
                 placeholder.time.dateTime = new Date().toISOString();
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import argparse
 import os
 from pathlib import Path
 
@@ -20,9 +21,34 @@ def _load_env_files() -> None:
             load_dotenv(env_path, override=False)
 
 
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("WEB_CONCURRENCY", "1")),
+        help="Number of worker processes (defaults to $WEB_CONCURRENCY or 1).",
+    )
+    return parser.parse_args()
+
+
 def main() -> None:
     _load_env_files()
+    args = _parse_args()
     port = int(os.getenv("PORT", "8000"))
+    if args.workers > 1:
+        # Workers are separate processes, so uvicorn needs an import string and
+        # each worker builds its own app; history and library files are shared.
+        os.environ.setdefault("SHARED_STATE", "1")
+        uvicorn.run(
+            "movie_companion.server:create_app",
+            factory=True,
+            host="0.0.0.0",
+            port=port,
+            workers=args.workers,
+            reload=False,
+        )
+        return
     app = create_app()
     uvicorn.run(app, host="0.0.0.0", port=port, reload=False)
 
@@ -29,6 +29,12 @@ export interface AskResponse {
   answer: string;
 }
 
+export interface AskStreamEvent {
+  token?: string;
+  answer?: string;
+  detail?: string;
+}
+
 export interface ContextRequest {
   title: string;
   timestamp: number;
@@ -36,6 +42,49 @@ export interface ContextRequest {
   question: string;
 }
 
+export interface RegisterSubtitlesRequest {
+  subtitles_text: string;
+}
+
+export interface RegisterSubtitlesResponse {
+  track_id: string;
+  cues: number;
+}
+
+export interface TrackContextRequest {
+  timestamp: number;
+}
+
+export type TrackAskRequest = Omit<AskRequest, "subtitles_text">;
+
+export interface CreateSessionResponse {
+  session_id: string;
+  track_id: string;
+}
+
+export interface SessionContextRequest {
+  timestamp: number;
+  version: number;
+}
+
+export interface ContextDeltaResponse {
+  version: number;
+  reset: boolean;
+  drop: number;
+  lines: string[];
+  timestamp: string;
+}
+
+export type PlaybackClientMessage =
+  | { type: "tick"; timestamp: number }
+  | ({ type: "ask"; id: string } & TrackAskRequest);
+
+export type PlaybackServerMessage =
+  | ({ type: "context" } & ContextDeltaResponse)
+  | { type: "token"; id: string; token: string }
+  | { type: "done"; id: string; answer: string }
+  | { type: "error"; id?: string | null; detail: string };
+
 export interface ContextResponse {
   context: string;
   timestamp: string;
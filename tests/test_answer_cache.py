@@ -0,0 +1,32 @@
+"""Question normalization must only merge questions that ask the same thing."""
+
+from __future__ import annotations
+
+import pytest
+
+from movie_companion.answer_cache import normalize_question
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ("What is it like?", "What is it?"),
+        ("Is he just a friend?", "Is he a friend?"),
+        ("So who left?", "Who left?"),
+        ("Is that the doctor?", "Is that a doctor?"),
+    ],
+)
+def test_different_questions_stay_apart(first: str, second: str) -> None:
+    assert normalize_question(first) != normalize_question(second)
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ("Who is she?", "who is SHE"),
+        ("Um, who is she?", "Who is she?"),
+        ("Hey, please tell me who she is", "Tell me who she is."),
+    ],
+)
+def test_trivial_rewordings_share_a_key(first: str, second: str) -> None:
+    assert normalize_question(first) == normalize_question(second)
@@ -0,0 +1,73 @@
+"""The built-in subtitle parser must index SRT text exactly as pysrt does."""
+
+from __future__ import annotations
+
+import pysrt
+import pytest
+
+from movie_companion.subtitles import SubtitleIndex, load_subtitles, parse_subtitles_text
+
+
+CASES = {
+    "basic": (
+        "1\n00:00:01,000 --> 00:00:02,500\nHello there.\n\n"
+        "2\n00:00:03,000 --> 00:00:04,000\nTwo\nlines\n"
+    ),
+    "crlf": (
+        "1\r\n00:00:01,000 --> 00:00:02,000\r\nFirst\r\n\r\n"
+        "2\r\n00:00:02,500 --> 00:00:03,000\r\nSecond\r\nline\r\n\r\n"
+    ),
+    "dot_milliseconds": (
+        "1\n00:00:01.250 --> 00:00:02.750\nDots\n\n"
+        "2\n00:01:00,5 --> 00:01:01.05\nShort fractions\n"
+    ),
+    "missing_index": (
+        "00:00:01,000 --> 00:00:02,000\nNo index\n\n"
+        "2\n00:00:03,000 --> 00:00:04,000\nWith index\n\n"
+        "00:00:05,000 --> 00:00:06,000\nNo index again\n"
+    ),
+    "positioning": (
+        "1\n00:00:01,000 --> 00:00:02,000 X1:100 X2:200 Y1:10 Y2:20\nPositioned\n\n"
+        "2\n00:00:03,000 -->  00:00:04,000  \nTrailing spaces\n"
+    ),
+    "malformed_blocks": (
+        "1\n00:00:01,000 --> 00:00:02,000\nGood\n\n"
+        "2\nnot a timing line\nDropped\n\n"
+        "3\n00:00:05,000 --> 00:00:06,000 --> 00:00:07,000\nToo many arrows\n\n"
+        "4\n00:00:08,000\nNo arrow\n\n"
+        "lonely line\n\n"
+        "6\n00:00:09,000 --> 00:00:10,000\nAlso good\n"
+    ),
+    "lenient_times": (
+        "1\n0:0:1,0 --> 0:0:2,0\nSingle digits\n\n"
+        "2\n00:00:03,000x --> 00:00:04,000\nTrailing junk\n"
+    ),
+    "unsorted_and_blank_text": (
+        "1\n00:00:05,000 --> 00:00:06,000\nLater\n\n"
+        "2\n00:00:01,000 --> 00:00:02,000\n   spaced    out   \n\n"
+        "3\n00:00:03,000 --> 00:00:04,000\n \n"
+    ),
+    "bom_and_markup": (
+        "﻿1\n00:00:01,000 --> 00:00:02,000\n<i>Italic</i> &amp; {\\an8}tags\n"
+    ),
+    "empty": "",
+}
+
+
+def _snapshot(index: SubtitleIndex) -> tuple[list[int], list[int], str]:
+    return list(index.starts), list(index.ends), index.text
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_matches_pysrt(name: str) -> None:
+    text = CASES[name]
+    expected = SubtitleIndex.from_items(pysrt.from_string(text))
+    assert _snapshot(parse_subtitles_text(text)) == _snapshot(expected)
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_file_matches_pysrt(name: str, tmp_path) -> None:
+    path = tmp_path / "track.srt"
+    path.write_bytes(CASES[name].encode("utf-8"))
+    expected = SubtitleIndex.from_items(pysrt.open(str(path), encoding="utf-8-sig"))
+    assert _snapshot(load_subtitles(path)) == _snapshot(expected)